@@ -1,36 +1,50 @@
 from __future__ import annotations
 from enum import Enum
+from typing import Any, Mapping
 
-from pydantic import BaseModel, Field
+from iacopo.expars.exceptions import UnboundVariableError
 
 
 class Token:
+    __slots__ = ("position",)
+
     def __init__(self, position: int):
         self.position = position
 
 
 class Evaluable:
-    def evaluate(self) -> float:
+    __slots__ = ()
+
+    def evaluate(self, bindings: Mapping[str, float] | None = None) -> float:
         raise NotImplementedError()
 
+    def evaluate_vectorized(self, bindings: Mapping[str, Any]):
+        from iacopo.expars.compiler import Compiler
+
+        return Compiler(self).compile().evaluate_vectorized(bindings)
+
     def precedence(self):
         raise NotImplementedError()
 
 
 class Symbol:
+    __slots__ = ()
+
     @property
     def value(self) -> str:
         raise NotImplementedError()
 
 
 class Number(Token, Evaluable):
+    __slots__ = ("value",)
+
     value: float
 
     def __init__(self, value, position=0):
         super().__init__(position=position)
         self.value = value
 
-    def evaluate(self) -> float:
+    def evaluate(self, bindings: Mapping[str, float] | None = None) -> float:
         return float(self.value)
 
     def __repr__(self):
@@ -40,7 +54,30 @@ class Number(Token, Evaluable):
         return 0
 
 
+class Variable(Token, Evaluable):
+    __slots__ = ("name",)
+
+    name: str
+
+    def __init__(self, name, position=0):
+        super().__init__(position=position)
+        self.name = name
+
+    def evaluate(self, bindings: Mapping[str, float] | None = None) -> float:
+        if bindings is None or self.name not in bindings:
+            raise UnboundVariableError(self.position, self.name)
+        return bindings[self.name]
+
+    def __repr__(self):
+        return f"Variable {self.name}"
+
+    def precedence(self):
+        return 0
+
+
 class OpenParenthesis(Symbol, Token):
+    __slots__ = ()
+
     def __init__(self, position=0):
         super().__init__(position=position)
 
@@ -52,7 +89,35 @@ class OpenParenthesis(Symbol, Token):
         return self.value
 
 
+class Comma(Symbol, Token):
+    __slots__ = ()
+
+    def __init__(self, position=0):
+        super().__init__(position=position)
+
+    @property
+    def value(self) -> str:
+        return ","
+
+    def __repr__(self):
+        return self.value
+
+
+class FunctionToken(Token):
+    # the name of a registered function, always followed by its parenthesis
+    __slots__ = ("definition",)
+
+    def __init__(self, definition, position):
+        super().__init__(position=position)
+        self.definition = definition
+
+    def __repr__(self):
+        return self.definition.name
+
+
 class ClosedParenthesis(Symbol, Token):
+    __slots__ = ()
+
     def __init__(self, position=0):
         super().__init__(position=position)
 
@@ -64,15 +129,33 @@ class ClosedParenthesis(Symbol, Token):
         return self.value
 
 
-class Digit(BaseModel, Symbol):
-    digit: int = Field(ge=0, le=9)
+class Digit(Symbol):
+    __slots__ = ("digit",)
+
+    def __init__(self, digit: int):
+        if not 0 <= digit <= 9:
+            raise ValueError(f"A digit is between 0 and 9, got {digit}")
+        self.digit = digit
 
     @property
     def value(self):
         return str(self.digit)
 
 
+class Letter(Symbol):
+    __slots__ = ("letter",)
+
+    def __init__(self, letter: str):
+        self.letter = letter
+
+    @property
+    def value(self):
+        return self.letter
+
+
 class Dot(Symbol):
+    __slots__ = ()
+
     def __init__(self, *_):
         pass
 
@@ -86,6 +169,9 @@ class Operator(Symbol, Enum):
     MINUS = "-"
     MULTIPLY = "*"
     DIVIDE = "/"
+    POWER = "^"
+
+    # definition and function are set by iacopo.expars.operators
 
     @property
     def value(self) -> str:
@@ -93,14 +179,12 @@ class Operator(Symbol, Enum):
 
     @classmethod
     def precedence(cls, operator: Operator):
-        match operator:
-            case Operator.PLUS | Operator.MINUS:
-                return 3
-            case Operator.DIVIDE | Operator.MULTIPLY:
-                return 2
+        return operator.definition.precedence
 
 
 class OperatorToken(Token):
+    __slots__ = ("operator",)
+
     def __init__(self, operator: Operator, position):
         super().__init__(position=position)
         self.operator = operator
@@ -110,34 +194,29 @@ class OperatorToken(Token):
 
 
 class Operation(Evaluable):
+    __slots__ = ("operator", "left", "right")
+
     def __init__(self, operator: Operator, left: Evaluable, right: Evaluable):
         self.operator = operator
         self.left = left
         self.right = right
 
-    def evaluate(self) -> float:
-        left = self.left.evaluate()
-        right = self.right.evaluate()
-        match self.operator:
-            case Operator.PLUS:
-                return left + right
-            case Operator.MINUS:
-                return left - right
-            case Operator.DIVIDE:
-                return left / right
-            case Operator.MULTIPLY:
-                return left * right
+    def evaluate(self, bindings: Mapping[str, float] | None = None) -> float:
+        return self.operator.function(
+            self.left.evaluate(bindings), self.right.evaluate(bindings)
+        )
 
     def as_polish(self):
-        left = (
-            self.left.value if isinstance(self.left, Number) else self.left.as_polish()
-        )
-        right = (
-            self.right.value
-            if isinstance(self.right, Number)
-            else self.right.as_polish()
-        )
-        return f"{left} {right} {self.operator.value}"
+        return f"{self._polish(self.left)} {self._polish(self.right)} {self.operator.value}"
+
+    @staticmethod
+    def _polish(evaluable: Evaluable):
+        match evaluable:
+            case Number():
+                return evaluable.value
+            case Variable():
+                return evaluable.name
+        return evaluable.as_polish()
 
     def precedence(self):
         return Operator.precedence(self.operator)
@@ -150,9 +229,35 @@ class Operation(Evaluable):
 
 
 class ParenthesisOperation(Operation):
+    __slots__ = ()
+
+    def precedence(self):
+        return 0
+
+
+class Call(Evaluable):
+    __slots__ = ("definition", "arguments")
+
+    def __init__(self, definition, arguments: tuple[Evaluable, ...]):
+        self.definition = definition
+        self.arguments = arguments
+
+    def evaluate(self, bindings: Mapping[str, float] | None = None) -> float:
+        return self.definition.function(
+            *[argument.evaluate(bindings) for argument in self.arguments]
+        )
+
+    def as_polish(self):
+        polish = [str(Operation._polish(argument)) for argument in self.arguments]
+        polish.append(self.definition.name)
+        return " ".join(polish)
+
     def precedence(self):
         return 0
 
+    def __repr__(self):
+        return f"Call {self.definition.name}"
+
 
 class CharacterParser:
     @staticmethod
@@ -160,7 +265,7 @@ class CharacterParser:
         match char:
             case "1" | "2" | "3" | "4" | "5" | "6" | "7" | "8" | "9" | "0":
                 return Digit(digit=int(char))
-            case "+" | "-" | "*" | "/":
+            case "+" | "-" | "*" | "/" | "^":
                 return Operator(char)
             case ".":
                 return Dot()
@@ -168,3 +273,9 @@ class CharacterParser:
                 return OpenParenthesis()
             case ")":
                 return ClosedParenthesis()
+            case _ if char == "_" or (char.isascii() and char.isalpha()):
+                return Letter(char)
+
+
+# the built in operators and functions are registered on import
+from iacopo.expars import operators as _operators  # noqa: E402
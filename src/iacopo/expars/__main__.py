@@ -0,0 +1,5 @@
+import sys
+
+from iacopo.expars.cli import main
+
+sys.exit(main())
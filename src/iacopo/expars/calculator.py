@@ -1,8 +1,272 @@
+import copy
+import os
+import time
+from typing import Callable, Mapping, Iterable, NamedTuple
+
+from iacopo.expars import Evaluable
+from iacopo.expars.cache import ParseCache
+from iacopo.expars.compiler import Compiler
+from iacopo.expars.direct import DirectEvaluator
+from iacopo.expars.instrumentation import Instrumentation, Measurement, tree_size
+from iacopo.expars.operators import REGISTRY
+from iacopo.expars.optimizer import Optimizer
 from iacopo.expars.parser import Parser
 from iacopo.expars.tokenizer import Tokenizer
 
+# deeper trees are not evaluated recursively
+_RECURSIVE_DEPTH = 200
+
+
+class CalculationResult(NamedTuple):
+    value: float | None
+    error: Exception | None = None
+
+
+class Specialization(NamedTuple):
+    # evaluate takes the bindings of the variables that were not known
+    residual: Evaluable
+    evaluate: Callable[..., float]
+    original_nodes: int
+    residual_nodes: int
+
+    @property
+    def shrink(self) -> float:
+        return 1 - self.residual_nodes / self.original_nodes
+
 
 class Calculator:
-    def calculate(self, expression: str) -> float:
+    def __init__(
+        self,
+        compiled: bool = False,
+        optimize: bool = False,
+        cache_size: int = 1024,
+        cache_ttl: float | None = None,
+        instrumentation: Instrumentation | None = None,
+        direct: bool = False,
+    ):
+        # direct calculations are evaluated from the tokens without a tree
+        # or the cache, the instrumentation measures the stages of a tree
+        self.compiled = compiled
+        self.direct = direct
+        self.optimize = optimize
+        self.cache = ParseCache(cache_size, cache_ttl) if cache_size else None
+        self.instrumentation = instrumentation
+
+    def calculate(
+        self, expression: str, bindings: Mapping[str, float] | None = None
+    ) -> float:
+        if self.instrumentation is not None:
+            return self._calculate_measured(expression, bindings)
+        if self.direct:
+            return DirectEvaluator(Tokenizer(expression).tokenize()).evaluate(bindings)
+        return self.prepare(expression)(bindings)
+
+    def calculate_many(
+        self,
+        expressions: Iterable[str],
+        bindings: Mapping[str, float] | None = None,
+        workers: int | None = None,
+        chunksize: int = 256,
+    ) -> list[CalculationResult]:
+        # results are in input order, an invalid expression gives a result
+        # holding its error and does not stop the batch
+        if chunksize < 1:
+            raise ValueError(f"Chunk size must be at least 1, got {chunksize}")
+        expressions = list(expressions)
+        workers = workers or os.cpu_count() or 1
+        workers = min(workers, -(-len(expressions) // chunksize))
+        if workers <= 1:
+            return [
+                self.calculate_safely(expression, bindings)
+                for expression in expressions
+            ]
+        # process pools are slow to import and most calculators never use one.
+        # The workers get the registered operators and functions whatever the
+        # start method, with one that pickles them their functions must be
+        # picklable
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(
+            workers,
+            initializer=_start_worker,
+            initargs=(self._settings(), bindings, REGISTRY.registrations()),
+        ) as executor:
+            return list(
+                executor.map(_calculate_in_worker, expressions, chunksize=chunksize)
+            )
+
+    def calculate_safely(
+        self, expression: str, bindings: Mapping[str, float] | None = None
+    ) -> CalculationResult:
+        try:
+            return CalculationResult(self.calculate(expression, bindings))
+        except Exception as e:
+            return CalculationResult(None, e)
+
+    def specialize(
+        self, expression: str, known_bindings: Mapping[str, float]
+    ) -> Specialization:
+        # everything depending only on known_bindings is computed once; the
+        # result is cached for the same expression and known values
+        key = (expression, frozenset(known_bindings.items()))
+        if self.cache is None:
+            return self._specialize(key)
+        return self.cache.get(key, self._specialize)
+
+    def _specialize(self, key: tuple[str, frozenset]) -> Specialization:
+        expression, known_bindings = key
+        evaluable = self.parse(expression)
+        residual = Optimizer(dict(known_bindings)).optimize(evaluable)
+        prepared = _generate(residual) if self.compiled else _evaluator(residual)
+        return Specialization(
+            residual, prepared, tree_size(evaluable)[0], tree_size(residual)[0]
+        )
+
+    def _calculate_measured(
+        self, expression: str, bindings: Mapping[str, float] | None
+    ) -> float:
+        measurement = Measurement(expression)
+        try:
+            if self.cache is None:
+                prepared = self._prepare(expression, measurement)
+            else:
+                prepared = self.cache.get(
+                    expression, lambda key: self._prepare_or_error(key, measurement)
+                )
+                if isinstance(prepared, Exception):
+                    raise copy.copy(prepared)
+            started = time.perf_counter()
+            try:
+                return prepared(bindings)
+            finally:
+                measurement.seconds["evaluate"] = time.perf_counter() - started
+        except Exception as e:
+            measurement.error = e
+            raise
+        finally:
+            self.instrumentation.emit(measurement)
+
+    def _settings(self) -> dict:
+        return {
+            "compiled": self.compiled,
+            "optimize": self.optimize,
+            "direct": self.direct,
+            "cache_size": self.cache.maxsize if self.cache is not None else 0,
+            "cache_ttl": self.cache.ttl if self.cache is not None else None,
+        }
+
+    def prepare(self, expression: str) -> Callable[..., float]:
+        if self.cache is None:
+            return self._prepare(expression)
+        prepared = self.cache.get(expression, self._prepare_or_error)
+        if isinstance(prepared, Exception):
+            # invalid expressions are cached too, every caller gets its own
+            # copy of the error so that tracebacks and contexts are not shared
+            raise copy.copy(prepared)
+        return prepared
+
+    def _prepare_or_error(
+        self, expression: str, measurement: Measurement | None = None
+    ) -> Callable[..., float] | Exception:
+        try:
+            return self._prepare(expression, measurement)
+        except (RuntimeError, ValueError) as e:
+            return e
+
+    def _prepare(
+        self, expression: str, measurement: Measurement | None = None
+    ) -> Callable[..., float]:
+        if measurement is not None:
+            return self._prepare_measured(expression, measurement)
+        return self.prepare_tree(self.parse(expression), len(expression))
+
+    def prepare_tree(
+        self, evaluable: Evaluable, length: int | None = None
+    ) -> Callable[..., float]:
+        # for a tree that was already parsed, without the cache; length is the
+        # one of its expression, when it is known
+        if self.optimize:
+            evaluable = Optimizer().optimize(evaluable)
+        if self.compiled:
+            return _generate(evaluable)
+        return _evaluator(evaluable, length)
+
+    def _prepare_measured(
+        self, expression: str, measurement: Measurement
+    ) -> Callable[..., float]:
+        measurement.cached = False
+        seconds = measurement.seconds
+        started = time.perf_counter()
+        try:
+            tokens = list(Tokenizer(expression).tokenize())
+        except (RuntimeError, ValueError):
+            # the parser can fail on a token before the tokenizer error, the
+            # lazy pipeline raises the same error as an unmeasured calculation
+            seconds["tokenize"] = time.perf_counter() - started
+            self.parse(expression)
+            raise
+        parsing = time.perf_counter()
+        seconds["tokenize"] = parsing - started
+        measurement.tokens = len(tokens)
+        try:
+            evaluable = Parser(tokens).parse()
+        finally:
+            seconds["parse"] = time.perf_counter() - parsing
+        measurement.nodes, measurement.depth = tree_size(evaluable)
+        if self.optimize:
+            started = time.perf_counter()
+            evaluable = Optimizer().optimize(evaluable)
+            seconds["optimize"] = time.perf_counter() - started
+        if self.compiled:
+            started = time.perf_counter()
+            prepared = _generate(evaluable)
+            seconds["compile"] = time.perf_counter() - started
+            return prepared
+        return _evaluator(evaluable)
+
+    @staticmethod
+    def parse(expression: str) -> Evaluable:
         tokenizer = Tokenizer(expression)
-        return Parser(tokenizer.tokenize()).parse().evaluate()
+        return Parser(tokenizer.tokenize()).parse()
+
+
+def _evaluator(evaluable: Evaluable, length: int | None = None) -> Callable[..., float]:
+    # Operation.evaluate recurses once per level, deep trees such as long
+    # chains are evaluated by an iterative program instead. Every node takes
+    # at least a character, so a tree is not walked when the length of its
+    # expression already bounds its depth
+    if length is not None and length <= _RECURSIVE_DEPTH:
+        return evaluable.evaluate
+    if tree_size(evaluable)[1] > _RECURSIVE_DEPTH:
+        return Compiler(evaluable).compile().evaluate
+    return evaluable.evaluate
+
+
+def _generate(evaluable: Evaluable) -> Callable[..., float]:
+    # the code generator needs ast, it is imported with the first compiled
+    # calculator
+    from iacopo.expars.codegen import CodeGenerator
+
+    return CodeGenerator(evaluable).generate()
+
+
+_worker_calculator: Calculator | None = None
+_worker_bindings: Mapping[str, float] | None = None
+
+
+def _start_worker(
+    settings: dict, bindings: Mapping[str, float] | None, registrations: tuple
+):
+    global _worker_calculator, _worker_bindings
+    REGISTRY.register_missing(registrations)
+    _worker_calculator = Calculator(**settings)
+    _worker_bindings = bindings
+
+
+def _calculate_in_worker(expression: str) -> CalculationResult:
+    return _worker_calculator.calculate_safely(expression, _worker_bindings)
+
+
+def _calculate_chunk_in_worker(expressions: list[str]) -> list[CalculationResult]:
+    calculate = _worker_calculator.calculate_safely
+    return [calculate(expression, _worker_bindings) for expression in expressions]
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Mapping
+
+from iacopo.expars import Evaluable
+from iacopo.expars.compiler import (
+    ADD,
+    CALL,
+    DIVIDE,
+    LOAD,
+    MULTIPLY,
+    PUSH,
+    SUBTRACT,
+    Compiler,
+    _vectorized,
+)
+
+_UFUNCS = {ADD: "add", SUBTRACT: "subtract", MULTIPLY: "multiply", DIVIDE: "divide"}
+
+
+def open_column(path: str | os.PathLike) -> Any:
+    # a .npy file or raw float64 values in native byte order, mapped read only
+    import numpy
+
+    if os.fspath(path).endswith(".npy"):
+        return numpy.load(path, mmap_mode="r")
+    return numpy.memmap(path, dtype=numpy.float64, mode="r")
+
+
+class ChunkedEvaluator:
+    # Evaluates an expression over columns larger than memory, a block of
+    # rows at a time. Every operation writes into a scratch buffer of one
+    # block, one per depth of the program stack, that is reused for every
+    # block, and the root writes straight into the output. Memory use depends
+    # only on block_size and the shape of the expression, the columns and the
+    # output are memory mapped. Like Program.evaluate_vectorized, division by
+    # zero gives inf or nan on the affected rows.
+    def __init__(self, evaluable: Evaluable, block_size: int = 16384):
+        if block_size < 1:
+            raise ValueError(f"Block size must be at least 1, got {block_size}")
+        self.program = Compiler(evaluable).compile()
+        self.block_size = block_size
+
+    def evaluate(self, columns: Mapping[str, Any], output: Any) -> Any:
+        # columns are paths given to open_column or arrays, output is a path,
+        # written as .npy if it ends so and as raw float64 otherwise, or an
+        # array to write into. Returns the output array
+        import numpy
+
+        columns = {
+            name: (
+                open_column(column)
+                if isinstance(column, (str, os.PathLike))
+                else column
+            )
+            for name, column in columns.items()
+        }
+        if any(numpy.ndim(column) != 1 for column in columns.values()):
+            raise ValueError("Columns must be one dimensional and of the same length")
+        rows = {len(column) for column in columns.values()}
+        if len(rows) > 1:
+            raise ValueError("Columns must be one dimensional and of the same length")
+        used = {}
+        for variable in self.program.variables:
+            if variable.name not in used:
+                used[variable.name] = variable.evaluate(columns)
+        indexes = {name: index for index, name in enumerate(used)}
+        used = list(used.values())
+        if isinstance(output, (str, os.PathLike)):
+            rows = rows.pop() if rows else 1
+            if os.fspath(output).endswith(".npy"):
+                output = numpy.lib.format.open_memmap(
+                    output, mode="w+", dtype=numpy.float64, shape=(rows,)
+                )
+            else:
+                output = numpy.memmap(
+                    output, dtype=numpy.float64, mode="w+", shape=(rows,)
+                )
+        elif rows and {len(output)} != rows:
+            raise ValueError(f"Output has {len(output)} rows, columns {rows.pop()}")
+        steps, depth, root = self._steps(
+            numpy,
+            [indexes[variable.name] for variable in self.program.variables],
+            len(used),
+        )
+
+        # registers are the scratch buffers, then the output, the blocks of
+        # the columns and the constants
+        target = numpy.asarray(output)
+        inputs = [numpy.asarray(column) for column in used]
+        constants = [numpy.float64(constant) for constant in self.program.constants]
+        scratch = [numpy.empty(self.block_size) for _ in range(depth)]
+        registers, size = [], None
+        with numpy.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            for start in range(0, len(target), self.block_size):
+                stop = min(start + self.block_size, len(target))
+                if stop - start != size:
+                    size = stop - start
+                    registers = [buffer[: stop - start] for buffer in scratch]
+                    registers.append(None)
+                    registers.extend(inputs)
+                    registers.extend(constants)
+                registers[depth] = block = target[start:stop]
+                for position, column in enumerate(inputs, depth + 1):
+                    registers[position] = column[start:stop]
+                for function, operands, result, ufunc in steps:
+                    arguments = [registers[operand] for operand in operands]
+                    if ufunc:
+                        function(*arguments, out=registers[result])
+                    else:
+                        registers[result][...] = function(*arguments)
+                if root != depth:
+                    block[...] = registers[root]
+        if isinstance(output, numpy.memmap):
+            output.flush()
+        return output
+
+    def _steps(self, numpy, variables: list[int], columns: int):
+        # replays the program on a stack of registers, a step is a function,
+        # the registers of its arguments and of its result and whether the
+        # function is a ufunc that can write into it
+        program = self.program
+        calls = iter(program.calls)
+        constant = iter(range(len(program.constants)))
+        variable = iter(variables)
+        opcodes = []
+        stack = []
+        depth = 0
+        for opcode in program.opcodes:
+            if opcode == PUSH:
+                stack.append(("constant", next(constant)))
+            elif opcode == LOAD:
+                stack.append(("column", next(variable)))
+            else:
+                if opcode == CALL:
+                    definition, arity = next(calls)
+                else:
+                    definition, arity = _UFUNCS[opcode], 2
+                operands = stack[-arity:]
+                del stack[-arity:]
+                stack.append(("scratch", len(stack)))
+                depth = max(depth, len(stack))
+                opcodes.append((definition, operands, len(stack) - 1))
+        steps = []
+        for index, (definition, operands, result) in enumerate(opcodes):
+            if index == len(opcodes) - 1:
+                # the root writes into the output block
+                result = depth
+            function = _ufunc(definition, len(operands), numpy)
+            registers = [_register(operand, depth, columns) for operand in operands]
+            if function is None:
+                steps.append((_vectorized(definition, numpy), registers, result, False))
+            else:
+                steps.append((function, registers, result, True))
+        root = depth if opcodes else _register(stack[-1], depth, columns)
+        return steps, depth, root
+
+
+def _register(operand: tuple[str, int], depth: int, columns: int) -> int:
+    kind, index = operand
+    if kind == "scratch":
+        return index
+    if kind == "column":
+        return depth + 1 + index
+    return depth + 1 + columns + index
+
+
+def _ufunc(definition, arity: int, numpy):
+    # the numpy ufunc computing definition with arity arguments, if any
+    if isinstance(definition, str):
+        return getattr(numpy, definition)
+    vectorized = definition.vectorized
+    if isinstance(vectorized, str):
+        vectorized = getattr(numpy, vectorized)
+    if isinstance(vectorized, numpy.ufunc) and vectorized.nin == arity:
+        return vectorized
+    return None
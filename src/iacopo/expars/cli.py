@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator, Mapping
+
+from iacopo.expars.calculator import (
+    Calculator,
+    CalculationResult,
+    _calculate_chunk_in_worker,
+    _start_worker,
+)
+from iacopo.expars.exceptions import check_bindings, respond
+from iacopo.expars.operators import REGISTRY
+
+
+class Pipeline:
+    # reads one expression per line and writes one JSON line per expression,
+    # {"line": 3, "value": 6.0} or {"line": 4, "error": {...}}, results that
+    # are not finite are NonFiniteResultError errors. Blank lines are skipped.
+    # At most a few chunks are held in memory, whatever the input size
+    def __init__(
+        self,
+        calculator: Calculator | None = None,
+        bindings: Mapping[str, float] | None = None,
+        workers: int = 1,
+        chunk_lines: int = 4096,
+    ):
+        if chunk_lines < 1:
+            raise ValueError(f"Chunk lines must be at least 1, got {chunk_lines}")
+        self.calculator = calculator or Calculator()
+        self.bindings = bindings
+        self.workers = workers
+        self.chunk_lines = chunk_lines
+        self.lines = 0
+        self.errors = 0
+
+    def run(self, lines: Iterable[bytes], output: BinaryIO):
+        for numbers, results in self._results(self._chunks(lines)):
+            output.write(b"".join(map(self._format, numbers, results)))
+
+    def _chunks(self, lines: Iterable[bytes]) -> Iterator[tuple[list, list]]:
+        lines = iter(lines)
+        while chunk := list(islice(lines, self.chunk_lines)):
+            numbers = []
+            expressions = []
+            for number, line in enumerate(chunk, self.lines + 1):
+                expression = line.rstrip(b"\r\n").decode("utf-8", "replace")
+                if expression.strip():
+                    numbers.append(number)
+                    expressions.append(expression)
+            self.lines += len(chunk)
+            yield numbers, expressions
+
+    def _results(self, chunks: Iterator[tuple[list, list]]):
+        if self.workers <= 1:
+            calculate = self.calculator.calculate_safely
+            for numbers, expressions in chunks:
+                yield numbers, [calculate(e, self.bindings) for e in expressions]
+            return
+        from concurrent.futures import ProcessPoolExecutor
+
+        settings = self.calculator._settings()
+        with ProcessPoolExecutor(
+            self.workers,
+            initializer=_start_worker,
+            initargs=(settings, self.bindings, REGISTRY.registrations()),
+        ) as executor:
+            # a couple of chunks per worker keeps them busy without reading
+            # the whole input ahead of the output
+            pending = deque()
+            for numbers, expressions in chunks:
+                if len(pending) >= 2 * self.workers:
+                    numbers_done, future = pending.popleft()
+                    yield numbers_done, future.result()
+                future = executor.submit(_calculate_chunk_in_worker, expressions)
+                pending.append((numbers, future))
+            while pending:
+                numbers_done, future = pending.popleft()
+                yield numbers_done, future.result()
+
+    def _format(self, number: int, result: CalculationResult) -> bytes:
+        response = {"line": number, **respond(*result)}
+        if "error" in response:
+            self.errors += 1
+        return json.dumps(response, allow_nan=False).encode() + b"\n"
+
+
+@contextmanager
+def read_lines(path: str) -> Iterator[Iterable[bytes]]:
+    # files are memory mapped: lines are read straight from the page cache
+    if path == "-":
+        yield sys.stdin.buffer
+        return
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield iter(())
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield iter(mapped.readline, b"")
+
+
+@contextmanager
+def write_lines(path: str) -> Iterator[BinaryIO]:
+    if path == "-":
+        yield sys.stdout.buffer
+        sys.stdout.buffer.flush()
+        return
+    with open(path, "wb", buffering=1 << 20) as file:
+        yield file
+
+
+def _positive(text: str) -> int:
+    number = int(text)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m iacopo.expars",
+        description="Evaluate one expression per line, writing one JSON result per line",
+    )
+    parser.add_argument("input", nargs="?", default="-", help="input file, - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output file, - for stdout")
+    parser.add_argument("-b", "--bindings", help="variable values as a JSON object")
+    parser.add_argument("-w", "--workers", type=int, default=1)
+    parser.add_argument("--chunk-lines", type=_positive, default=4096)
+    parser.add_argument("--compiled", action="store_true")
+    parser.add_argument("--optimize", action="store_true")
+    parser.add_argument(
+        "--direct", action="store_true", help="evaluate without building trees"
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="no throughput report"
+    )
+    arguments = parser.parse_args(argv)
+    try:
+        bindings = check_bindings(
+            json.loads(arguments.bindings) if arguments.bindings else None
+        )
+    except ValueError as e:
+        # not JSON, or a ProtocolError
+        parser.error(f"argument -b/--bindings: {e}")
+    pipeline = Pipeline(
+        Calculator(
+            compiled=arguments.compiled,
+            optimize=arguments.optimize,
+            direct=arguments.direct,
+        ),
+        bindings,
+        arguments.workers,
+        arguments.chunk_lines,
+    )
+    started = time.perf_counter()
+    with read_lines(arguments.input) as lines, write_lines(arguments.output) as output:
+        pipeline.run(lines, output)
+    elapsed = time.perf_counter() - started
+    if not arguments.quiet:
+        rate = pipeline.lines / elapsed if elapsed else 0.0
+        print(
+            f"{pipeline.lines} lines, {pipeline.errors} errors in {elapsed:.3f}s ({rate:.0f} lines/s)",
+            file=sys.stderr,
+        )
+    return 1 if pipeline.errors else 0
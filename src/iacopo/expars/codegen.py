@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import ast
+from typing import Callable, Mapping
+
+from iacopo.expars import Call, Evaluable, Number, Operation, Operator, Variable
+from iacopo.expars.compiler import Compiler
+from iacopo.expars.exceptions import UnboundVariableError
+
+_LOCATION = {"lineno": 1, "col_offset": 0, "end_lineno": 1, "end_col_offset": 0}
+
+_OPERATORS = {
+    Operator.PLUS: ast.Add,
+    Operator.MINUS: ast.Sub,
+    Operator.MULTIPLY: ast.Mult,
+    Operator.DIVIDE: ast.Div,
+}
+
+
+class CodeGenerator:
+    def __init__(self, evaluable: Evaluable):
+        self.evaluable = evaluable
+        self._positions = {}
+        self._functions = {}
+
+    def lower(self) -> ast.Expression:
+        # post order visit with an explicit stack of the lowered operands;
+        # operators without a Python equivalent and functions are called by
+        # names bound when the code is evaluated
+        self._positions = {}
+        self._functions = {}
+        lowered = []
+        pending = [(self.evaluable, False)]
+        while pending:
+            node, visited = pending.pop()
+            match node:
+                case Number():
+                    lowered.append(ast.Constant(node.evaluate(), **_LOCATION))
+                case Variable():
+                    self._positions.setdefault(node.name, node.position)
+                    lowered.append(self._load(node.name))
+                case Operation() if visited:
+                    right = lowered.pop()
+                    left = lowered.pop()
+                    if node.operator in _OPERATORS:
+                        operator = _OPERATORS[node.operator]()
+                        lowered.append(ast.BinOp(left, operator, right, **_LOCATION))
+                    else:
+                        function = self._function(node.operator.function)
+                        lowered.append(
+                            ast.Call(function, [left, right], [], **_LOCATION)
+                        )
+                case Operation():
+                    pending.append((node, True))
+                    pending.append((node.right, False))
+                    pending.append((node.left, False))
+                case Call() if visited:
+                    arguments = lowered[len(lowered) - len(node.arguments) :]
+                    del lowered[len(lowered) - len(node.arguments) :]
+                    function = self._function(node.definition.function)
+                    lowered.append(ast.Call(function, arguments, [], **_LOCATION))
+                case Call():
+                    pending.append((node, True))
+                    pending.extend(
+                        (argument, False) for argument in reversed(node.arguments)
+                    )
+                case _:
+                    raise TypeError(f"Cannot generate code for {node!r}")
+        arguments = ast.arguments(
+            posonlyargs=[],
+            args=[ast.arg("bindings", **_LOCATION)],
+            kwonlyargs=[],
+            kw_defaults=[],
+            defaults=[ast.Constant(None, **_LOCATION)],
+        )
+        return ast.Expression(ast.Lambda(arguments, lowered.pop(), **_LOCATION))
+
+    def generate(self) -> Callable[..., float]:
+        try:
+            code = compile(self.lower(), "<expression>", "eval")
+        except RecursionError:
+            # the Python compiler recurses on the tree, very deep expressions
+            # run on the stack machine instead
+            return Compiler(self.evaluable).compile().evaluate
+        function = eval(code, {"__builtins__": {}, **self._functions})
+        if not self._positions:
+            return function
+        positions = self._positions
+
+        def evaluate(bindings: Mapping[str, float] | None = None) -> float:
+            if bindings is None:
+                name, position = next(iter(positions.items()))
+                raise UnboundVariableError(position, name)
+            try:
+                return function(bindings)
+            except KeyError as e:
+                if e.args[0] not in positions:
+                    raise
+                raise UnboundVariableError(positions[e.args[0]], e.args[0]) from None
+
+        return evaluate
+
+    def _function(self, function: Callable) -> ast.Name:
+        name = f"_function{len(self._functions)}"
+        self._functions[name] = function
+        return ast.Name(name, ast.Load(), **_LOCATION)
+
+    @staticmethod
+    def _load(name: str) -> ast.Subscript:
+        return ast.Subscript(
+            ast.Name("bindings", ast.Load(), **_LOCATION),
+            ast.Constant(name, **_LOCATION),
+            ast.Load(),
+            **_LOCATION,
+        )
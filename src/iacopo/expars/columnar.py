@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+from array import array
+from itertools import repeat
+from typing import Mapping
+
+from iacopo.expars import Call, Evaluable, Number, Operation, Operator, Variable
+from iacopo.expars.exceptions import FormatError
+from iacopo.expars.operators import REGISTRY
+
+NUMBER = 0
+VARIABLE = 1
+OPERATION = 2
+# function calls and operations of registered operators, stored by name
+CALL = 3
+REGISTERED = 4
+
+OPERATORS = list(Operator)
+_OPERATOR_CODES = {operator: code for code, operator in enumerate(OPERATORS)}
+
+
+class ColumnarTree:
+    # one entry per node in parallel arrays, operands before the operations
+    # using them and the root last. For variables the value is the index of the
+    # name in names. Calls and registered operators are kept by the index of
+    # their name in registered and resolved through the registry when they are
+    # evaluated; the left of a call is the start of its argument nodes in
+    # arguments and the right their count. The positions of numbers and
+    # variables are kept only when asked for, without them errors report
+    # position 0
+    def __init__(
+        self,
+        kinds: array,
+        operators: array,
+        lefts: array,
+        rights: array,
+        values: array,
+        names: list[str],
+        positions: array | None = None,
+        arguments: array | None = None,
+        registered: list[str] | None = None,
+    ):
+        self.kinds = kinds
+        self.operators = operators
+        self.lefts = lefts
+        self.rights = rights
+        self.values = values
+        self.names = names
+        self.positions = positions
+        self.arguments = array("i") if arguments is None else arguments
+        self.registered = [] if registered is None else registered
+
+    @classmethod
+    def from_evaluable(
+        cls, evaluable: Evaluable, positions: bool = False
+    ) -> ColumnarTree:
+        kinds = array("B")
+        operators = array("B")
+        lefts = array("i")
+        rights = array("i")
+        values = array("d")
+        node_positions = array("i")
+        arguments = array("i")
+        names = []
+        name_indexes = {}
+        registered = []
+        registered_indexes = {}
+
+        def register(name: str) -> int:
+            if name not in registered_indexes:
+                registered_indexes[name] = len(registered)
+                registered.append(name)
+            return registered_indexes[name]
+
+        indexes = []
+        pending = [(evaluable, False)]
+        while pending:
+            node, visited = pending.pop()
+            match node:
+                case Operation() if visited:
+                    right = indexes.pop()
+                    left = indexes.pop()
+                    code = _OPERATOR_CODES.get(node.operator)
+                    if code is None:
+                        kinds.append(REGISTERED)
+                        operators.append(0)
+                        values.append(register(node.operator.symbol))
+                    else:
+                        kinds.append(OPERATION)
+                        operators.append(code)
+                        values.append(0.0)
+                    lefts.append(left)
+                    rights.append(right)
+                    node_positions.append(0)
+                case Operation():
+                    pending.append((node, True))
+                    pending.append((node.right, False))
+                    pending.append((node.left, False))
+                    continue
+                case Call() if visited:
+                    count = len(node.arguments)
+                    kinds.append(CALL)
+                    operators.append(0)
+                    lefts.append(len(arguments))
+                    rights.append(count)
+                    values.append(register(node.definition.name))
+                    node_positions.append(0)
+                    arguments.extend(indexes[len(indexes) - count :])
+                    del indexes[len(indexes) - count :]
+                case Call():
+                    pending.append((node, True))
+                    pending.extend(
+                        (argument, False) for argument in reversed(node.arguments)
+                    )
+                    continue
+                case Number():
+                    kinds.append(NUMBER)
+                    operators.append(0)
+                    lefts.append(-1)
+                    rights.append(-1)
+                    values.append(node.evaluate())
+                    node_positions.append(node.position)
+                case Variable():
+                    if node.name not in name_indexes:
+                        name_indexes[node.name] = len(names)
+                        names.append(node.name)
+                    kinds.append(VARIABLE)
+                    operators.append(0)
+                    lefts.append(-1)
+                    rights.append(-1)
+                    values.append(name_indexes[node.name])
+                    node_positions.append(node.position)
+                case _:
+                    raise TypeError(f"Cannot store {node!r}")
+            indexes.append(len(kinds) - 1)
+        if not positions:
+            node_positions = None
+        return cls(
+            kinds,
+            operators,
+            lefts,
+            rights,
+            values,
+            names,
+            node_positions,
+            arguments,
+            registered,
+        )
+
+    def to_evaluable(self) -> Evaluable:
+        nodes = []
+        positions = self.positions or repeat(0)
+        resolved = self._resolve()
+        for index, (kind, position) in enumerate(zip(self.kinds, positions)):
+            if kind == NUMBER:
+                nodes.append(Number(self.values[index], position))
+            elif kind == VARIABLE:
+                name = self.names[int(self.values[index])]
+                nodes.append(Variable(name, position))
+            elif kind == CALL:
+                start = self.lefts[index]
+                arguments = self.arguments[start : start + self.rights[index]]
+                nodes.append(
+                    Call(
+                        resolved[int(self.values[index])],
+                        tuple(nodes[argument] for argument in arguments),
+                    )
+                )
+            else:
+                if kind == OPERATION:
+                    operator = OPERATORS[self.operators[index]]
+                else:
+                    operator = resolved[int(self.values[index])]
+                nodes.append(
+                    Operation(
+                        operator, nodes[self.lefts[index]], nodes[self.rights[index]]
+                    )
+                )
+        return nodes[-1]
+
+    def evaluate(
+        self,
+        bindings: Mapping[str, float] | None = None,
+        start: int = 0,
+        stop: int | None = None,
+    ) -> float:
+        # start and stop select the nodes of a subtree, which are contiguous
+        # with its root at stop - 1
+        results = []
+        append = results.append
+        kinds = self.kinds
+        lefts = self.lefts
+        rights = self.rights
+        values = self.values
+        resolved = self._resolve() if self.registered else None
+        if stop is None:
+            stop = len(kinds)
+        for index in range(start, stop):
+            kind = kinds[index]
+            if kind == NUMBER:
+                append(values[index])
+                continue
+            if kind == VARIABLE:
+                name = self.names[int(values[index])]
+                position = self.positions[index] if self.positions else 0
+                append(Variable(name, position).evaluate(bindings))
+                continue
+            if kind == OPERATION:
+                function = OPERATORS[self.operators[index]].function
+            elif kind == CALL:
+                first = lefts[index]
+                arguments = self.arguments[first : first + rights[index]]
+                append(
+                    resolved[int(values[index])].function(
+                        *[results[argument - start] for argument in arguments]
+                    )
+                )
+                continue
+            else:
+                function = resolved[int(values[index])].function
+            append(
+                function(results[lefts[index] - start], results[rights[index] - start])
+            )
+        return results[-1]
+
+    def _resolve(self) -> list:
+        # the definitions of the registered functions and the registered
+        # operators, in the order of registered
+        resolved = []
+        for name in self.registered:
+            found = REGISTRY.functions.get(name) or REGISTRY.operators.get(name)
+            if found is None:
+                raise FormatError(
+                    f"Unknown function or operator {name!r}, it must be registered"
+                    " before the expression is loaded"
+                )
+            resolved.append(found)
+        return resolved
+
+    @property
+    def nbytes(self) -> int:
+        columns = [
+            self.kinds,
+            self.operators,
+            self.lefts,
+            self.rights,
+            self.values,
+            self.arguments,
+        ]
+        if self.positions is not None:
+            columns.append(self.positions)
+        return sum(column.itemsize * len(column) for column in columns)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __repr__(self):
+        return f"ColumnarTree {len(self.kinds)} nodes"
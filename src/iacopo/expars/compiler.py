@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from array import array
+from functools import reduce
+from typing import Any, Mapping
+
+from iacopo.expars import Call, Evaluable, Number, Operation, Operator, Variable
+from iacopo.expars.operators import Definition
+
+PUSH = 0
+ADD = 1
+SUBTRACT = 2
+MULTIPLY = 3
+DIVIDE = 4
+LOAD = 5
+CALL = 6
+
+_OPCODES = {
+    Operator.PLUS: ADD,
+    Operator.MINUS: SUBTRACT,
+    Operator.MULTIPLY: MULTIPLY,
+    Operator.DIVIDE: DIVIDE,
+}
+
+
+class Program:
+    # an Evaluable in reverse polish order: every PUSH opcode consumes the next
+    # constant, every LOAD the next variable, every CALL the next definition and
+    # its number of arguments, replacing them on the stack with the result.
+    # Every other opcode replaces the two topmost values with the result
+    def __init__(self, opcodes: array, constants: array, variables=(), calls=()):
+        self.opcodes = opcodes
+        self.constants = constants
+        self.variables = tuple(variables)
+        self.calls = tuple(calls)
+        self._functions = [
+            (definition.function, arity) for definition, arity in self.calls
+        ]
+
+    def evaluate(self, bindings: Mapping[str, float] | None = None) -> float:
+        return self._run(self.constants, bindings, self._functions)
+
+    def _run(self, constants, bindings, calls) -> float:
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        constants = iter(constants)
+        variables = iter(self.variables)
+        calls = iter(calls)
+        for opcode in self.opcodes:
+            if opcode == PUSH:
+                push(next(constants))
+                continue
+            if opcode == LOAD:
+                push(next(variables).evaluate(bindings))
+                continue
+            if opcode == CALL:
+                function, arity = next(calls)
+                arguments = stack[-arity:]
+                del stack[-arity:]
+                push(function(*arguments))
+                continue
+            right = pop()
+            if opcode == ADD:
+                stack[-1] = stack[-1] + right
+            elif opcode == SUBTRACT:
+                stack[-1] = stack[-1] - right
+            elif opcode == MULTIPLY:
+                stack[-1] = stack[-1] * right
+            else:
+                stack[-1] = stack[-1] / right
+        return stack[-1]
+
+    def evaluate_vectorized(self, bindings: Mapping[str, Any]):
+        # each variable is bound to a whole column and every opcode runs once
+        # over all the rows; division by zero follows IEEE rules and gives
+        # inf or nan on the affected rows instead of raising
+        import numpy
+
+        columns = {
+            name: numpy.asarray(column, dtype=numpy.float64)
+            for name, column in bindings.items()
+        }
+        shape = numpy.broadcast_shapes(*(column.shape for column in columns.values()))
+        calls = [
+            (_vectorized(definition, numpy), arity) for definition, arity in self.calls
+        ]
+        with numpy.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            result = self._run(numpy.asarray(self.constants), columns, calls)
+            result = numpy.asarray(result, dtype=numpy.float64)
+        if result.shape != shape:
+            result = numpy.broadcast_to(result, shape).copy()
+        return result
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def __repr__(self):
+        return f"Program {len(self.opcodes)} opcodes, {len(self.constants)} constants"
+
+
+def _vectorized(definition: Definition, numpy):
+    # the numpy version of an operator or a function
+    vectorized = definition.vectorized
+    if vectorized is None:
+        return numpy.vectorize(definition.function, otypes=[numpy.float64])
+    if isinstance(vectorized, str):
+        vectorized = getattr(numpy, vectorized)
+    if isinstance(vectorized, numpy.ufunc) and vectorized.nin == 2:
+        # min and max take any number of arguments
+        return lambda *columns: reduce(vectorized, columns)
+    return vectorized
+
+
+class Compiler:
+    def __init__(self, evaluable: Evaluable):
+        self.evaluable = evaluable
+
+    def compile(self) -> Program:
+        # visit root, right, left and reverse the result to get the post order
+        # without recursion
+        nodes = []
+        pending = [self.evaluable]
+        while pending:
+            node = pending.pop()
+            nodes.append(node)
+            match node:
+                case Operation():
+                    pending.append(node.left)
+                    pending.append(node.right)
+                case Call():
+                    pending.extend(node.arguments)
+                case Number() | Variable():
+                    pass
+                case _:
+                    raise TypeError(f"Cannot compile {node!r}")
+
+        opcodes = array("B")
+        constants = array("d")
+        variables = []
+        calls = []
+        for node in reversed(nodes):
+            match node:
+                case Number():
+                    opcodes.append(PUSH)
+                    constants.append(node.evaluate())
+                case Variable():
+                    opcodes.append(LOAD)
+                    variables.append(node)
+                case Call():
+                    opcodes.append(CALL)
+                    calls.append((node.definition, len(node.arguments)))
+                case _ if node.operator in _OPCODES:
+                    opcodes.append(_OPCODES[node.operator])
+                case _:
+                    opcodes.append(CALL)
+                    calls.append((node.operator.definition, 2))
+        return Program(opcodes, constants, variables, calls)
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from typing import Hashable, Mapping
+
+from iacopo.expars import Call, Evaluable, Number, Operation, Variable
+
+
+class Dag(Evaluable):
+    # nodes are unique and sorted so that every operation comes after its
+    # operands: evaluating them in order computes each shared node only once.
+    # An instruction is a function and the indexes of its two operands, a
+    # leaf and -1, or for calls a function, -2 and the indexes of the arguments
+    def __init__(self, root: Evaluable, nodes: list[Evaluable], tree_nodes: int):
+        self.root = root
+        self.tree_nodes = tree_nodes
+        self.dag_nodes = len(nodes)
+        index = {id(node): position for position, node in enumerate(nodes)}
+        self._instructions = []
+        for node in nodes:
+            match node:
+                case Operation():
+                    instruction = (
+                        node.operator.function,
+                        index[id(node.left)],
+                        index[id(node.right)],
+                    )
+                case Call():
+                    arguments = tuple(
+                        index[id(argument)] for argument in node.arguments
+                    )
+                    instruction = (node.definition.function, -2, arguments)
+                case _:
+                    instruction = (node, -1, -1)
+            self._instructions.append(instruction)
+
+    @property
+    def sharing_ratio(self) -> float:
+        return self.tree_nodes / self.dag_nodes
+
+    def evaluate(self, bindings: Mapping[str, float] | None = None) -> float:
+        values = []
+        append = values.append
+        for action, left, right in self._instructions:
+            if left >= 0:
+                append(action(values[left], values[right]))
+            elif left == -1:
+                append(action.evaluate(bindings))
+            else:
+                append(action(*[values[argument] for argument in right]))
+        return values[-1]
+
+    def precedence(self):
+        return self.root.precedence()
+
+    def __repr__(self):
+        return f"Dag {self.dag_nodes} nodes for {self.tree_nodes} tree nodes"
+
+
+class Interner:
+    # structurally identical subtrees are built once and shared by every
+    # expression interned with the same Interner
+    def __init__(self):
+        self._nodes: dict[Hashable, Evaluable] = {}
+        self.tree_nodes = 0
+
+    @property
+    def dag_nodes(self) -> int:
+        return len(self._nodes)
+
+    @property
+    def sharing_ratio(self) -> float:
+        return self.tree_nodes / self.dag_nodes if self._nodes else 1.0
+
+    def intern(self, evaluable: Evaluable) -> Dag:
+        interned = {}
+        nodes = []
+        listed = set()
+        pending = [(evaluable, False)]
+        while pending:
+            original, visited = pending.pop()
+            if id(original) in interned:
+                continue
+            node = original
+            if isinstance(node, Operation):
+                if not visited:
+                    pending.append((node, True))
+                    pending.append((node.right, False))
+                    pending.append((node.left, False))
+                    continue
+                left, left_size = interned[id(node.left)]
+                right, right_size = interned[id(node.right)]
+                key = (node.operator, id(left), id(right))
+                size = 1 + left_size + right_size
+                if node.left is not left or node.right is not right:
+                    node = Operation(node.operator, left, right)
+            elif isinstance(node, Call):
+                if not visited:
+                    pending.append((node, True))
+                    pending.extend(
+                        (argument, False) for argument in reversed(node.arguments)
+                    )
+                    continue
+                arguments = [interned[id(argument)] for argument in node.arguments]
+                key = (
+                    "call",
+                    node.definition,
+                    *(id(shared) for shared, _ in arguments),
+                )
+                size = 1 + sum(argument_size for _, argument_size in arguments)
+                if any(
+                    shared is not argument
+                    for (shared, _), argument in zip(arguments, node.arguments)
+                ):
+                    node = Call(
+                        node.definition, tuple(shared for shared, _ in arguments)
+                    )
+            else:
+                key = self._leaf_key(node)
+                size = 1
+            shared = self._nodes.get(key)
+            if shared is None:
+                if type(node) is not Operation and isinstance(node, Operation):
+                    # parenthesis only matter while parsing
+                    node = Operation(node.operator, node.left, node.right)
+                shared = self._nodes[key] = node
+            interned[id(original)] = (shared, size)
+            if id(shared) not in listed:
+                listed.add(id(shared))
+                nodes.append(shared)
+        root, size = interned[id(evaluable)]
+        self.tree_nodes += size
+        return Dag(root, nodes, size)
+
+    @staticmethod
+    def _leaf_key(node: Evaluable) -> Hashable:
+        match node:
+            case Number():
+                # hex keeps 0.0 and -0.0 apart
+                return "number", node.evaluate().hex()
+            case Variable():
+                return "variable", node.name
+        raise TypeError(f"Cannot intern {node!r}")
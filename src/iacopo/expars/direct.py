@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from typing import Iterable, Mapping
+
+from iacopo.expars import (
+    Token,
+    Number,
+    OperatorToken,
+    OpenParenthesis,
+    ClosedParenthesis,
+    Comma,
+    FunctionToken,
+)
+from iacopo.expars.exceptions import UnexpectedTokenError, IncompleteExpressionError
+from iacopo.expars.parser import Parser
+
+
+class DirectEvaluator(Parser):
+    # Evaluates a token stream while parsing it, without building a tree.
+    # Operations are grouped like Parser does, so an operand is kept as a
+    # value until an operator that binds less tightly, a closing parenthesis
+    # or the end shows that its operations are complete; inside parenthesis
+    # that is only at the closing one. Errors are the ones of parsing and then
+    # evaluating the tree: a parse error anywhere wins, then evaluation errors
+    # in the order of Operation.evaluate.
+    def __init__(self, tokens: Iterable[Token]):
+        super().__init__(tokens)
+        self._error: Exception | None = None
+
+    def evaluate(self, bindings: Mapping[str, float] | None = None) -> float:
+        tokens = self._tokens
+        # operands still waiting for their right operand and their operators,
+        # base is where the current parenthesis level starts
+        values, operators = [], []
+        frames = []
+        base = 0
+        token = self._next(None)
+        while True:
+            token = self._operand(token, inside_parenthesis=bool(frames))
+            if isinstance(token, (OpenParenthesis, FunctionToken)):
+                call = None
+                if isinstance(token, FunctionToken):
+                    call = (token.definition, [])
+                    token = self._next(token)
+                frames.append((base, call))
+                base = len(values)
+                token = self._next(token)
+                continue
+            value = self._value(token, bindings)
+            while True:
+                if not tokens.has_next():
+                    value = self._reduce(values, operators, base, value)
+                    while frames:
+                        base, call = frames.pop()
+                        if call is not None:
+                            value = self._call(call, value, token, closing=False)
+                        value = self._reduce(values, operators, base, value)
+                    if self._error is not None:
+                        raise self._error
+                    return value
+                token = next(tokens)
+                if isinstance(token, ClosedParenthesis):
+                    if not frames:
+                        raise UnexpectedTokenError(token)
+                    value = self._reduce(values, operators, base, value)
+                    base, call = frames.pop()
+                    if call is not None:
+                        value = self._call(call, value, token, closing=True)
+                elif isinstance(token, OperatorToken):
+                    operator = token.operator
+                    # inside parenthesis and call arguments there is no
+                    # precedence, everything is grouped from the right
+                    if not frames:
+                        value = self._reduce(values, operators, base, value, operator)
+                    values.append(value)
+                    operators.append(operator)
+                    token = self._next(token)
+                    break
+                elif isinstance(token, Comma) and frames and frames[-1][1]:
+                    definition, arguments = frames[-1][1]
+                    if definition.arity is not None and len(arguments) + 1 >= (
+                        definition.arity
+                    ):
+                        raise UnexpectedTokenError(token)
+                    arguments.append(self._reduce(values, operators, base, value))
+                    token = self._next(token)
+                    break
+                else:
+                    raise UnexpectedTokenError(token)
+
+    def _value(self, token: Token, bindings: Mapping[str, float] | None):
+        # after the first evaluation error only the grammar is checked
+        if self._error is not None:
+            return None
+        if isinstance(token, Number):
+            return float(token.value)
+        try:
+            return token.evaluate(bindings)
+        except Exception as e:
+            self._error = e
+            return None
+
+    def _reduce(self, values: list, operators: list, stop: int, value, before=None):
+        # applies the pending operators down to stop, or only the ones binding
+        # more tightly than before
+        if before is not None:
+            definition = before.definition
+        while len(values) > stop:
+            if before is not None:
+                pending = operators[-1].definition
+                if pending.precedence > definition.precedence or (
+                    pending.precedence == definition.precedence
+                    and definition.right_associative
+                ):
+                    break
+            value = self._apply(operators.pop().function, (values.pop(), value))
+        return value
+
+    def _call(self, call: tuple, value, last: Token, closing: bool):
+        definition, arguments = call
+        arguments.append(value)
+        if definition.arity is not None and len(arguments) != definition.arity:
+            if closing:
+                raise UnexpectedTokenError(last)
+            raise IncompleteExpressionError(last)
+        return self._apply(definition.function, arguments)
+
+    def _apply(self, function, arguments):
+        if self._error is not None:
+            return None
+        try:
+            return function(*arguments)
+        except Exception as e:
+            self._error = e
+            return None
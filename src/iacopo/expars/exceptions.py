@@ -1,18 +1,147 @@
+from __future__ import annotations
+
+import math
+
+# __reduce__ rebuilds the errors from their constructor arguments, so that they
+# can be returned by worker processes. Tokens are sent as their text and
+# position: a function token holds its definition, whose function might not
+# be picklable
+
+
 class NumberFormatError(RuntimeError):
     def __init__(self, position, message):
         super().__init__(f"{message} at character {position}")
         self.message = message
         self.position = position
 
+    def __reduce__(self):
+        return type(self), (self.position, self.message)
+
+
+class UnexpectedCharacterError(RuntimeError):
+    def __init__(self, position, character):
+        super().__init__(f"Unexpected character '{character}' at character {position}")
+        self.character = character
+        self.position = position
+
+    def __reduce__(self):
+        return type(self), (self.position, self.character)
+
 
 class UnexpectedTokenError(RuntimeError):
     def __init__(self, token):
         super().__init__(f"Unexpected token '{token}' at character {token.position}")
+        self.token = token
         self.position = token.position
 
+    def __reduce__(self):
+        return type(self), (_SentToken.of(self.token),)
+
 
 class IncompleteExpressionError(RuntimeError):
     def __init__(self, token):
+        self.token = token
+        if token is None:
+            super().__init__("Missing symbol, the expression is empty")
+            self.position = 0
+            return
         super().__init__(
             f"Missing symbol at the end of expression, last token parsed: {token} at position {token.position}"
         )
+        self.position = token.position
+
+    def __reduce__(self):
+        return type(self), (_SentToken.of(self.token),)
+
+
+class _SentToken:
+    # what the errors above keep of their token once they were pickled
+    __slots__ = ("text", "position")
+
+    def __init__(self, text: str, position: int):
+        self.text = text
+        self.position = position
+
+    @classmethod
+    def of(cls, token) -> _SentToken | None:
+        return None if token is None else cls(str(token), token.position)
+
+    def __repr__(self):
+        return self.text
+
+
+class UnboundVariableError(RuntimeError):
+    def __init__(self, position, name):
+        super().__init__(f"Unbound variable '{name}' at character {position}")
+        self.name = name
+        self.position = position
+
+    def __reduce__(self):
+        return type(self), (self.position, self.name)
+
+
+class CycleError(RuntimeError):
+    def __init__(self, names):
+        super().__init__(f"Circular reference: {' -> '.join(names)}")
+        self.names = names
+
+    def __reduce__(self):
+        return type(self), (self.names,)
+
+
+class NonFiniteResultError(ValueError):
+    # JSON has no infinity or nan, results that overflow are reported as errors
+    def __init__(self, value):
+        super().__init__(f"The result {value} is not a finite number")
+        self.value = value
+
+    def __reduce__(self):
+        return type(self), (self.value,)
+
+
+class ProtocolError(ValueError):
+    # a request of the server or the bindings of the command line that are
+    # not well formed
+    pass
+
+
+class FormatError(ValueError):
+    # a serialized expression that is corrupted or of another format version
+    pass
+
+
+def describe(error: Exception) -> dict:
+    # JSON friendly form of an error, used by the server and the command line
+    description = {"type": type(error).__name__, "message": str(error)}
+    position = getattr(error, "position", None)
+    if position is not None:
+        description["position"] = position
+    return description
+
+
+def check_bindings(bindings) -> dict | None:
+    # the bindings of a JSON request, an object of numbers
+    if bindings is None:
+        return None
+    if not isinstance(bindings, dict):
+        raise ProtocolError("bindings must be a JSON object")
+    for name, value in bindings.items():
+        if not _is_real(value):
+            raise ProtocolError(f"the value of '{name}' is not a number: {value!r}")
+    return bindings
+
+
+def respond(value: float | None, error: Exception | None) -> dict:
+    # the "value" or "error" entry of a JSON response
+    if error is None:
+        if not _is_real(value):
+            error = TypeError(f"The result {value!r} is not a number")
+        elif math.isfinite(value):
+            return {"value": value}
+        else:
+            error = NonFiniteResultError(value)
+    return {"error": describe(error)}
+
+
+def _is_real(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from operator import attrgetter
+from typing import Iterable
+
+from iacopo.expars import (
+    Token,
+    Evaluable,
+    Number,
+    Variable,
+    FunctionToken,
+    OpenParenthesis,
+    ClosedParenthesis,
+)
+from iacopo.expars.parser import Parser
+from iacopo.expars.tokenizer import Tokenizer
+
+_POSITION = attrgetter("position")
+
+
+class IncrementalParser:
+    # Keeps the tokens and the tree of an expression and updates them after
+    # every edit. Only the tokens around the edit are scanned again, the tokens
+    # after it are moved in place, and parenthesis groups that the edit does
+    # not touch are reused as they are. Trees returned by earlier calls share
+    # nodes with the new one, so they are not valid anymore after an edit.
+    def __init__(self, expression: str = ""):
+        self.expression = expression
+        self.tokens: list[Token] | None = None
+        self.tree: Evaluable | None = None
+        self.error: Exception | None = None
+        self.reused_groups = 0
+        # id of the opening parenthesis -> (opening, closing, parsed group)
+        self._groups = {}
+        # id of a minus token -> (minus, negative number it was merged into)
+        self._negatives = {}
+        self._update(self.expression, 0, None, [])
+
+    def parse(self) -> Evaluable:
+        if self.error is not None:
+            raise self.error.with_traceback(None)
+        return self.tree
+
+    def edit(self, offset: int, deleted: int, inserted: str) -> Evaluable:
+        old = self.expression
+        if offset < 0 or deleted < 0 or offset + deleted > len(old):
+            raise ValueError(
+                f"Edit {offset}+{deleted} outside of {len(old)} characters"
+            )
+        expression = old[:offset] + inserted + old[offset + deleted :]
+        tokens = self.tokens
+        if not tokens:
+            self._groups.clear()
+            self._negatives.clear()
+            self._update(expression, 0, None, [])
+            return self.parse()
+        first, last = self._affected(offset, offset + deleted)
+        start = self._end(first - 1)
+        end = self._end(last)
+        shift = len(inserted) - deleted
+        removed = {id(token) for token in tokens[first : last + 1]}
+        self._forget(start, end, removed)
+        suffix = tokens[last + 1 :]
+        for token in suffix:
+            token.position += shift
+        for minus, number in self._negatives.values():
+            number.position = minus.position
+        self._update(expression, start, end + shift, tokens[:first], suffix)
+        return self.parse()
+
+    def _affected(self, start: int, stop: int) -> tuple[int, int]:
+        # the tokens touching the edited characters, with the ones just
+        # before and after so that literals can grow or merge
+        tokens = self.tokens
+        first = bisect_left(tokens, start, key=_POSITION)
+        if first < len(tokens) and self._end(first) < start:
+            first += 1
+        last = bisect_left(tokens, stop + 1, key=_POSITION)
+        if last < len(tokens) and self._end(last) == stop:
+            last += 1
+        return min(first, len(tokens) - 1), min(last, len(tokens) - 1)
+
+    def _end(self, index: int) -> int:
+        # literals and function names take the position of their follower,
+        # see Tokenizer
+        if index < 0:
+            return 0
+        token = self.tokens[index]
+        if (
+            isinstance(token, (Number, Variable, FunctionToken))
+            and index < len(self.tokens) - 1
+        ):
+            return token.position - 1
+        return token.position
+
+    def _forget(self, start: int, end: int, removed: set[int]):
+        for key, (opening, closing, _) in list(self._groups.items()):
+            if opening.position - 1 < end and closing.position > start:
+                del self._groups[key]
+        for key in removed & self._negatives.keys():
+            del self._negatives[key]
+
+    def _update(
+        self,
+        expression: str,
+        start: int,
+        stop: int | None,
+        prefix: list[Token],
+        suffix: Iterable[Token] = (),
+    ):
+        self.expression = expression
+        self.tree = None
+        self.error = None
+        scanned = []
+        try:
+            scanned.extend(Tokenizer(expression)._scan(start, stop))
+        except (RuntimeError, ValueError) as e:
+            # the parser of a full parse may stop on an earlier token than the
+            # tokenizer error, so the tokens are parsed up to it
+            self.tokens = None
+            self._groups.clear()
+            self._negatives.clear()
+            tokens = chain(prefix, scanned, _failing(e))
+            try:
+                Parser(tokens).parse()
+            except (RuntimeError, ValueError) as error:
+                self.error = error
+            return
+        prefix.extend(scanned)
+        prefix.extend(suffix)
+        self.tokens = prefix
+        try:
+            self.tree = _ReusingParser(self).parse()
+        except (RuntimeError, ValueError) as e:
+            self.error = e
+
+
+def _failing(error: Exception) -> Iterable[Token]:
+    raise error
+    yield
+
+
+class _ReusingParser(Parser):
+    def __init__(self, incremental: IncrementalParser):
+        super().__init__(incremental.tokens)
+        self._incremental = incremental
+
+    def _reused(
+        self, opening: OpenParenthesis
+    ) -> tuple[Evaluable, ClosedParenthesis] | None:
+        entry = self._incremental._groups.get(id(opening))
+        if entry is None or entry[0] is not opening:
+            return None
+        _, closing, group = entry
+        # nothing can come before an opening parenthesis in the same position,
+        # while literals share the position of the following closing one
+        tokens = self._incremental.tokens
+        first = bisect_left(tokens, opening.position, key=_POSITION)
+        last = bisect_right(tokens, closing.position, key=_POSITION) - 1
+        self._tokens.skip(last - first)
+        self._incremental.reused_groups += 1
+        return group, closing
+
+    def _closed(
+        self, opening: OpenParenthesis, closing: ClosedParenthesis, group: Evaluable
+    ):
+        self._incremental._groups[id(opening)] = (opening, closing, group)
+
+    def _operand(self, token: Token, inside_parenthesis: bool) -> Token:
+        operand = super()._operand(token, inside_parenthesis)
+        if operand is not token:
+            self._incremental._negatives[id(token)] = (token, operand)
+        return operand
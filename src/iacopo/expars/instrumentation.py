@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from typing import Callable
+
+from iacopo.expars import Call, Evaluable, Operation
+
+STAGES = ("tokenize", "parse", "optimize", "compile", "evaluate")
+
+
+class Measurement:
+    # what one Calculator.calculate call did. Stages that did not run, like
+    # parsing on a cache hit, are missing from seconds
+    __slots__ = ("expression", "seconds", "cached", "tokens", "nodes", "depth", "error")
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.seconds: dict[str, float] = {}
+        self.cached = True
+        self.tokens: int | None = None
+        self.nodes: int | None = None
+        self.depth: int | None = None
+        self.error: Exception | None = None
+
+    def __repr__(self):
+        stages = ", ".join(
+            f"{stage} {seconds:.6f}s" for stage, seconds in self.seconds.items()
+        )
+        return f"Measurement {self.expression!r}: {stages}"
+
+
+class Instrumentation:
+    # every listener is called with the Measurement of each calculation
+    def __init__(self, *listeners: Callable[[Measurement], None]):
+        self.listeners = list(listeners)
+
+    def add(self, listener: Callable[[Measurement], None]):
+        self.listeners.append(listener)
+
+    def remove(self, listener: Callable[[Measurement], None]):
+        self.listeners.remove(listener)
+
+    def emit(self, measurement: Measurement):
+        for listener in self.listeners:
+            listener(measurement)
+
+
+class MetricsRegistry:
+    # a listener adding up the measurements, safe to share between threads
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __call__(self, measurement: Measurement):
+        with self._lock:
+            self.calculations += 1
+            if measurement.cached:
+                self.cache_hits += 1
+            for stage, seconds in measurement.seconds.items():
+                self.counts[stage] += 1
+                self.seconds[stage] += seconds
+                self.slowest[stage] = max(self.slowest[stage], seconds)
+            if measurement.error is not None:
+                self.errors[type(measurement.error).__name__] += 1
+            if measurement.tokens is not None:
+                self.tokens += measurement.tokens
+            if measurement.nodes is not None:
+                self.nodes += measurement.nodes
+                self.deepest = max(self.deepest, measurement.depth)
+
+    def reset(self):
+        with self._lock:
+            self.calculations = 0
+            self.cache_hits = 0
+            self.counts = Counter()
+            self.seconds = Counter()
+            self.slowest = Counter()
+            self.errors = Counter()
+            self.tokens = 0
+            self.nodes = 0
+            self.deepest = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calculations": self.calculations,
+                "cache_hits": self.cache_hits,
+                "stages": {
+                    stage: {
+                        "count": self.counts[stage],
+                        "seconds": self.seconds[stage],
+                        "slowest": self.slowest[stage],
+                    }
+                    for stage in STAGES
+                    if self.counts[stage]
+                },
+                "errors": dict(self.errors),
+                "tokens": self.tokens,
+                "nodes": self.nodes,
+                "deepest": self.deepest,
+            }
+
+
+def tree_size(evaluable: Evaluable) -> tuple[int, int]:
+    # number of nodes and depth, a single node having depth 1
+    nodes = 0
+    deepest = 0
+    pending = [(evaluable, 1)]
+    while pending:
+        node, depth = pending.pop()
+        nodes += 1
+        deepest = max(deepest, depth)
+        if isinstance(node, Operation):
+            pending.append((node.left, depth + 1))
+            pending.append((node.right, depth + 1))
+        elif isinstance(node, Call):
+            pending.extend((argument, depth + 1) for argument in node.arguments)
+    return nodes, deepest
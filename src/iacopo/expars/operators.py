@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import math
+import operator as operators
+from typing import Callable, NamedTuple
+
+from iacopo.expars import Operator, Symbol
+
+
+class Definition(NamedTuple):
+    # precedence is the one of Operator.precedence, lower numbers bind tighter,
+    # and functions have none. An arity of None takes one or more arguments.
+    # vectorized is used by evaluate_vectorized, a numpy function or its name;
+    # without it function is called on every row
+    name: str
+    function: Callable[..., float]
+    arity: int | None = 2
+    precedence: int = 0
+    right_associative: bool = True
+    vectorized: Callable | str | None = None
+
+
+class CustomOperator(Symbol):
+    # a registered binary operator, it takes the place of an Operator in
+    # tokens and operations
+    __slots__ = ("symbol", "definition", "function")
+
+    def __init__(self, symbol: str, definition: Definition):
+        self.symbol = symbol
+        self.definition = definition
+        self.function = definition.function
+
+    @property
+    def value(self) -> str:
+        return self.symbol
+
+    def __repr__(self):
+        return f"Operator.{self.definition.name}"
+
+    def __reduce__(self):
+        return _registered, (self.symbol,)
+
+
+class Registry:
+    # operators by symbol and functions by name. The tokenizer reads these
+    # dictionaries directly, so registrations apply to the next parse
+    def __init__(self):
+        self.operators: dict[str, Operator | CustomOperator] = {}
+        self.functions: dict[str, Definition] = {}
+
+    def register_operator(
+        self,
+        symbol: str,
+        name: str,
+        function: Callable[[float, float], float],
+        precedence: int,
+        right_associative: bool = True,
+        vectorized: Callable | str | None = None,
+    ) -> CustomOperator:
+        if (
+            len(symbol) != 1
+            or symbol.isalnum()
+            or symbol.isspace()
+            or symbol in "_.(),"
+        ):
+            raise ValueError(f"Invalid operator symbol {symbol!r}")
+        if symbol in self.operators:
+            raise ValueError(f"Operator {symbol!r} is already registered")
+        if precedence < 1:
+            raise ValueError(f"Precedence must be at least 1, got {precedence}")
+        definition = Definition(
+            name, function, 2, precedence, right_associative, vectorized
+        )
+        operator = CustomOperator(symbol, definition)
+        self.operators[symbol] = operator
+        return operator
+
+    def register_function(
+        self,
+        name: str,
+        function: Callable[..., float],
+        arity: int | None = 1,
+        vectorized: Callable | str | None = None,
+    ) -> Definition:
+        if not (name.isascii() and name.isidentifier()):
+            raise ValueError(f"Invalid function name {name!r}")
+        if name in self.functions:
+            raise ValueError(f"Function {name!r} is already registered")
+        if arity is not None and arity < 1:
+            raise ValueError(f"Arity must be at least 1, got {arity}")
+        definition = Definition(name, function, arity, 0, True, vectorized)
+        self.functions[name] = definition
+        return definition
+
+    def registrations(self) -> tuple[list[tuple[str, Definition]], list[Definition]]:
+        # the definitions of the registered operators, by symbol, and of the
+        # functions, for register_missing in another process
+        operators = [
+            (symbol, operator.definition)
+            for symbol, operator in self.operators.items()
+            if isinstance(operator, CustomOperator)
+        ]
+        return operators, list(self.functions.values())
+
+    def register_missing(
+        self, registrations: tuple[list[tuple[str, Definition]], list[Definition]]
+    ):
+        # a spawned process starts with the built in operators and functions
+        # only, a forked one already has everything
+        operators, functions = registrations
+        for symbol, definition in operators:
+            if symbol not in self.operators:
+                self.register_operator(
+                    symbol,
+                    definition.name,
+                    definition.function,
+                    definition.precedence,
+                    definition.right_associative,
+                    definition.vectorized,
+                )
+        for definition in functions:
+            if definition.name not in self.functions:
+                self.functions[definition.name] = definition
+
+    def unregister(self, key: str):
+        # an operator symbol or a function name
+        if isinstance(self.operators.get(key), Operator):
+            raise ValueError(f"Built in operator {key!r} cannot be removed")
+        if (
+            self.operators.pop(key, None) is None
+            and self.functions.pop(key, None) is None
+        ):
+            raise KeyError(key)
+
+
+def _minimum(*values: float) -> float:
+    return min(values)
+
+
+def _maximum(*values: float) -> float:
+    return max(values)
+
+
+REGISTRY = Registry()
+for _operator, _function, _precedence, _vectorized in (
+    (Operator.PLUS, operators.add, 3, "add"),
+    (Operator.MINUS, operators.sub, 3, "subtract"),
+    (Operator.MULTIPLY, operators.mul, 2, "multiply"),
+    (Operator.DIVIDE, operators.truediv, 2, "divide"),
+    (Operator.POWER, math.pow, 1, "power"),
+):
+    _operator.definition = Definition(
+        _operator.name, _function, 2, _precedence, True, _vectorized
+    )
+    _operator.function = _function
+    REGISTRY.operators[_operator.value] = _operator
+REGISTRY.register_function("sqrt", math.sqrt, vectorized="sqrt")
+REGISTRY.register_function("abs", abs, vectorized="absolute")
+REGISTRY.register_function("min", _minimum, None, vectorized="minimum")
+REGISTRY.register_function("max", _maximum, None, vectorized="maximum")
+
+register_operator = REGISTRY.register_operator
+register_function = REGISTRY.register_function
+unregister = REGISTRY.unregister
+
+
+def _registered(symbol: str) -> CustomOperator:
+    return REGISTRY.operators[symbol]
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import math
+from operator import is_ as operator_is
+from typing import Mapping
+
+from iacopo.expars import Call, Evaluable, Number, Operation, Operator, Variable
+
+
+class Optimizer:
+    # folds constant operations and removes the identities that give the same
+    # IEEE result for every operand: x*1, 1*x, x/1, x-0, x+(-0) and (-0)+x.
+    # x+0 is kept because -0.0 + 0.0 is 0.0. Variables found in bindings are
+    # replaced by their value first, leaving a residual expression of the others
+    def __init__(self, bindings: Mapping[str, float] | None = None):
+        self.bindings = bindings or {}
+        self.removed_nodes = 0
+
+    def optimize(self, evaluable: Evaluable) -> Evaluable:
+        simplified = []
+        pending = [(evaluable, False)]
+        while pending:
+            node, visited = pending.pop()
+            match node:
+                case Operation() if visited:
+                    right = simplified.pop()
+                    left = simplified.pop()
+                    simplified.append(self._simplify(node, left, right))
+                case Operation():
+                    pending.append((node, True))
+                    pending.append((node.right, False))
+                    pending.append((node.left, False))
+                case Call() if visited:
+                    count = len(node.arguments)
+                    arguments = tuple(simplified[len(simplified) - count :])
+                    del simplified[len(simplified) - count :]
+                    simplified.append(self._simplify_call(node, arguments))
+                case Call():
+                    pending.append((node, True))
+                    pending.extend(
+                        (argument, False) for argument in reversed(node.arguments)
+                    )
+                case Variable() if node.name in self.bindings:
+                    value = float(self.bindings[node.name])
+                    simplified.append(Number(value, node.position))
+                case _:
+                    simplified.append(node)
+        return simplified.pop()
+
+    def _simplify(
+        self, operation: Operation, left: Evaluable, right: Evaluable
+    ) -> Evaluable:
+        operator = operation.operator
+        if isinstance(left, Number) and isinstance(right, Number):
+            folded = Operation(operator, left, right)
+            try:
+                value = folded.evaluate()
+            except Exception:
+                # left in place, so that the evaluation still raises
+                return folded
+            self.removed_nodes += 2
+            return Number(value, left.position)
+        if self._is_identity(operator, right, right_operand=True):
+            self.removed_nodes += 2
+            return left
+        if self._is_identity(operator, left, right_operand=False):
+            self.removed_nodes += 2
+            return right
+        if (
+            left is operation.left
+            and right is operation.right
+            and type(operation) is Operation
+        ):
+            return operation
+        # parenthesis only matter while parsing, the node is rebuilt as a plain one
+        return Operation(operator, left, right)
+
+    def _simplify_call(self, call: Call, arguments: tuple[Evaluable, ...]) -> Evaluable:
+        if all(isinstance(argument, Number) for argument in arguments):
+            folded = Call(call.definition, arguments)
+            try:
+                value = folded.evaluate()
+            except Exception:
+                return folded
+            self.removed_nodes += len(arguments)
+            return Number(value, arguments[0].position)
+        if all(map(operator_is, arguments, call.arguments)):
+            return call
+        return Call(call.definition, arguments)
+
+    @staticmethod
+    def _is_identity(operator: Operator, operand: Evaluable, right_operand: bool):
+        if not isinstance(operand, Number):
+            return False
+        value = operand.evaluate()
+        match operator:
+            case Operator.MULTIPLY:
+                return value == 1
+            case Operator.DIVIDE:
+                return right_operand and value == 1
+            case Operator.PLUS:
+                return value == 0 and math.copysign(1, value) < 0
+            case Operator.MINUS:
+                return right_operand and value == 0 and math.copysign(1, value) > 0
+        return False
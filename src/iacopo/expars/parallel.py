@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing import shared_memory
+from typing import Mapping, NamedTuple
+
+from iacopo.expars import Evaluable
+from iacopo.expars.columnar import OPERATION, OPERATORS, ColumnarTree
+from iacopo.expars.serialization import dump_columnar, load_columnar
+
+
+class Partition(NamedTuple):
+    # subtrees are (start, stop) ranges of ColumnarTree nodes, grouped in the
+    # tasks given to the workers. The nodes above them are joins, evaluated
+    # afterwards in the order of the columns
+    tasks: list[list[tuple[int, int]]]
+    joins: list[int]
+
+
+class ParallelEvaluator:
+    # Evaluates one large expression on several processes. The tree is cut in
+    # subtrees of about the same size which the workers evaluate, reading the
+    # columns from shared memory, then the operations joining them are
+    # evaluated here. Every operation gets the operands it gets in a serial
+    # evaluation, so the result is the same, and so is the error: the one of
+    # the first node failing in the order of the columns. The shared memory
+    # and the pool are created by the first parallel evaluation and kept until
+    # close, or the end of a with block. With a running pool an evaluation
+    # costs 3-11ms more than the serial one would on a single core, and the
+    # serial one takes about 0.7us per node: from the 50k nodes of the default
+    # threshold two workers save more than that.
+    def __init__(
+        self,
+        evaluable: Evaluable,
+        workers: int | None = None,
+        threshold: int = 50_000,
+        tasks_per_worker: int = 4,
+    ):
+        self.evaluable = evaluable
+        self.workers = workers or os.cpu_count() or 1
+        self.partition = None
+        self._memory = None
+        self._executor = None
+        self.tree = ColumnarTree.from_evaluable(evaluable, positions=True)
+        if self.workers > 1 and len(self.tree) >= threshold:
+            self.partition = partition(
+                self.tree, -(-len(self.tree) // (self.workers * tasks_per_worker))
+            )
+
+    def evaluate(self, bindings: Mapping[str, float] | None = None) -> float:
+        if self.partition is None or len(self.partition.tasks) <= 1:
+            return self.tree.evaluate(bindings)
+        if self._executor is None:
+            self._start()
+        outcomes = self._executor.map(
+            _evaluate_in_worker, self.partition.tasks, repeat(bindings)
+        )
+        return self._join(list(outcomes))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._memory is not None:
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+
+    def __enter__(self) -> ParallelEvaluator:
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _start(self):
+        data = dump_columnar(self.tree)
+        size = len(data)
+        self._memory = shared_memory.SharedMemory(create=True, size=size)
+        try:
+            self._memory.buf[:size] = data
+            del data
+            self._executor = ProcessPoolExecutor(
+                min(self.workers, len(self.partition.tasks)),
+                initializer=_start_worker,
+                initargs=(self._memory.name, size),
+            )
+        except BaseException:
+            self.close()
+            raise
+
+    def _join(self, outcomes: list[tuple[list[float], int | None, Exception]]):
+        results = {}
+        failed, error = len(self.tree), None
+        for task, (values, start, task_error) in zip(self.partition.tasks, outcomes):
+            for (_, stop), value in zip(task, values):
+                results[stop - 1] = value
+            if task_error is not None and start < failed:
+                failed, error = start, task_error
+        lefts = self.tree.lefts
+        rights = self.tree.rights
+        operators = self.tree.operators
+        for index in self.partition.joins:
+            # a subtree failing before this node fails first serially too
+            if failed < index:
+                raise error
+            function = OPERATORS[operators[index]].function
+            results[index] = function(results[lefts[index]], results[rights[index]])
+        if error is not None:
+            raise error
+        return results[len(self.tree) - 1]
+
+
+def partition(tree: ColumnarTree, size: int) -> Partition:
+    # The nodes of a subtree are contiguous and its root is the last one, the
+    # left subtree is right before the right one, so the ranges of the
+    # children follow from the one of their parent. Subtrees no larger than
+    # size are kept whole and consecutive ones are grouped up to size nodes.
+    subtrees = []
+    joins = []
+    kinds = tree.kinds
+    lefts = tree.lefts
+    pending = [(0, len(tree))]
+    while pending:
+        start, stop = pending.pop()
+        root = stop - 1
+        if stop - start <= size or kinds[root] != OPERATION:
+            subtrees.append((start, stop))
+            continue
+        joins.append(root)
+        left = lefts[root]
+        pending.append((left + 1, root))
+        pending.append((start, left + 1))
+    subtrees.sort()
+    joins.sort()
+    tasks = []
+    task, task_size = [], 0
+    for start, stop in subtrees:
+        if task and task_size + stop - start > size:
+            tasks.append(task)
+            task, task_size = [], 0
+        task.append((start, stop))
+        task_size += stop - start
+    tasks.append(task)
+    return Partition(tasks, joins)
+
+
+_worker_memory: shared_memory.SharedMemory | None = None
+_worker_tree: ColumnarTree | None = None
+
+
+def _start_worker(name: str, size: int):
+    global _worker_memory, _worker_tree
+    # the pool shares the resource tracker of the parent, which unlinks the
+    # memory once
+    _worker_memory = shared_memory.SharedMemory(name=name)
+    _worker_tree = load_columnar(_worker_memory.buf[:size], check=False)
+
+
+def _evaluate_in_worker(
+    task: list[tuple[int, int]], bindings: Mapping[str, float] | None
+) -> tuple[list[float], int | None, Exception | None]:
+    # the values of the subtrees until the first failing one, with its start
+    values = []
+    for start, stop in task:
+        try:
+            values.append(_worker_tree.evaluate(bindings, start, stop))
+        except Exception as e:
+            return values, start, e
+    return values, None, None
@@ -1,6 +1,12 @@
+from __future__ import annotations
+
+from itertools import islice
 from typing import Iterable
 
 from iacopo.expars import (
+    Call,
+    Comma,
+    FunctionToken,
     Token,
     Operation,
     Number,
@@ -10,12 +16,185 @@ from iacopo.expars import (
     ClosedParenthesis,
     Evaluable,
     ParenthesisOperation,
+    Variable,
 )
 from iacopo.expars.exceptions import UnexpectedTokenError, IncompleteExpressionError
 from iacopo.expars.utils import PeekIterator
 
 
 class Parser:
+    # Same grammar and error reporting as RecursiveParser, but the operands of
+    # every parenthesis level are kept on an explicit stack of frames, so the
+    # nesting depth and the length of the expression do not use Python stack.
+    # Function calls are frames too, holding the arguments parsed so far.
+    def __init__(self, tokens: Iterable[Token]):
+        self._tokens = PeekIterator(tokens)
+
+    def parse(self) -> Evaluable:
+        tokens = self._tokens
+        frames = []
+        operands, operators = [], []
+        token = self._next(None)
+        while True:
+            token = self._operand(token, inside_parenthesis=bool(frames))
+            if isinstance(token, FunctionToken):
+                opening = self._next(token)
+                frames.append((operands, operators, opening, (token.definition, [])))
+                operands, operators = [], []
+                token = self._next(opening)
+                continue
+            operand = token
+            if isinstance(token, OpenParenthesis):
+                reused = self._reused(token)
+                if reused is None:
+                    frames.append((operands, operators, token, None))
+                    operands, operators = [], []
+                    token = self._next(token)
+                    continue
+                operand, token = reused
+            operands.append(operand)
+            while True:
+                if not tokens.has_next():
+                    result = self._fold(operands, operators, bool(frames))
+                    while frames:
+                        operands, operators, _, call = frames.pop()
+                        if call is not None:
+                            result = self._call(call, result, token, closing=False)
+                        operands.append(result)
+                        result = self._fold(operands, operators, bool(frames))
+                    return result
+                token = next(tokens)
+                if isinstance(token, ClosedParenthesis):
+                    if not frames:
+                        raise UnexpectedTokenError(token)
+                    result = self._fold(operands, operators, True)
+                    operands, operators, opening, call = frames.pop()
+                    if call is None:
+                        self._closed(opening, token, result)
+                    else:
+                        result = self._call(call, result, token, closing=True)
+                    operands.append(result)
+                elif isinstance(token, OperatorToken):
+                    operators.append(token.operator)
+                    token = self._next(token)
+                    break
+                elif isinstance(token, Comma) and frames and frames[-1][3]:
+                    definition, arguments = frames[-1][3]
+                    if definition.arity is not None and len(arguments) + 1 >= (
+                        definition.arity
+                    ):
+                        raise UnexpectedTokenError(token)
+                    arguments.append(self._fold(operands, operators, True))
+                    operands, operators = [], []
+                    token = self._next(token)
+                    break
+                else:
+                    raise UnexpectedTokenError(token)
+
+    def _reused(
+        self, opening: OpenParenthesis
+    ) -> tuple[Evaluable, ClosedParenthesis] | None:
+        # subclasses can return an already parsed group with its closing
+        # parenthesis, after consuming its tokens up to it
+        return None
+
+    def _closed(
+        self, opening: OpenParenthesis, closing: ClosedParenthesis, group: Evaluable
+    ):
+        pass
+
+    def _next(self, previous: Token | None) -> Token:
+        try:
+            return next(self._tokens)
+        except StopIteration:
+            raise IncompleteExpressionError(previous) from None
+
+    def _operand(self, token: Token, inside_parenthesis: bool) -> Token:
+        tokens = self._tokens
+        if (
+            tokens.has_next()
+            and RecursiveParser._is_minus(token)
+            and isinstance(tokens.peek(), Number)
+        ):
+            token = Number(-next(tokens).value, token.position)
+        if isinstance(token, (OperatorToken, ClosedParenthesis, Comma)):
+            raise UnexpectedTokenError(token)
+        # we need either zero or more than one token after an operand
+        if tokens.has_next():
+            next_ = tokens.peek(0)
+            try:
+                tokens.peek(1)
+            except StopIteration:
+                if isinstance(next_, ClosedParenthesis):
+                    if inside_parenthesis:
+                        return token
+                    raise UnexpectedTokenError(next_)
+                raise IncompleteExpressionError(next_)
+        return token
+
+    @staticmethod
+    def _call(call: tuple, argument: Evaluable, last: Token, closing: bool) -> Call:
+        # the missing arguments of a call closed by the end of the expression
+        # are reported as an incomplete expression
+        definition, arguments = call
+        arguments.append(argument)
+        if definition.arity is not None and len(arguments) != definition.arity:
+            if closing:
+                raise UnexpectedTokenError(last)
+            raise IncompleteExpressionError(last)
+        return Call(definition, tuple(arguments))
+
+    def _fold(
+        self, operands: list, operators: list, inside_parenthesis: bool
+    ) -> Evaluable:
+        # inside parenthesis, and in the arguments of calls, there is no
+        # precedence and operations are grouped from the right; outside
+        # operators are applied by precedence, equal ones grouped from the
+        # right unless left associative
+        if inside_parenthesis:
+            product = operands[-1]
+            for index in range(len(operators) - 1, -1, -1):
+                product = self._build_operation(
+                    operators[index], operands[index], product, True
+                )
+            return product
+        if not operators:
+            return operands[0]
+        values = [operands[0]]
+        pending = []
+        for operand, operator in zip(islice(operands, 1, None), operators):
+            definition = operator.definition
+            while pending and (
+                pending[-1].definition.precedence < definition.precedence
+                or (
+                    pending[-1].definition.precedence == definition.precedence
+                    and not definition.right_associative
+                )
+            ):
+                right = values.pop()
+                values[-1] = self._build_operation(
+                    pending.pop(), values[-1], right, False
+                )
+            pending.append(operator)
+            values.append(operand)
+        while pending:
+            right = values.pop()
+            values[-1] = self._build_operation(pending.pop(), values[-1], right, False)
+        return values[0]
+
+    @staticmethod
+    def _build_operation(
+        operator: Operator,
+        left: Evaluable,
+        right: Evaluable,
+        inside_parenthesis: bool,
+    ) -> Evaluable:
+        if inside_parenthesis:
+            return ParenthesisOperation(operator, left, right)
+        return Operation(operator, left, right)
+
+
+class RecursiveParser:
     def __init__(self, tokens: Iterable[Token], inside_parenthesis=False):
         self._tokens = PeekIterator(tokens)
         self._current_token = None
@@ -35,7 +214,7 @@ class Parser:
         return self._complete_expression(left)
 
     def _parse_parenthesis(self):
-        inner_parser = Parser(self._tokens, inside_parenthesis=True)
+        inner_parser = RecursiveParser(self._tokens, inside_parenthesis=True)
         left = inner_parser.parse()
         self._tokens = inner_parser._tokens
         return left
@@ -44,8 +223,8 @@ class Parser:
         if isinstance(self._current_token, OperatorToken):
             # expression cannot start with a token
             raise UnexpectedTokenError(self._current_token)
-        # now current_token is a number
-        assert isinstance(self._current_token, (Number, OpenParenthesis))
+        # now current_token is a number or a variable
+        assert isinstance(self._current_token, (Number, Variable, OpenParenthesis))
         # we need either zero or more than one token after a number or a parenthesis
         if self._tokens.has_next():
             next_ = self._tokens.peek(0)
@@ -0,0 +1,395 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from array import array
+from typing import Callable, Iterable, Iterator, Mapping, Sequence
+
+from iacopo.expars import Evaluable
+from iacopo.expars.columnar import (
+    CALL,
+    OPERATION,
+    OPERATORS,
+    REGISTERED,
+    VARIABLE,
+    ColumnarTree,
+)
+from iacopo.expars.exceptions import FormatError
+from iacopo.expars.operators import REGISTRY, CustomOperator
+
+# A tree is a header followed by its ColumnarTree columns, the eight byte
+# ones first so that they stay aligned:
+#   magic, version, flags, node count, argument count, names size,
+#   registered names size, crc32 of what follows
+#   values (d), positions (i), lefts (i), rights (i), arguments (i), kinds (B),
+#   operators (B), variable names and then the names of the functions and
+#   registered operators, as UTF-8 separated by NUL
+# Functions and registered operators are found by name in the registry when
+# the tree is loaded, they must be registered by then.
+# A collection is a header, the end offset of every tree and of every key,
+# the keys as UTF-8 and then the trees, each starting on a multiple of 8:
+#   magic, version, flags, count, keys size, crc32 of offsets and keys
+# Flags and the last four header bytes are reserved and must be zero.
+FORMAT_VERSION = 2
+
+_TREE = struct.Struct("<4sHHIIIIII")
+_COLLECTION = struct.Struct("<4sHHIIII")
+_TREE_MAGIC = b"XPRT"
+_COLLECTION_MAGIC = b"XPRC"
+
+
+def dumps(evaluable: Evaluable) -> bytes:
+    return dump_columnar(ColumnarTree.from_evaluable(evaluable, positions=True))
+
+
+def dump_columnar(tree: ColumnarTree) -> bytes:
+    # the tree must keep its positions
+    names = "\0".join(tree.names).encode()
+    registered = "\0".join(tree.registered).encode()
+    payload = b"".join(
+        (
+            tree.values.tobytes(),
+            tree.positions.tobytes(),
+            tree.lefts.tobytes(),
+            tree.rights.tobytes(),
+            tree.arguments.tobytes(),
+            tree.kinds.tobytes(),
+            tree.operators.tobytes(),
+            names,
+            registered,
+        )
+    )
+    header = _TREE.pack(
+        _TREE_MAGIC,
+        FORMAT_VERSION,
+        0,
+        len(tree),
+        len(tree.arguments),
+        len(names),
+        len(registered),
+        zlib.crc32(payload),
+        0,
+    )
+    return header + payload
+
+
+def loads(data) -> Evaluable:
+    return load_columnar(data).to_evaluable()
+
+
+def load_columnar(data, check: bool = True) -> ColumnarTree:
+    # the columns are views on data, nothing is copied. Without check the
+    # checksum and the nodes are not verified, only for data that was never
+    # out of our hands
+    view = memoryview(data).cast("B")
+    if len(view) < _TREE.size:
+        raise FormatError("Truncated expression header")
+    (
+        magic,
+        version,
+        flags,
+        nodes,
+        arguments_count,
+        names_size,
+        registered_size,
+        checksum,
+        reserved,
+    ) = _TREE.unpack_from(view)
+    _check(magic, _TREE_MAGIC, version, flags | reserved)
+    payload = view[_TREE.size :]
+    if len(payload) != _tree_size(nodes, arguments_count, names_size, registered_size):
+        raise FormatError(
+            f"Expected {nodes} nodes, {arguments_count} arguments and"
+            f" {names_size + registered_size} bytes of names"
+        )
+    if check and zlib.crc32(payload) != checksum:
+        raise FormatError("Checksum mismatch, the expression is corrupted")
+    columns = []
+    start = 0
+    for code, count in (
+        ("d", nodes),
+        ("i", nodes),
+        ("i", nodes),
+        ("i", nodes),
+        ("i", arguments_count),
+        ("B", nodes),
+        ("B", nodes),
+    ):
+        stop = start + count * array(code).itemsize
+        columns.append(payload[start:stop].cast(code))
+        start = stop
+    values, positions, lefts, rights, arguments, kinds, operators = columns
+    try:
+        names = _split(payload[start : start + names_size])
+        registered = _split(payload[start + names_size :])
+    except UnicodeDecodeError:
+        raise FormatError("Invalid names") from None
+    if check:
+        _validate(
+            kinds, operators, lefts, rights, values, arguments, len(names), registered
+        )
+    return ColumnarTree(
+        kinds,
+        operators,
+        lefts,
+        rights,
+        values,
+        names,
+        positions,
+        arguments,
+        registered,
+    )
+
+
+def _tree_size(nodes: int, arguments: int, names: int, registered: int) -> int:
+    # the bytes of a tree after its header
+    return nodes * 22 + arguments * 4 + names + registered
+
+
+def _split(names: memoryview) -> list[str]:
+    return str(names, "utf-8").split("\0") if names else []
+
+
+def _validate(
+    kinds, operators, lefts, rights, values, arguments, names: int, registered
+):
+    # a checksum only catches accidents, any tree decoded here must be safe
+    # to evaluate
+    if not kinds:
+        raise FormatError("An expression needs at least one node")
+    for index, kind in enumerate(kinds):
+        if kind == OPERATION or kind == REGISTERED:
+            if not (0 <= lefts[index] < index and 0 <= rights[index] < index):
+                raise FormatError(f"Node {index} uses a node that comes after it")
+            if kind == OPERATION and operators[index] >= len(OPERATORS):
+                raise FormatError(f"Node {index} has an unknown operator")
+            if kind == REGISTERED:
+                _registered_operator(registered, values[index], index)
+        elif kind == VARIABLE:
+            if not 0 <= values[index] < names:
+                raise FormatError(f"Node {index} uses an unknown variable")
+        elif kind == CALL:
+            start, count = lefts[index], rights[index]
+            if not (0 <= start and 0 < count and start + count <= len(arguments)):
+                raise FormatError(f"Node {index} has invalid arguments")
+            if not all(0 <= argument < index for argument in arguments[start:][:count]):
+                raise FormatError(f"Node {index} uses a node that comes after it")
+            definition = _registered_function(registered, values[index], index)
+            if definition.arity is not None and definition.arity != count:
+                raise FormatError(
+                    f"Node {index} calls {definition.name} with {count} arguments,"
+                    f" it takes {definition.arity}"
+                )
+        elif kind > REGISTERED:
+            raise FormatError(f"Node {index} has an unknown kind")
+
+
+def _registered_function(registered: list[str], value: float, index: int):
+    if not 0 <= value < len(registered):
+        raise FormatError(f"Node {index} uses an unknown name")
+    name = registered[int(value)]
+    definition = REGISTRY.functions.get(name)
+    if definition is None:
+        raise FormatError(
+            f"Unknown function {name!r}, it must be registered before loading"
+        )
+    return definition
+
+
+def _registered_operator(registered: list[str], value: float, index: int):
+    if not 0 <= value < len(registered):
+        raise FormatError(f"Node {index} uses an unknown name")
+    symbol = registered[int(value)]
+    if not isinstance(REGISTRY.operators.get(symbol), CustomOperator):
+        raise FormatError(
+            f"Unknown operator {symbol!r}, it must be registered before loading"
+        )
+
+
+def _check(magic: bytes, expected: bytes, version: int, reserved: int):
+    if magic != expected:
+        raise FormatError("Not a serialized expression")
+    if version != FORMAT_VERSION:
+        raise FormatError(
+            f"Format version {version}, this version reads {FORMAT_VERSION}"
+        )
+    if reserved:
+        raise FormatError("Reserved header fields are set")
+
+
+def dump_collection(
+    entries: Mapping[str, Evaluable] | Iterable[tuple[str, Evaluable]],
+) -> bytes:
+    if isinstance(entries, Mapping):
+        entries = entries.items()
+    tree_ends = array("Q")
+    key_ends = array("Q")
+    keys = []
+    trees = []
+    size = 0
+    keys_size = 0
+    for key, evaluable in entries:
+        tree = dumps(evaluable)
+        tree += bytes(-len(tree) % 8)
+        trees.append(tree)
+        size += len(tree)
+        tree_ends.append(size)
+        encoded = key.encode()
+        keys.append(encoded)
+        keys_size += len(encoded)
+        key_ends.append(keys_size)
+    keys.append(bytes(-keys_size % 8))
+    index = tree_ends.tobytes() + key_ends.tobytes() + b"".join(keys)
+    header = _COLLECTION.pack(
+        _COLLECTION_MAGIC,
+        FORMAT_VERSION,
+        0,
+        len(trees),
+        keys_size,
+        zlib.crc32(index),
+        0,
+    )
+    return header + index + b"".join(trees)
+
+
+class Collection(Mapping):
+    # a read only mapping from keys to expressions over a buffer written by
+    # dump_collection. Opening only checks the index, every tree is checked
+    # and decoded when it is read
+    def __init__(self, data):
+        view = memoryview(data).cast("B")
+        if len(view) < _COLLECTION.size:
+            raise FormatError("Truncated collection header")
+        magic, version, flags, count, keys_size, checksum, reserved = (
+            _COLLECTION.unpack_from(view)
+        )
+        _check(magic, _COLLECTION_MAGIC, version, flags | reserved)
+        keys_start = _COLLECTION.size + 16 * count
+        trees_start = keys_start + keys_size + (-keys_size % 8)
+        if len(view) < trees_start:
+            raise FormatError("Truncated collection index")
+        if zlib.crc32(view[_COLLECTION.size : trees_start]) != checksum:
+            raise FormatError("Checksum mismatch, the collection index is corrupted")
+        self._tree_ends = view[_COLLECTION.size : _COLLECTION.size + 8 * count].cast(
+            "Q"
+        )
+        self._key_ends = view[_COLLECTION.size + 8 * count : keys_start].cast("Q")
+        if count and (
+            self._key_ends[-1] != keys_size
+            or trees_start + self._tree_ends[-1] != len(view)
+        ):
+            raise FormatError("The collection index does not match its size")
+        self._keys_view = view[keys_start : keys_start + keys_size]
+        self._trees = view[trees_start:]
+        self._view = view
+        self._index: dict[str, int] | None = None
+
+    def tree(self, index: int) -> Evaluable:
+        return loads(self._tree_view(index))
+
+    def columnar(self, index: int) -> ColumnarTree:
+        return load_columnar(self._tree_view(index))
+
+    def key(self, index: int) -> str:
+        start = self._key_ends[index - 1] if index > 0 else 0
+        try:
+            return str(self._keys_view[start : self._key_ends[index]], "utf-8")
+        except UnicodeDecodeError:
+            raise FormatError(f"Invalid key {index}") from None
+
+    def release(self):
+        # the buffer, an mmap for instance, can be closed only after this
+        for view in (self._tree_ends, self._key_ends, self._keys_view, self._trees):
+            view.release()
+        self._view.release()
+
+    def _tree_view(self, index: int) -> memoryview:
+        if not -len(self) <= index < len(self):
+            raise IndexError(f"Collection index {index} out of range")
+        index %= len(self)
+        start = self._tree_ends[index - 1] if index > 0 else 0
+        end = self._tree_ends[index]
+        # trees are padded to 8 bytes, the header gives their real size
+        tree = self._trees[start:end]
+        if len(tree) < _TREE.size:
+            raise FormatError(f"Truncated expression {index}")
+        size = _tree_size(*_TREE.unpack_from(tree)[3:7])
+        return tree[: min(len(tree), _TREE.size + size)]
+
+    def __getitem__(self, key: str) -> Evaluable:
+        if self._index is None:
+            self._index = {self.key(index): index for index in range(len(self))}
+        return self.tree(self._index[key])
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.key(index) for index in range(len(self)))
+
+    def __len__(self):
+        return len(self._tree_ends)
+
+
+class DiskCache:
+    # Parsed expression libraries stored in directory, one file per library
+    # named after the hash of its expressions. Later loads of the same
+    # expressions map that file instead of parsing; a corrupted file or one
+    # of another format version is written again.
+    def __init__(self, directory: str, parse: Callable[[str], Evaluable] | None = None):
+        if parse is None:
+            from iacopo.expars.calculator import Calculator
+
+            parse = Calculator.parse
+        self.directory = directory
+        self.parse = parse
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, expressions: Sequence[str]) -> Collection:
+        # trees come in the order of expressions, collection.tree(index)
+        path = self.path(expressions)
+        try:
+            collection = self._map(path)
+            if len(collection) == len(expressions):
+                self.hits += 1
+                return collection
+            collection.release()
+        except (OSError, ValueError):
+            pass
+        self.misses += 1
+        data = dump_collection(
+            (expression, self.parse(expression)) for expression in expressions
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(data)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        return Collection(data)
+
+    def path(self, expressions: Sequence[str]) -> str:
+        digest = hashlib.sha256(f"{FORMAT_VERSION}".encode())
+        for expression in expressions:
+            digest.update(expression.encode())
+            digest.update(b"\0")
+        return os.path.join(self.directory, f"{digest.hexdigest()}.xprc")
+
+    @staticmethod
+    def _map(path: str) -> Collection:
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return Collection(mapped)
+        except ValueError:
+            try:
+                mapped.close()
+            except BufferError:
+                # views still held by the traceback, closed once collected
+                pass
+            raise
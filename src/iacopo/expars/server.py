@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Mapping
+
+from iacopo.expars.calculator import Calculator, CalculationResult
+from iacopo.expars.exceptions import ProtocolError, check_bindings, describe, respond
+
+# Newline delimited JSON over TCP or a Unix socket. Every request is a line
+#   {"id": 1, "expression": "price*qty", "bindings": {"price": 2, "qty": 3}}
+# answered by a line with the same id and either "value" or "error":
+#   {"id": 1, "value": 6.0}
+#   {"id": 2, "error": {"type": "NumberFormatError", "message": ..., "position": 6}}
+# JSON has no infinity or nan: they are rejected in requests, and results
+# that are not finite are answered with a NonFiniteResultError.
+# {"id": 3, "command": "stats"} is answered with {"id": 3, "stats": {...}}.
+# Malformed requests are answered with a ProtocolError. A line longer than
+# max_line bytes is answered with one as well, then the connection is closed
+# as the rest of that line cannot be told apart from the next request.
+# Responses on the same connection are written as soon as they are ready, so
+# they can come back in a different order than the requests.
+
+
+class EvaluationServer:
+    def __init__(
+        self,
+        calculator: Calculator | None = None,
+        max_batch: int = 256,
+        batch_delay: float = 0.001,
+        executor: Executor | None = None,
+        latency_window: int = 10000,
+        max_line: int = 1 << 20,
+    ):
+        # batches run in a pool, by default a single process so that they
+        # share one parse cache and keep the event loop free. The pool gets
+        # the settings of calculator and every process builds its own from
+        # them; an executor passed here is not shut down by close. The
+        # default process is spawned, a forked one would inherit the open
+        # connections and keep them from closing
+        self.calculator = calculator or Calculator()
+        self.max_batch = max_batch
+        self.batch_delay = batch_delay
+        self.max_line = max_line
+        self._owns_executor = executor is None
+        self._executor = executor or ProcessPoolExecutor(
+            1, mp_context=multiprocessing.get_context("spawn")
+        )
+        self._caches: dict[int, dict[str, int]] = {}
+        self._latencies = deque(maxlen=latency_window)
+        self._queue: asyncio.Queue | None = None
+        self._batcher: asyncio.Task | None = None
+        self._servers: list[asyncio.AbstractServer] = []
+        self.requests = 0
+        self.batches = 0
+        self.in_flight = 0
+
+    async def start_tcp(self, host: str = "127.0.0.1", port: int = 0):
+        self._start_batcher()
+        server = await asyncio.start_server(
+            self._serve, host, port, limit=self.max_line
+        )
+        self._servers.append(server)
+        return server.sockets[0].getsockname()
+
+    async def start_unix(self, path: str) -> str:
+        self._start_batcher()
+        server = await asyncio.start_unix_server(self._serve, path, limit=self.max_line)
+        self._servers.append(server)
+        return path
+
+    async def close(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers.clear()
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+
+    async def evaluate(
+        self, expression: str, bindings: Mapping[str, float] | None = None
+    ) -> CalculationResult:
+        self._start_batcher()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((expression, bindings, future))
+        return await future
+
+    def statistics(self) -> dict:
+        latencies = sorted(self._latencies)
+        statistics = {
+            "requests": self.requests,
+            "batches": self.batches,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "in_flight": self.in_flight,
+            "latency_ms": {
+                f"p{percentile}": self._percentile(latencies, percentile) * 1000
+                for percentile in (50, 90, 99)
+            },
+        }
+        if self.calculator.cache is not None:
+            # summed over the processes that ran batches
+            statistics["cache"] = cache = dict.fromkeys(
+                ("size", "hits", "misses", "evictions", "expirations"), 0
+            )
+            for process in self._caches.values():
+                for key, value in process.items():
+                    cache[key] += value
+        return statistics
+
+    def _start_batcher(self):
+        if self._batcher is None:
+            self._queue = asyncio.Queue()
+            self._batcher = asyncio.create_task(self._run_batches())
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(batch) < self.max_batch:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self._queue.get_nowait())
+            self.batches += 1
+            self.in_flight = len(batch)
+            work = [(expression, bindings) for expression, bindings, _ in batch]
+            try:
+                results, process, cache = await loop.run_in_executor(
+                    self._executor,
+                    _calculate_batch,
+                    self.calculator._settings(),
+                    work,
+                )
+            except Exception as e:
+                # a broken pool or unpicklable bindings fail this batch only.
+                # The traceback holds the frame of this loop, clearing it
+                # from a caller would close the batcher
+                e = e.with_traceback(None)
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self.in_flight = 0
+            if cache is not None:
+                self._caches[process] = cache
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        lock = asyncio.Lock()
+        pending = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    error = ProtocolError(
+                        f"a request is longer than {self.max_line} bytes"
+                    )
+                    await self._write(
+                        {"id": None, "error": describe(error)}, writer, lock
+                    )
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self._answer(line, writer, lock))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            # the requests read so far are still answered
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+
+    async def _answer(self, line: bytes, writer: asyncio.StreamWriter, lock):
+        started = time.perf_counter()
+        response = await self._respond(line)
+        await self._write(response, writer, lock)
+        self._latencies.append(time.perf_counter() - started)
+
+    @staticmethod
+    async def _write(response: dict, writer: asyncio.StreamWriter, lock):
+        async with lock:
+            writer.write(json.dumps(response, allow_nan=False).encode() + b"\n")
+            await writer.drain()
+
+    async def _respond(self, line: bytes) -> dict:
+        try:
+            request = json.loads(line, parse_constant=_reject_constant)
+            if not isinstance(request, dict):
+                raise ProtocolError("a request must be a JSON object")
+        except ValueError as e:
+            return {"id": None, "error": describe(ProtocolError(str(e)))}
+        identifier = request.get("id")
+        if request.get("command") == "stats":
+            return {"id": identifier, "stats": self.statistics()}
+        try:
+            expression, bindings = _parse_request(request)
+        except ProtocolError as e:
+            return {"id": identifier, "error": describe(e)}
+        self.requests += 1
+        result = await self.evaluate(expression, bindings)
+        return {"id": identifier, **respond(*result)}
+
+    @staticmethod
+    def _percentile(values: list[float], percentile: int) -> float:
+        if not values:
+            return 0.0
+        rank = max(0, -(-len(values) * percentile // 100) - 1)
+        return values[rank]
+
+
+def _parse_request(request: dict) -> tuple[str, dict | None]:
+    # the expression and the bindings of an evaluation request
+    expression = request.get("expression")
+    if not isinstance(expression, str):
+        raise ProtocolError("missing expression")
+    return expression, check_bindings(request.get("bindings"))
+
+
+def _reject_constant(constant: str):
+    raise ValueError(f"{constant} is not valid JSON")
+
+
+_calculators: dict[tuple, Calculator] = {}
+
+
+def _calculate_batch(
+    settings: dict, work: list[tuple[str, Mapping[str, float] | None]]
+) -> tuple[list[CalculationResult], int, dict[str, int] | None]:
+    # runs in the pool, every process keeps one calculator per settings so
+    # that its batches share a parse cache. Returns the results with the
+    # process and its cache statistics
+    key = tuple(sorted(settings.items()))
+    calculator = _calculators.get(key)
+    if calculator is None:
+        calculator = _calculators.setdefault(key, Calculator(**settings))
+    calculate = calculator.calculate_safely
+    results = [calculate(expression, bindings) for expression, bindings in work]
+    cache = calculator.cache.statistics() if calculator.cache is not None else None
+    return results, os.getpid(), cache
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Callable, Mapping
+
+from iacopo.expars import Call, Evaluable, Operation, Variable
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.exceptions import CycleError
+
+
+class FormulaGraph:
+    # Named formulas that can use each other's names as variables, and named
+    # input values. After a change only the formulas downstream of it are
+    # evaluated again, in dependency order, and a formula whose inputs kept
+    # their values is not evaluated at all.
+    def __init__(self, calculator: Calculator | None = None):
+        self.calculator = calculator or Calculator()
+        self.values: dict[str, float] = {}
+        self.errors: dict[str, Exception] = {}
+        self.evaluated = 0
+        self._formulas: dict[str, Callable[..., float]] = {}
+        self._expressions: dict[str, str] = {}
+        self._dependencies: dict[str, frozenset[str]] = {}
+        self._dependents: dict[str, set[str]] = {}
+
+    def set_formula(self, name: str, expression: str) -> int:
+        evaluable = self.calculator.parse(expression)
+        dependencies = frozenset(_names(evaluable))
+        self._check_cycle(name, dependencies)
+        prepared = self.calculator.prepare_tree(evaluable, len(expression))
+        self._unlink(name)
+        self._formulas[name] = prepared
+        self._expressions[name] = expression
+        self._dependencies[name] = dependencies
+        for dependency in dependencies:
+            self._dependents.setdefault(dependency, set()).add(name)
+        return self._recompute([name], changed=set(), forced={name})
+
+    def set_value(self, name: str, value: float) -> int:
+        return self.update({name: value})
+
+    def update(self, values: Mapping[str, float]) -> int:
+        # returns how many formulas were evaluated again
+        changed = set()
+        for name, value in values.items():
+            if name in self._formulas:
+                raise ValueError(f"'{name}' is a formula, not an input")
+            if name not in self.values or self.values[name] != value:
+                self.values[name] = value
+                changed.add(name)
+        return self._recompute(changed, changed, forced=set())
+
+    def remove(self, name: str) -> int:
+        self._unlink(name)
+        self._formulas.pop(name, None)
+        self._expressions.pop(name, None)
+        self.errors.pop(name, None)
+        if name not in self.values:
+            return 0
+        del self.values[name]
+        return self._recompute([name], {name}, forced=set())
+
+    def expression(self, name: str) -> str:
+        return self._expressions[name]
+
+    def __getitem__(self, name: str) -> float:
+        if name in self.errors:
+            raise self.errors[name].with_traceback(None)
+        return self.values[name]
+
+    def __contains__(self, name: str):
+        return name in self._formulas or name in self.values
+
+    def __len__(self):
+        return len(self._formulas)
+
+    def _unlink(self, name: str):
+        for dependency in self._dependencies.pop(name, ()):
+            dependents = self._dependents[dependency]
+            dependents.discard(name)
+            if not dependents:
+                del self._dependents[dependency]
+
+    def _check_cycle(self, name: str, dependencies: frozenset[str]):
+        # a cycle exists if a dependency is downstream of name, searched from
+        # name as new formulas usually have no dependents yet
+        if name in dependencies:
+            raise CycleError([name, name])
+        parents = {name: None}
+        pending = deque([name])
+        while pending:
+            current = pending.popleft()
+            for dependent in self._dependents.get(current, ()):
+                if dependent in parents:
+                    continue
+                parents[dependent] = current
+                if dependent in dependencies:
+                    path = [name]
+                    while dependent is not None:
+                        path.append(dependent)
+                        dependent = parents[dependent]
+                    raise CycleError(path)
+                pending.append(dependent)
+
+    def _recompute(self, sources, changed: set[str], forced: set[str]) -> int:
+        # the formulas downstream of sources, in topological order; a formula
+        # is evaluated only if it is forced or one of its dependencies changed
+        affected = set()
+        pending = list(sources)
+        while pending:
+            for dependent in self._dependents.get(pending.pop(), ()):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    pending.append(dependent)
+        affected.update(source for source in sources if source in self._formulas)
+        waiting = {name: len(self._dependencies[name] & affected) for name in affected}
+        ready = deque(name for name, count in waiting.items() if count == 0)
+        evaluated = 0
+        while ready:
+            name = ready.popleft()
+            if name in forced or not changed.isdisjoint(self._dependencies[name]):
+                evaluated += 1
+                if self._evaluate(name):
+                    changed.add(name)
+            for dependent in self._dependents.get(name, ()):
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    ready.append(dependent)
+        self.evaluated += evaluated
+        return evaluated
+
+    def _evaluate(self, name: str) -> bool:
+        # returns whether the value of the formula changed
+        previous = self.values.get(name)
+        had_value = name in self.values
+        had_error = self.errors.pop(name, None) is not None
+        try:
+            value = self._formulas[name](self.values)
+        except Exception as e:
+            # like Calculator.calculate_safely, math functions raise ValueError
+            self.errors[name] = e
+            self.values.pop(name, None)
+            return not had_error
+        self.values[name] = value
+        return had_error or not had_value or previous != value
+
+
+def _names(evaluable: Evaluable) -> set[str]:
+    names = set()
+    pending = [evaluable]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, Operation):
+            pending.append(node.left)
+            pending.append(node.right)
+        elif isinstance(node, Call):
+            pending.extend(node.arguments)
+        elif isinstance(node, Variable):
+            names.add(node.name)
+    return names
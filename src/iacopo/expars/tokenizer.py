@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import codecs
+import re
 from abc import ABC
-from typing import Tuple, Iterable
+from typing import Tuple, Iterable, Iterator, NamedTuple
 
 from iacopo.expars import (
     Token,
@@ -10,12 +12,21 @@ from iacopo.expars import (
     Operator,
     Digit,
     Dot,
+    Letter,
     Number,
+    Variable,
     OperatorToken,
     OpenParenthesis,
     ClosedParenthesis,
+    Comma,
+    FunctionToken,
 )
-from iacopo.expars.exceptions import NumberFormatError, UnexpectedTokenError
+from iacopo.expars.exceptions import (
+    NumberFormatError,
+    UnexpectedTokenError,
+    UnexpectedCharacterError,
+)
+from iacopo.expars.operators import REGISTRY
 
 
 class Status(ABC):
@@ -34,6 +45,8 @@ class BaseStatus(Status):
                 return OperatorToken(Operator(symbol.value), position), self, True
             case Digit() | Dot():
                 return None, NumberParsingStatus(symbol.value), True
+            case Letter():
+                return None, IdentifierParsingStatus(symbol.value), True
             case ClosedParenthesis() | OpenParenthesis() as parenthesis:
                 parenthesis.position = position
                 return parenthesis, self, True
@@ -63,19 +76,64 @@ class NumberParsingStatus(Status):
             case OpenParenthesis() as open_parenthesis:
                 open_parenthesis.position = position
                 raise UnexpectedTokenError(open_parenthesis)
+            case Letter():
+                raise UnexpectedCharacterError(position, symbol.value)
 
     def finalize(self, position) -> Token | None:
         return Number(float(self.accumulator), position)
 
 
+class IdentifierParsingStatus(Status):
+    def __init__(self, first_value):
+        self.accumulator = first_value
+
+    def analyse(
+        self, symbol: Symbol, position: int
+    ) -> Tuple[Token | None, Status | None, bool]:
+        match symbol:
+            case Letter() | Digit():
+                self.accumulator += symbol.value
+                return None, self, True
+            case Operator() | ClosedParenthesis():
+                return self.finalize(position), BaseStatus(), False
+            case OpenParenthesis() as open_parenthesis:
+                open_parenthesis.position = position
+                raise UnexpectedTokenError(open_parenthesis)
+            case Dot():
+                raise UnexpectedCharacterError(position, symbol.value)
+
+    def finalize(self, position) -> Token | None:
+        return Variable(self.accumulator, position)
+
+
+_NUMBER = re.compile(r"[0-9.]+")
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+# the registry dictionaries themselves, so that registered operators and
+# functions are recognized
+_OPERATORS = REGISTRY.operators
+_FUNCTIONS = REGISTRY.functions
+
+
 class Tokenizer:
-    def __init__(self, expression: str):
+    # offset is added to every position, for expressions that are a slice of
+    # a longer input. The state machine only reads the built in operators, not
+    # registered ones nor function calls
+    def __init__(self, expression: str, state_machine: bool = False, offset: int = 0):
         self.expression = expression
+        self.state_machine = state_machine
+        self.offset = offset
 
     def tokenize(self) -> Iterable[Token]:
+        if self.state_machine:
+            return self._run_state_machine()
+        return self._scan()
+
+    def _run_state_machine(self) -> Iterable[Token]:
         current_status = BaseStatus()
-        for position, char in enumerate(self.expression):
+        for position, char in enumerate(self.expression, self.offset):
             symbol = CharacterParser.parse_char(char)
+            if symbol is None:
+                raise UnexpectedCharacterError(position + 1, char)
             processed = False
             while not processed:
                 token, current_status, processed = current_status.analyse(
@@ -85,6 +143,149 @@ class Tokenizer:
                     yield token
 
         if current_status:
-            last = current_status.finalize(len(self.expression))
+            last = current_status.finalize(self.offset + len(self.expression))
             if last is not None:
                 yield last
+
+    def _scan(self, start: int = 0, stop: int | None = None) -> Iterable[Token]:
+        # same tokens and positions as the state machine, but numbers are read
+        # as a whole slice instead of one Digit symbol at a time. start and
+        # stop must fall between two tokens
+        for token in scan(self.expression, start, stop, self.offset):
+            if token.__class__ is LexicalError:
+                raise token.error
+            yield token
+
+
+class LexicalError(NamedTuple):
+    # an error met by scan and the position a diagnostic reports it at
+    error: Exception
+    position: int
+
+
+def scan(
+    expression: str, start: int = 0, stop: int | None = None, offset: int = 0
+) -> Iterator[Token | LexicalError]:
+    # The tokens of expression between start and stop, and a LexicalError
+    # before the token that the error was met producing. Scanning carries on
+    # after an error: a bad character is skipped, a number with two dots ends
+    # at the second one and a literal is kept whatever follows it. A character
+    # that cannot follow a literal is reported once, not again as a token
+    size = len(expression)
+    length = size if stop is None else stop
+    match_number = _NUMBER.match
+    match_identifier = _IDENTIFIER.match
+    operators = _OPERATORS
+    reported = None
+    index = start
+    while index < length:
+        char = expression[index]
+        index += 1
+        operator = operators.get(char)
+        if operator is not None:
+            yield OperatorToken(operator, offset + index)
+        elif char == "(":
+            yield OpenParenthesis(offset + index)
+        elif char == ")":
+            yield ClosedParenthesis(offset + index)
+        elif char == ",":
+            yield Comma(offset + index)
+        elif (literal := match_number(expression, index - 1)) is not None:
+            literal_start, index = literal.span()
+            text = literal.group()
+            dots = text.count(".")
+            if dots > 1:
+                second_dot = text.index(".", text.index(".") + 1)
+                position = offset + literal_start + second_dot + 1
+                error = NumberFormatError(position, "Unexpected '.'")
+                yield LexicalError(error, position)
+                text = text[:second_dot]
+            # like the state machine, literals take the position of the
+            # character that ends them, or the length of the expression
+            position = offset + index
+            if index < size:
+                position += 1
+                follower = expression[index]
+                if follower != ")" and follower != "," and follower not in operators:
+                    reported = position
+                    yield LexicalError(_follower_error(follower, position), position)
+            if text == ".":
+                if dots > 1:
+                    yield Number(0.0, position)
+                    continue
+                # float() fails without a position, the end of the literal is
+                # used instead
+                message = "could not convert string to float: '.'"
+                yield LexicalError(ValueError(message), offset + index)
+                yield Number(0.0, position)
+                continue
+            yield Number(float(text), position)
+        elif (literal := match_identifier(expression, index - 1)) is not None:
+            index = literal.end()
+            name = literal.group()
+            position = offset + index
+            if index < size:
+                position += 1
+                follower = expression[index]
+                if follower == "(" and name in _FUNCTIONS:
+                    # a call, the name takes the position of its parenthesis
+                    yield FunctionToken(_FUNCTIONS[name], position)
+                    continue
+                if follower != ")" and follower != "," and follower not in operators:
+                    reported = position
+                    yield LexicalError(_follower_error(follower, position), position)
+            yield Variable(name, position)
+        elif offset + index != reported:
+            position = offset + index
+            yield LexicalError(UnexpectedCharacterError(position, char), position)
+
+
+def _follower_error(follower: str, position: int) -> Exception:
+    # for a character that cannot follow a literal
+    if follower == "(":
+        return UnexpectedTokenError(OpenParenthesis(position))
+    return UnexpectedCharacterError(position, follower)
+
+
+class StreamTokenizer:
+    # Same tokens and positions as Tokenizer, read chunk by chunk from a text
+    # or binary stream, a string or a bytes like buffer such as a memoryview or
+    # an mmap. Bytes are decoded as UTF-8 one chunk at a time, so positions
+    # count characters. Only the literal at the end of a chunk is carried over
+    # to the next one.
+    def __init__(self, source, chunk_size: int = 1 << 16):
+        if chunk_size < 1:
+            raise ValueError(f"Chunk size must be positive, got {chunk_size}")
+        self.source = source
+        self.chunk_size = chunk_size
+
+    def tokenize(self) -> Iterator[Token]:
+        offset = 0
+        carry = ""
+        boundaries = (*_OPERATORS, "(", ")", ",")
+        for chunk in self._chunks():
+            text = carry + chunk
+            # tokens up to the last operator or parenthesis are complete, and
+            # so are the positions of literals, that depend on their follower
+            split = max(map(text.rfind, boundaries)) + 1
+            yield from Tokenizer(text, offset=offset)._scan(0, split)
+            carry = text[split:]
+            offset += split
+        yield from Tokenizer(carry, offset=offset)._scan()
+
+    def _chunks(self) -> Iterator[str]:
+        source = self.source
+        size = self.chunk_size
+        if isinstance(source, str):
+            for start in range(0, len(source), size):
+                yield source[start : start + size]
+            return
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        if hasattr(source, "read"):
+            while chunk := source.read(size):
+                yield chunk if isinstance(chunk, str) else decoder.decode(chunk)
+        else:
+            with memoryview(source) as view, view.cast("B") as data:
+                for start in range(0, len(data), size):
+                    yield decoder.decode(data[start : start + size])
+        yield decoder.decode(b"", final=True)
@@ -1,4 +1,5 @@
 from collections import deque
+from itertools import islice
 
 
 #  https://stackoverflow.com/a/59903465/349620
@@ -21,8 +22,17 @@ class PeekIterator:
         return self.peeked[ahead]
 
     def has_next(self):
+        if self.peeked:
+            return True
         try:
             self.peek()
             return True
         except StopIteration:
             return False
+
+    def skip(self, count):
+        while count and self.peeked:
+            self.peeked.popleft()
+            count -= 1
+        if count:
+            next(islice(self.iterator, count - 1, None), None)
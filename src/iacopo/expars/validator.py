@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+from typing import Iterable, NamedTuple
+
+from iacopo.expars import (
+    Token,
+    Number,
+    Variable,
+    Operator,
+    OperatorToken,
+    OpenParenthesis,
+    ClosedParenthesis,
+    Comma,
+    FunctionToken,
+)
+from iacopo.expars.exceptions import UnexpectedTokenError, IncompleteExpressionError
+from iacopo.expars.tokenizer import scan
+
+NUMBER = 0
+VARIABLE = 1
+OPERATOR = 2
+OPEN = 3
+CLOSE = 4
+COMMA = 5
+FUNCTION = 6
+
+_KINDS = {
+    Number: NUMBER,
+    Variable: VARIABLE,
+    OperatorToken: OPERATOR,
+    OpenParenthesis: OPEN,
+    ClosedParenthesis: CLOSE,
+    Comma: COMMA,
+    FunctionToken: FUNCTION,
+}
+
+
+class Diagnostic(NamedTuple):
+    position: int
+    kind: str
+    message: str
+
+
+class Validator:
+    # Checks expressions without building trees or raising. Diagnostics come
+    # in the order a parse would meet them, so the first one is the error that
+    # Parser(Tokenizer(expression).tokenize()).parse() raises. After an error
+    # the validator carries on: bad characters are skipped, a missing operator
+    # is assumed and unexpected tokens are dropped. Later diagnostics at the
+    # position of an earlier one are left out.
+    def validate(self, expression: str) -> list[Diagnostic]:
+        tokens, lexical = self._lex(expression)
+        diagnostics = []
+        positions = set()
+        flushed = 0
+        count = len(tokens)
+
+        def reach(index: int):
+            # the parser asks for the token at index, so the tokenizer reports
+            # every error found before producing it
+            nonlocal flushed
+            while flushed < len(lexical) and lexical[flushed][0] <= index:
+                diagnostic = lexical[flushed][1]
+                diagnostics.append(diagnostic)
+                positions.add(diagnostic.position)
+                flushed += 1
+
+        def report(error: Exception):
+            if error.position not in positions:
+                positions.add(error.position)
+                diagnostics.append(
+                    Diagnostic(error.position, type(error).__name__, str(error))
+                )
+
+        reach(0)
+        if not tokens:
+            report(IncompleteExpressionError(None))
+            return diagnostics
+        # None for a parenthesis, [definition, arguments before the last one]
+        # for a call
+        frames = []
+        index = 0
+        # the last token consumed, as the parser sees it
+        last = None
+        operand = True
+        while True:
+            if operand:
+                reach(index + 1)
+                token = tokens[index]
+                kind = token[0]
+                if (
+                    kind == OPERATOR
+                    and token[2] is Operator.MINUS
+                    and index + 1 < count
+                    and tokens[index + 1][0] == NUMBER
+                ):
+                    index += 1
+                    token = (NUMBER, token[1], -tokens[index][2])
+                    kind = NUMBER
+                    reach(index + 1)
+                if kind == OPERATOR or kind == CLOSE or kind == COMMA:
+                    report(UnexpectedTokenError(self._token(token)))
+                    if kind == CLOSE and frames:
+                        frames.pop()
+                        last = token
+                        operand = False
+                        continue
+                    index += 1
+                    reach(index)
+                    if index == count:
+                        report(IncompleteExpressionError(self._token(token)))
+                        break
+                    continue
+                if index + 1 < count:
+                    reach(index + 2)
+                    if index + 2 == count:
+                        follower = tokens[index + 1]
+                        if follower[0] != CLOSE:
+                            report(IncompleteExpressionError(self._token(follower)))
+                        elif not frames:
+                            report(UnexpectedTokenError(self._token(follower)))
+                if kind == OPEN or kind == FUNCTION:
+                    if kind == FUNCTION:
+                        # the tokenizer makes sure that a parenthesis follows
+                        frames.append([token[2], 0])
+                        index += 1
+                    else:
+                        frames.append(None)
+                    index += 1
+                    reach(index)
+                    if index == count:
+                        report(IncompleteExpressionError(self._token(tokens[-1])))
+                        break
+                    continue
+                last = token
+                operand = False
+                continue
+            reach(index + 1)
+            if index + 1 == count:
+                # unclosed calls are closed by the end of the expression
+                while frames:
+                    if self._wrong_arity(frames.pop()):
+                        report(IncompleteExpressionError(self._token(last)))
+                break
+            index += 1
+            token = tokens[index]
+            kind = token[0]
+            if kind == CLOSE:
+                if not frames or self._wrong_arity(frames.pop()):
+                    report(UnexpectedTokenError(self._token(token)))
+                last = token
+                continue
+            if kind == COMMA and frames and frames[-1] is not None:
+                definition, arguments = frames[-1]
+                if definition.arity is not None and arguments + 1 >= definition.arity:
+                    report(UnexpectedTokenError(self._token(token)))
+                frames[-1][1] += 1
+            elif kind != OPERATOR:
+                # a missing operator, the token is read as the next operand
+                # and a comma as an operator
+                report(UnexpectedTokenError(self._token(token)))
+                if kind != COMMA:
+                    operand = True
+                    continue
+            index += 1
+            reach(index)
+            if index == count:
+                report(IncompleteExpressionError(self._token(token)))
+                break
+            operand = True
+        return diagnostics
+
+    @staticmethod
+    def _wrong_arity(frame: list | None) -> bool:
+        # for a call closed after its last argument
+        if frame is None or frame[0].arity is None:
+            return False
+        return frame[1] + 1 != frame[0].arity
+
+    def validate_many(self, expressions: Iterable[str]) -> list[list[Diagnostic]]:
+        return [self.validate(expression) for expression in expressions]
+
+    @staticmethod
+    def _token(token: tuple) -> Token:
+        # only built for the messages of diagnostics
+        kind, position, payload = token
+        match kind:
+            case 0:
+                return Number(payload, position)
+            case 1:
+                return Variable(payload, position)
+            case 2:
+                return OperatorToken(payload, position)
+            case 3:
+                return OpenParenthesis(position)
+            case 4:
+                return ClosedParenthesis(position)
+            case 5:
+                return Comma(position)
+        return FunctionToken(payload, position)
+
+    @staticmethod
+    def _lex(expression: str) -> tuple[list[tuple], list[tuple[int, Diagnostic]]]:
+        # the tokens of scan as (kind, position, value) tuples, and its errors
+        # with the index of the token it was producing
+        tokens = []
+        errors = []
+        kinds = _KINDS
+        for token in scan(expression):
+            kind = kinds.get(token.__class__)
+            if kind is None:
+                error, position = token
+                diagnostic = Diagnostic(position, type(error).__name__, str(error))
+                errors.append((len(tokens), diagnostic))
+                continue
+            match kind:
+                case 0:
+                    value = token.value
+                case 1:
+                    value = token.name
+                case 2:
+                    value = token.operator
+                case 6:
+                    value = token.definition
+                case _:
+                    value = None
+            tokens.append((kind, token.position, value))
+        return tokens, errors
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import random
+
+LITERALS = ("integer", "decimal", "negative", "variable", "mixed")
+
+
+class ExpressionGenerator:
+    # valid expressions with an exact number of operands and parenthesis
+    # nesting depth; the same seed always gives the same expressions
+    def __init__(
+        self,
+        seed: int = 0,
+        operators: str = "+-*/",
+        literals: str = "mixed",
+        variables: int = 10,
+    ):
+        if literals not in LITERALS:
+            raise ValueError(
+                f"Unknown literal format {literals}, use one of {LITERALS}"
+            )
+        self._random = random.Random(seed)
+        self.operators = operators
+        self.literals = literals
+        self.bindings = {f"x{index}": float(index + 1) for index in range(variables)}
+        self._names = list(self.bindings)
+
+    def generate(self, operands: int, depth: int = 0) -> str:
+        # operands are spread over depth + 1 levels, each level but the
+        # innermost one holds the previous level as a parenthesis group
+        if operands < 1 or depth < 0:
+            raise ValueError("At least one operand and a non negative depth are needed")
+        levels = depth + 1
+        counts = [operands // levels] * levels
+        for index in range(operands % levels):
+            counts[index] += 1
+        text = self._chain([self._literal() for _ in range(max(counts[0], 1))])
+        for count in counts[1:]:
+            items = [self._literal() for _ in range(count)]
+            items.insert(self._random.randint(0, count), f"({text})")
+            text = self._chain(items)
+        return text
+
+    def _chain(self, items: list[str]) -> str:
+        parts = [items[0]]
+        for item in items[1:]:
+            parts.append(self._random.choice(self.operators))
+            parts.append(item)
+        return "".join(parts)
+
+    def _literal(self) -> str:
+        literals = self.literals
+        if literals == "mixed":
+            literals = self._random.choice(LITERALS[:-1])
+        match literals:
+            case "integer":
+                return str(self._random.randint(1, 99))
+            case "decimal":
+                return f"{self._random.uniform(0.001, 99):.3f}"
+            case "negative":
+                return f"-{self._random.randint(1, 99)}"
+            case "variable":
+                return self._random.choice(self._names)
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import NamedTuple
+
+# what a short lived command imports, and what none of it should import
+MODULES = (
+    "iacopo.expars",
+    "iacopo.expars.tokenizer",
+    "iacopo.expars.parser",
+    "iacopo.expars.calculator",
+    "iacopo.expars.cli",
+)
+HEAVY = ("pydantic", "numpy", "multiprocessing", "concurrent.futures", "asyncio")
+
+_SCRIPT = """
+{imports}
+import resource, sys
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, *sorted(
+    name for name in {heavy!r} if name in sys.modules
+))
+"""
+
+
+class Budget(NamedTuple):
+    # above a bare interpreter, the median wall time of python -c "import ..."
+    # and its peak resident memory
+    seconds: float = 0.15
+    memory: int = 8 << 20
+
+
+def launch(module: str | None) -> tuple[float, int, list[str]]:
+    # seconds and peak resident bytes of a fresh interpreter importing module,
+    # and the heavy modules it imported
+    script = _SCRIPT.format(imports=f"import {module}" if module else "", heavy=HEAVY)
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=environment,
+    ).stdout
+    elapsed = time.perf_counter() - started
+    kilobytes, *heavy = output.split()
+    return elapsed, int(kilobytes) * 1024, heavy
+
+
+def run(modules=MODULES, repeat: int = 5) -> dict:
+    # medians over repeat launches, with the bare interpreter subtracted
+    def median(module):
+        launches = [launch(module) for _ in range(repeat)]
+        return (
+            statistics.median(seconds for seconds, _, _ in launches),
+            statistics.median(memory for _, memory, _ in launches),
+            launches[0][2],
+        )
+
+    bare_seconds, bare_memory, _ = median(None)
+    results = {}
+    for module in modules:
+        seconds, memory, heavy = median(module)
+        results[module] = {
+            "seconds": max(seconds - bare_seconds, 0.0),
+            "memory": max(memory - bare_memory, 0),
+            "heavy": heavy,
+        }
+    return results
+
+
+def check(results: dict, budget: Budget = Budget()) -> list[str]:
+    problems = []
+    for module, result in results.items():
+        if result["heavy"]:
+            problems.append(f"{module} imports {', '.join(result['heavy'])}")
+        if result["seconds"] > budget.seconds:
+            problems.append(
+                f"{module} takes {result['seconds'] * 1e3:.0f}ms to import,"
+                f" the budget is {budget.seconds * 1e3:.0f}ms"
+            )
+        if result["memory"] > budget.memory:
+            problems.append(
+                f"{module} adds {result['memory'] >> 10}KB of memory,"
+                f" the budget is {budget.memory >> 10}KB"
+            )
+    return problems
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmark.startup",
+        description="Time and memory of importing the package in a fresh interpreter",
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    arguments = parser.parse_args(argv)
+    results = run(repeat=arguments.repeat)
+    for module, result in results.items():
+        print(
+            f"{module:<26} {result['seconds'] * 1e3:6.1f}ms {result['memory'] >> 10:6}KB"
+        )
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(results, file, indent=2)
+    problems = check(results)
+    for problem in problems:
+        print(f"OVER BUDGET {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, NamedTuple
+
+from benchmark.generators import ExpressionGenerator
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.parser import Parser
+from iacopo.expars.tokenizer import Tokenizer
+
+FORMAT_VERSION = 1
+STAGES = ("tokenize", "parse", "evaluate", "calculate")
+
+
+class Case(NamedTuple):
+    name: str
+    operands: int
+    depth: int = 0
+    operators: str = "+-*/"
+    literals: str = "mixed"
+
+
+# the evaluation of a tree is recursive, so chains stay below the default
+# recursion limit
+CASES = (
+    Case("short", 5),
+    Case("medium", 100),
+    Case("long", 400),
+    Case("nested", 100, depth=30),
+    Case("deep", 200, depth=150),
+    Case("sums", 200, operators="+-"),
+    Case("products", 200, operators="*/"),
+    Case("integers", 200, literals="integer"),
+    Case("decimals", 200, literals="decimal"),
+    Case("variables", 200, literals="variable"),
+)
+
+
+def measure(function: Callable[[], object], repeat: int, budget: float) -> float:
+    # median seconds per call, each of the repeat rounds running enough
+    # calls to last about budget seconds
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - started
+        if elapsed >= budget or number >= 1 << 20:
+            break
+        number *= 2
+    rounds = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        rounds.append((time.perf_counter() - started) / number)
+    return statistics.median(rounds)
+
+
+def run_case(case: Case, seed: int, repeat: int, budget: float) -> dict:
+    generator = ExpressionGenerator(seed, case.operators, case.literals)
+    expression = generator.generate(case.operands, case.depth)
+    bindings = generator.bindings
+    tokens = list(Tokenizer(expression).tokenize())
+    tree = Parser(tokens).parse()
+    calculator = Calculator(cache_size=0)
+    stages = {
+        "tokenize": lambda: list(Tokenizer(expression).tokenize()),
+        "parse": lambda: Parser(tokens).parse(),
+        "evaluate": lambda: tree.evaluate(bindings),
+        "calculate": lambda: calculator.calculate(expression, bindings),
+    }
+    result = {
+        **case._asdict(),
+        "characters": len(expression),
+        "tokens": len(tokens),
+        "seconds": {},
+    }
+    for stage, function in stages.items():
+        try:
+            result["seconds"][stage] = measure(function, repeat, budget)
+        except ArithmeticError:
+            # a random division by a value close to zero can overflow
+            result["seconds"][stage] = None
+    tracemalloc.start()
+    try:
+        calculator.calculate(expression, bindings)
+    except ArithmeticError:
+        pass
+    result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result
+
+
+def run(cases=CASES, seed: int = 0, repeat: int = 5, budget: float = 0.05) -> dict:
+    return {
+        "version": FORMAT_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "cases": [run_case(case, seed, repeat, budget) for case in cases],
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.1) -> list[str]:
+    # stages slower than the baseline by more than threshold, and peak
+    # memory grown by more than threshold
+    if baseline.get("version") != current.get("version"):
+        raise ValueError("The baseline was written by another version of the suite")
+    previous = {case["name"]: case for case in baseline["cases"]}
+    regressions = []
+    for case in current["cases"]:
+        old = previous.get(case["name"])
+        if old is None:
+            continue
+        measures = [
+            (f"{stage} time", case["seconds"][stage], old["seconds"].get(stage))
+            for stage in STAGES
+        ]
+        measures.append(("peak memory", case["peak_memory"], old["peak_memory"]))
+        for label, value, reference in measures:
+            if value is None or not reference:
+                continue
+            ratio = value / reference
+            if ratio > 1 + threshold:
+                regressions.append(f"{case['name']} {label}: {ratio:.2f}x the baseline")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmark",
+        description="Time tokenizer, parser, evaluation and calculator on generated expressions",
+    )
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("-c", "--compare", help="baseline JSON file to compare with")
+    parser.add_argument("-t", "--threshold", type=float, default=0.1)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument(
+        "-b", "--budget", type=float, default=0.05, help="seconds per round"
+    )
+    parser.add_argument("-k", "--cases", nargs="*", help="names of the cases to run")
+    arguments = parser.parse_args(argv)
+    cases = [
+        case for case in CASES if not arguments.cases or case.name in arguments.cases
+    ]
+    results = run(cases, arguments.seed, arguments.repeat, arguments.budget)
+    for case in results["cases"]:
+        timings = " ".join(
+            f"{stage}={seconds * 1e6:.1f}us" if seconds is not None else f"{stage}=-"
+            for stage, seconds in case["seconds"].items()
+        )
+        print(
+            f"{case['name']:<10} {case['tokens']:>6} tokens {timings} peak={case['peak_memory']}B"
+        )
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if not arguments.compare:
+        return 0
+    with open(arguments.compare) as file:
+        regressions = compare(results, json.load(file), arguments.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
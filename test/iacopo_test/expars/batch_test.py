@@ -0,0 +1,114 @@
+import math
+import pickle
+import unittest
+
+from iacopo.expars import OperatorToken, Operator
+from iacopo.expars.calculator import Calculator, CalculationResult, _start_worker
+from iacopo.expars.exceptions import (
+    NumberFormatError,
+    UnexpectedTokenError,
+    UnexpectedCharacterError,
+    IncompleteExpressionError,
+    UnboundVariableError,
+)
+from iacopo.expars.operators import REGISTRY, register_function, register_operator
+
+
+class BatchTestCase(unittest.TestCase):
+    EXPRESSIONS = ["1+2", "0.000.1", "(1+2))", "x*2", "1/0", "2*(3+4)", "1+"]
+
+    def test_serial(self):
+        results = Calculator().calculate_many(self.EXPRESSIONS, {"x": 4}, workers=1)
+        self._check(results)
+
+    def test_parallel(self):
+        expressions = self.EXPRESSIONS * 50
+        results = Calculator(compiled=True).calculate_many(
+            expressions, {"x": 4}, workers=2, chunksize=16
+        )
+        self.assertEqual(len(expressions), len(results))
+        for start in range(0, len(expressions), len(self.EXPRESSIONS)):
+            self._check(results[start : start + len(self.EXPRESSIONS)])
+
+    def test_empty(self):
+        self.assertEqual([], Calculator().calculate_many([], workers=4))
+
+    def test_chunksize(self):
+        with self.assertRaisesRegex(ValueError, "Chunk size"):
+            Calculator().calculate_many(["1"], chunksize=0)
+
+    def test_settings(self):
+        # an empty cache is falsy, the workers must still get one
+        settings = Calculator(cache_size=8, cache_ttl=2)._settings()
+        self.assertEqual((8, 2), (settings["cache_size"], settings["cache_ttl"]))
+
+    def test_errors_can_be_pickled(self):
+        errors = [
+            NumberFormatError(3, "Unexpected '.'"),
+            UnexpectedCharacterError(2, " "),
+            UnexpectedTokenError(OperatorToken(Operator.MINUS, 4)),
+            IncompleteExpressionError(OperatorToken(Operator.PLUS, 2)),
+            IncompleteExpressionError(None),
+            UnboundVariableError(1, "x"),
+            _error("(1)max(2)"),
+            _error("max(1)sqrt(4)"),
+        ]
+        for error in errors:
+            copy = pickle.loads(pickle.dumps(error))
+            self.assertIs(type(error), type(copy))
+            self.assertEqual(str(error), str(copy))
+            self.assertEqual(error.position, copy.position)
+
+    def test_registered_functions(self):
+        # the token of the second error holds the lambda, which does not pickle
+        register_function("twice", lambda value: 2 * value)
+        self.addCleanup(REGISTRY.unregister, "twice")
+        expressions = [")twice(", "(1)twice(2)", "twice(x)", "1+"] * 20
+        results = Calculator().calculate_many(
+            expressions, {"x": 4}, workers=2, chunksize=4
+        )
+        self.assertEqual(len(expressions), len(results))
+        for start in range(0, len(expressions), 4):
+            parenthesis, function, value, _ = results[start : start + 4]
+            self.assertEqual(
+                "Unexpected token ')' at character 1", str(parenthesis.error)
+            )
+            self.assertIsInstance(function.error, UnexpectedTokenError)
+            self.assertEqual(
+                "Unexpected token 'twice' at character 9", str(function.error)
+            )
+            self.assertEqual(9, function.error.position)
+            self.assertEqual(8.0, value.value)
+
+    def test_workers_get_registrations(self):
+        # what a spawned worker does, in a process that lost them
+        register_operator("%", "MODULO", math.fmod, 2, right_associative=False)
+        register_function("hypot", math.hypot, 2)
+        registrations = pickle.loads(pickle.dumps(REGISTRY.registrations()))
+        REGISTRY.unregister("%")
+        REGISTRY.unregister("hypot")
+        _start_worker(Calculator()._settings(), None, registrations)
+        self.addCleanup(REGISTRY.unregister, "%")
+        self.addCleanup(REGISTRY.unregister, "hypot")
+        self.assertEqual(1, Calculator().calculate("hypot(3,4)%2"))
+        _start_worker(Calculator()._settings(), None, registrations)
+
+    def _check(self, results):
+        self.assertEqual(CalculationResult(3.0), results[0])
+        self.assertIsInstance(results[1].error, NumberFormatError)
+        self.assertEqual(6, results[1].error.position)
+        self.assertIsInstance(results[2].error, UnexpectedTokenError)
+        self.assertEqual(6, results[2].error.position)
+        self.assertEqual(8.0, results[3].value)
+        self.assertIsInstance(results[4].error, ZeroDivisionError)
+        self.assertEqual(14.0, results[5].value)
+        self.assertIsNone(results[5].error)
+        self.assertIsInstance(results[6].error, IncompleteExpressionError)
+        self.assertEqual(2, results[6].error.position)
+
+
+def _error(expression):
+    try:
+        Calculator.parse(expression)
+    except Exception as e:
+        return e
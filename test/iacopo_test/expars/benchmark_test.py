@@ -0,0 +1,49 @@
+import copy
+import unittest
+
+from benchmark.generators import ExpressionGenerator
+from benchmark.suite import Case, compare, run
+from iacopo.expars import Operation, ParenthesisOperation
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.parser import Parser
+from iacopo.expars.tokenizer import Tokenizer
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    def test_generator_is_seeded(self):
+        first = ExpressionGenerator(7).generate(50, 5)
+        self.assertEqual(first, ExpressionGenerator(7).generate(50, 5))
+        self.assertNotEqual(first, ExpressionGenerator(8).generate(50, 5))
+
+    def test_generated_shape(self):
+        for literals in ("integer", "decimal", "negative", "variable", "mixed"):
+            generator = ExpressionGenerator(1, "+*", literals)
+            expression = generator.generate(40, 6)
+            self.assertEqual(6, expression.count("("))
+            self.assertNotIn("/", expression)
+            tree = Parser(Tokenizer(expression).tokenize()).parse()
+            self.assertEqual(40, self._leaves(tree))
+            Calculator().calculate(expression, generator.bindings)
+
+    def test_compare(self):
+        baseline = run([Case("tiny", 3)], repeat=1, budget=0.001)
+        current = copy.deepcopy(baseline)
+        self.assertEqual([], compare(current, baseline))
+        current["cases"][0]["seconds"]["parse"] *= 2
+        regressions = compare(current, baseline)
+        self.assertEqual(1, len(regressions))
+        self.assertIn("tiny parse time", regressions[0])
+        current["version"] = 0
+        self.assertRaises(ValueError, compare, current, baseline)
+
+    @staticmethod
+    def _leaves(tree):
+        leaves = 0
+        pending = [tree]
+        while pending:
+            node = pending.pop()
+            if isinstance(node, (Operation, ParenthesisOperation)):
+                pending.extend((node.left, node.right))
+            else:
+                leaves += 1
+        return leaves
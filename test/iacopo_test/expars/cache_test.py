@@ -0,0 +1,105 @@
+import unittest
+
+from iacopo.expars.cache import ParseCache
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.exceptions import NumberFormatError
+from iacopo.expars.instrumentation import Instrumentation
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ParseCacheTestCase(unittest.TestCase):
+    def test_hit_and_miss(self):
+        cache = ParseCache(maxsize=2)
+        self.assertEqual("A", cache.get("a", str.upper))
+        self.assertEqual("A", cache.get("a", self._fail))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+    def test_least_recently_used_eviction(self):
+        cache = ParseCache(maxsize=2)
+        cache.get("a", str.upper)
+        cache.get("b", str.upper)
+        cache.get("a", str.upper)
+        cache.get("c", str.upper)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.evictions)
+
+    def test_ttl(self):
+        clock = FakeClock()
+        cache = ParseCache(maxsize=2, ttl=10, clock=clock)
+        cache.get("a", str.upper)
+        clock.now = 9.5
+        cache.get("a", self._fail)
+        clock.now = 10
+        self.assertEqual("A", cache.get("a", str.upper))
+        self.assertEqual(
+            {"size": 1, "hits": 1, "misses": 2, "evictions": 0, "expirations": 1},
+            cache.statistics(),
+        )
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            ParseCache(maxsize=0)
+
+    def test_calculator_reuses_parsed_expressions(self):
+        calculator = Calculator(cache_size=8)
+        for _ in range(3):
+            self.assertEqual(-7, calculator.calculate("-1*(2+3)-2"))
+            self.assertEqual(6, calculator.calculate("x*y", {"x": 2, "y": 3}))
+        self.assertEqual(2, calculator.cache.misses)
+        self.assertEqual(4, calculator.cache.hits)
+
+    def test_calculator_caches_errors(self):
+        calculator = Calculator(compiled=True, cache_size=8)
+        for _ in range(3):
+            with self.assertRaises(NumberFormatError) as context:
+                calculator.calculate("1+0.000.1")
+            self.assertEqual(8, context.exception.position)
+        self.assertEqual(1, calculator.cache.misses)
+
+    def test_cached_errors_are_not_shared(self):
+        for calculator in (
+            Calculator(),
+            Calculator(instrumentation=Instrumentation(lambda measurement: None)),
+        ):
+            with self.assertRaises(NumberFormatError) as first:
+                calculator.calculate("1+0.000.1")
+            try:
+                raise KeyError("unrelated")
+            except KeyError:
+                with self.assertRaises(NumberFormatError) as second:
+                    calculator.calculate("1+0.000.1")
+            self.assertIsNot(first.exception, second.exception)
+            self.assertIsNone(first.exception.__context__)
+            self.assertIsInstance(second.exception.__context__, KeyError)
+            with self.assertRaises(NumberFormatError) as third:
+                calculator.calculate("1+0.000.1")
+            self.assertIsNone(third.exception.__context__)
+            self.assertEqual(8, third.exception.position)
+
+    def test_evaluation_does_not_change_cached_tree(self):
+        calculator = Calculator()
+        evaluate = calculator.prepare("-1-2*(3+4)")
+        polish = evaluate.__self__.as_polish()
+        for _ in range(2):
+            self.assertEqual(-15, calculator.calculate("-1-2*(3+4)"))
+        self.assertIs(evaluate.__self__, calculator.prepare("-1-2*(3+4)").__self__)
+        self.assertEqual(polish, evaluate.__self__.as_polish())
+
+    def test_calculator_without_cache(self):
+        calculator = Calculator(cache_size=0)
+        self.assertIsNone(calculator.cache)
+        self.assertEqual(3, calculator.calculate("1+2"))
+
+    @staticmethod
+    def _fail(key):
+        raise AssertionError(f"{key} should have been cached")
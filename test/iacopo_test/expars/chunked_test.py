@@ -0,0 +1,84 @@
+import math
+import os
+import tempfile
+import unittest
+
+import numpy
+
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.chunked import ChunkedEvaluator, open_column
+from iacopo.expars.compiler import Compiler
+from iacopo.expars.exceptions import UnboundVariableError
+from iacopo.expars.operators import REGISTRY, register_function
+
+
+class ChunkedEvaluatorTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        generator = numpy.random.default_rng(24)
+        self.x = generator.random(1000) - 0.5
+        self.y = numpy.arange(1000.0)
+        self.x.tofile(self.path("x.bin"))
+        numpy.save(self.path("y.npy"), self.y)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_same_as_vectorized(self):
+        for expression in (
+            "2*x*x+3*y-x/y",
+            "(x-y)*(x+y)/2",
+            "max(x,0.25)^2+sqrt(abs(x))-min(x,y,0)",
+            "x",
+            "y*2",
+            "1+2*3",
+        ):
+            evaluable = Calculator.parse(expression)
+            expected = (
+                Compiler(evaluable)
+                .compile()
+                .evaluate_vectorized({"x": self.x, "y": self.y})
+            )
+            for block_size in (1, 7, 256, 4096):
+                with self.subTest(expression=expression, block_size=block_size):
+                    output = ChunkedEvaluator(evaluable, block_size).evaluate(
+                        {"x": self.path("x.bin"), "y": self.path("y.npy")},
+                        self.path("out.bin"),
+                    )
+                    self.assertIsInstance(output, numpy.memmap)
+                    numpy.testing.assert_array_equal(expected, output)
+                    numpy.testing.assert_array_equal(
+                        expected, numpy.fromfile(self.path("out.bin"))
+                    )
+
+    def test_outputs(self):
+        evaluator = ChunkedEvaluator(Calculator.parse("x*2"), block_size=100)
+        evaluator.evaluate({"x": open_column(self.path("x.bin"))}, self.path("o.npy"))
+        numpy.testing.assert_array_equal(self.x * 2, numpy.load(self.path("o.npy")))
+        output = numpy.zeros(1000)
+        self.assertIs(output, evaluator.evaluate({"x": self.x}, output))
+        numpy.testing.assert_array_equal(self.x * 2, output)
+        output = numpy.zeros(3)
+        ChunkedEvaluator(Calculator.parse("1/0")).evaluate({}, output)
+        self.assertEqual([math.inf] * 3, list(output))
+
+    def test_functions_without_ufunc(self):
+        register_function("clamp", lambda value: min(max(value, 0.0), 0.25))
+        self.addCleanup(REGISTRY.unregister, "clamp")
+        output = ChunkedEvaluator(Calculator.parse("clamp(x)+1"), 64).evaluate(
+            {"x": self.x}, numpy.empty(1000)
+        )
+        numpy.testing.assert_array_equal(numpy.clip(self.x, 0, 0.25) + 1, output)
+
+    def test_errors(self):
+        evaluator = ChunkedEvaluator(Calculator.parse("x+y*z"))
+        with self.assertRaisesRegex(UnboundVariableError, "'z'"):
+            evaluator.evaluate({"x": self.x, "y": self.y}, numpy.empty(1000))
+        with self.assertRaises(ValueError):
+            evaluator.evaluate({"x": self.x, "y": self.y, "z": [1.0]}, self.path("o"))
+        with self.assertRaises(ValueError):
+            evaluator.evaluate({"x": self.x, "y": self.y, "z": self.y}, numpy.empty(9))
+        with self.assertRaises(ValueError):
+            ChunkedEvaluator(Calculator.parse("x"), block_size=0)
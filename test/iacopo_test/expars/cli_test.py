@@ -0,0 +1,116 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.cli import Pipeline, main
+
+INPUT = b"1+2\n\n0.000.1\r\nx*2\n1/0\n2*(3+4)"
+EXPECTED = [
+    {"line": 1, "value": 3.0},
+    {"line": 3, "error": "NumberFormatError"},
+    {"line": 4, "value": 8.0},
+    {"line": 5, "error": "ZeroDivisionError"},
+    {"line": 6, "value": 14.0},
+]
+
+
+class CliTestCase(unittest.TestCase):
+    def test_pipeline(self):
+        output = io.BytesIO()
+        pipeline = Pipeline(bindings={"x": 4}, chunk_lines=2)
+        pipeline.run(io.BytesIO(INPUT), output)
+        self.assertEqual(EXPECTED, self._results(output.getvalue()))
+        self.assertEqual(6, pipeline.lines)
+        self.assertEqual(2, pipeline.errors)
+
+    def test_parallel_pipeline(self):
+        output = io.BytesIO()
+        pipeline = Pipeline(
+            Calculator(compiled=True), {"x": 4}, workers=2, chunk_lines=3
+        )
+        pipeline.run(io.BytesIO((INPUT + b"\n") * 20), output)
+        expected = [
+            {**result, "line": result["line"] + 6 * block}
+            for block in range(20)
+            for result in EXPECTED
+        ]
+        self.assertEqual(expected, self._results(output.getvalue()))
+        self.assertEqual(120, pipeline.lines)
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "expressions.txt")
+            target = os.path.join(directory, "results.txt")
+            with open(source, "wb") as file:
+                file.write(INPUT)
+            report = io.StringIO()
+            with redirect_stderr(report):
+                status = main([source, "-o", target, "-b", '{"x": 4}'])
+            with open(target, "rb") as file:
+                self.assertEqual(EXPECTED, self._results(file.read()))
+        self.assertEqual(1, status)
+        self.assertIn("6 lines, 2 errors", report.getvalue())
+        self.assertIn("lines/s", report.getvalue())
+
+    def test_empty_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "empty.txt")
+            target = os.path.join(directory, "results.txt")
+            open(source, "wb").close()
+            self.assertEqual(0, main([source, "-o", target, "-q"]))
+            self.assertEqual(0, os.path.getsize(target))
+
+    def test_non_finite(self):
+        output = io.BytesIO()
+        pipeline = Pipeline(bindings={"x": 1e200})
+        pipeline.run(io.BytesIO(b"x*x\nx*x-x*x\n0-x*x\nx"), output)
+        self.assertEqual(
+            [
+                {"line": 1, "error": "NonFiniteResultError"},
+                {"line": 2, "error": "NonFiniteResultError"},
+                {"line": 3, "error": "NonFiniteResultError"},
+                {"line": 4, "value": 1e200},
+            ],
+            self._results(output.getvalue()),
+        )
+        self.assertEqual(3, pipeline.errors)
+
+    def test_non_numeric_result(self):
+        output = io.BytesIO()
+        pipeline = Pipeline(bindings={"x": "a"})
+        pipeline.run(io.BytesIO(b"x\n1+1"), output)
+        self.assertEqual(
+            [{"line": 1, "error": "TypeError"}, {"line": 2, "value": 2.0}],
+            self._results(output.getvalue()),
+        )
+
+    def test_invalid_bindings(self):
+        for bindings in ('{"x": "a"}', '{"x": null}', '{"x": true}', "[1]", "{x"):
+            with redirect_stderr(io.StringIO()) as report:
+                with self.assertRaises(SystemExit) as exit:
+                    main(["-b", bindings, "-q"])
+            self.assertEqual(2, exit.exception.code)
+            self.assertIn("--bindings", report.getvalue())
+
+    def test_chunk_lines(self):
+        with self.assertRaises(ValueError):
+            Pipeline(chunk_lines=0)
+        for value in ("0", "-1"):
+            with redirect_stderr(io.StringIO()) as report:
+                with self.assertRaises(SystemExit):
+                    main(["--chunk-lines", value])
+            self.assertIn("--chunk-lines", report.getvalue())
+
+    @staticmethod
+    def _results(output: bytes) -> list[dict]:
+        results = []
+        for line in output.splitlines():
+            result = json.loads(line)
+            if "error" in result:
+                result["error"] = result["error"]["type"]
+            results.append(result)
+        return results
@@ -0,0 +1,55 @@
+import ast
+import math
+import random
+import unittest
+
+from iacopo.expars import Operation, Operator, Number
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.codegen import CodeGenerator
+
+
+class CodeGeneratorTestCase(unittest.TestCase):
+    def test_lower(self):
+        expression = CodeGenerator(Calculator.parse("1*(2+3)")).lower()
+        self.assertIsInstance(expression, ast.Expression)
+        self.assertEqual(
+            "lambda bindings=None: 1.0 * (2.0 + 3.0)", ast.unparse(expression)
+        )
+
+    def test_generate(self):
+        function = CodeGenerator(Calculator.parse("(8+9)/1-3*(4+5*(6-1))")).generate()
+        self.assertEqual(-70, function())
+
+    def test_division_by_zero(self):
+        function = CodeGenerator(Calculator.parse("1/(2-2)")).generate()
+        with self.assertRaises(ZeroDivisionError):
+            function()
+
+    def test_negative_zero(self):
+        function = CodeGenerator(Calculator.parse("-0*5")).generate()
+        self.assertEqual(-1.0, math.copysign(1.0, function()))
+
+    def test_deep_tree(self):
+        operation = Number(0)
+        for _ in range(100000):
+            operation = Operation(Operator.PLUS, Number(1), operation)
+        self.assertEqual(100000, CodeGenerator(operation).generate()())
+
+    def test_same_results_as_tree(self):
+        generator = random.Random(11)
+        for _ in range(300):
+            expression = str(generator.randint(1, 999) / 7)
+            for _ in range(10):
+                expression += generator.choice("+-*/") + str(generator.randint(1, 99))
+                if generator.random() < 0.2:
+                    expression = f"({expression})"
+            operation = Calculator.parse(expression)
+            self.assertEqual(
+                operation.evaluate(), CodeGenerator(operation).generate()()
+            )
+
+    def test_compiled_calculator(self):
+        calculator = Calculator(compiled=True)
+        for _ in range(2):
+            self.assertEqual(-70, calculator.calculate("(8+9)/1-3*(4+5*(6-1))"))
+            self.assertEqual(2.5, calculator.calculate("5/2"))
@@ -0,0 +1,93 @@
+import math
+import random
+import unittest
+
+from iacopo.expars import Number, Operation, Operator
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.columnar import (
+    CALL,
+    NUMBER,
+    OPERATION,
+    REGISTERED,
+    VARIABLE,
+    ColumnarTree,
+)
+from iacopo.expars.exceptions import UnboundVariableError
+from iacopo.expars.operators import REGISTRY, register_operator
+
+
+class ColumnarTreeTestCase(unittest.TestCase):
+    def test_layout(self):
+        tree = ColumnarTree.from_evaluable(Calculator.parse("2*(x+1.5)"))
+        self.assertEqual(
+            [NUMBER, VARIABLE, NUMBER, OPERATION, OPERATION], list(tree.kinds)
+        )
+        self.assertEqual([-1, -1, -1, 1, 0], list(tree.lefts))
+        self.assertEqual([-1, -1, -1, 2, 3], list(tree.rights))
+        self.assertEqual([2.0, 0.0, 1.5, 0.0, 0.0], list(tree.values))
+        self.assertEqual(["x"], tree.names)
+        self.assertEqual(5 * (1 + 1 + 4 + 4 + 8), tree.nbytes)
+
+    def test_calls(self):
+        register_operator("%", "MODULO", math.fmod, 2, right_associative=False)
+        self.addCleanup(REGISTRY.unregister, "%")
+        tree = ColumnarTree.from_evaluable(Calculator.parse("max(x,2,sqrt(9))%4"))
+        self.assertEqual(
+            [VARIABLE, NUMBER, NUMBER, CALL, CALL, NUMBER, REGISTERED],
+            list(tree.kinds),
+        )
+        self.assertEqual(["sqrt", "max", "%"], tree.registered)
+        self.assertEqual([2, 0, 1, 3], list(tree.arguments))
+        self.assertEqual([0, 1], list(tree.lefts[3:5]))
+        self.assertEqual([1, 3], list(tree.rights[3:5]))
+        self.assertEqual([4, 5], [tree.lefts[6], tree.rights[6]])
+        self.assertEqual(1, tree.evaluate({"x": 5}))
+        self.assertEqual(3, tree.evaluate({"x": 2}, 1, 4))
+        self.assertEqual(
+            Calculator.parse("max(x,2,sqrt(9))%4").as_polish(),
+            tree.to_evaluable().as_polish(),
+        )
+
+    def test_round_trip(self):
+        expression = "(8+9)/1-3*(4+x*(6-y))"
+        tree = ColumnarTree.from_evaluable(Calculator.parse(expression))
+        self.assertEqual(
+            Calculator.parse(expression).as_polish(), tree.to_evaluable().as_polish()
+        )
+
+    def test_evaluate(self):
+        generator = random.Random(9)
+        for _ in range(300):
+            expression = generator.choice("xy")
+            for _ in range(generator.randint(1, 10)):
+                expression += generator.choice("+-*/") + generator.choice(
+                    ["x", "y", "2", "0.5"]
+                )
+                if generator.random() < 0.3:
+                    expression = f"({expression})"
+            bindings = {"x": generator.random(), "y": generator.random() + 1}
+            operation = Calculator.parse(expression)
+            tree = ColumnarTree.from_evaluable(operation)
+            self.assertEqual(
+                self._result(operation, bindings), self._result(tree, bindings)
+            )
+
+    def test_unbound_variable(self):
+        tree = ColumnarTree.from_evaluable(Calculator.parse("x+1"))
+        with self.assertRaises(UnboundVariableError):
+            tree.evaluate({})
+
+    def test_deep_tree(self):
+        operation = Number(0)
+        for _ in range(100000):
+            operation = Operation(Operator.MINUS, operation, Number(1))
+        tree = ColumnarTree.from_evaluable(operation)
+        self.assertEqual(200001, len(tree))
+        self.assertEqual(-100000, tree.evaluate())
+
+    @staticmethod
+    def _result(evaluable, bindings):
+        try:
+            return evaluable.evaluate(bindings)
+        except ZeroDivisionError as e:
+            return type(e)
@@ -0,0 +1,64 @@
+import random
+import unittest
+
+from iacopo.expars import Operation, Operator, Number
+from iacopo.expars.compiler import Compiler, PUSH, ADD, MULTIPLY
+from iacopo.expars.parser import Parser
+from iacopo.expars.tokenizer import Tokenizer
+
+
+def parse(expression):
+    return Parser(Tokenizer(expression).tokenize()).parse()
+
+
+class CompilerTestCase(unittest.TestCase):
+    def test_compile_number(self):
+        program = Compiler(Number(3)).compile()
+        self.assertEqual([PUSH], list(program.opcodes))
+        self.assertEqual([3.0], list(program.constants))
+        self.assertEqual(3.0, program.evaluate())
+
+    def test_compile_follows_polish_order(self):
+        operation = parse("1*(2+3)")
+        program = Compiler(operation).compile()
+        self.assertEqual("1.0 2.0 3.0 + *", operation.as_polish())
+        self.assertEqual([PUSH, PUSH, PUSH, ADD, MULTIPLY], list(program.opcodes))
+        self.assertEqual([1.0, 2.0, 3.0], list(program.constants))
+        self.assertEqual("B", program.opcodes.typecode)
+        self.assertEqual("d", program.constants.typecode)
+
+    def test_evaluate(self):
+        self.assertEqual(
+            -70, Compiler(parse("(8+9)/1-3*(4+5*(6-1))")).compile().evaluate()
+        )
+
+    def test_division_by_zero(self):
+        program = Compiler(Operation(Operator.DIVIDE, Number(1), Number(0))).compile()
+        with self.assertRaises(ZeroDivisionError):
+            program.evaluate()
+
+    def test_same_results_as_tree(self):
+        generator = random.Random(7)
+        for _ in range(500):
+            terms = [str(generator.randint(1, 99) / 8) for _ in range(12)]
+            expression = terms[0]
+            for term in terms[1:]:
+                expression += generator.choice("+-*/") + term
+                if generator.random() < 0.2:
+                    expression = f"({expression})"
+            operation = parse(expression)
+            program = Compiler(operation).compile()
+            self.assertEqual(self._result(operation), self._result(program))
+
+    def test_deep_tree(self):
+        operation = Number(0)
+        for _ in range(100000):
+            operation = Operation(Operator.PLUS, Number(1), operation)
+        self.assertEqual(100000, Compiler(operation).compile().evaluate())
+
+    @staticmethod
+    def _result(evaluable):
+        try:
+            return evaluable.evaluate()
+        except ZeroDivisionError as e:
+            return type(e)
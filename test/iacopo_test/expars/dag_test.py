@@ -0,0 +1,87 @@
+import random
+import unittest
+from collections import UserDict
+
+from iacopo.expars import Number, Operation, Operator
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.dag import Interner
+
+
+class CountingBindings(UserDict):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.reads = 0
+
+    def __getitem__(self, key):
+        self.reads += 1
+        return super().__getitem__(key)
+
+
+class InternerTestCase(unittest.TestCase):
+    def test_shared_subexpressions(self):
+        tree = Calculator.parse("(1.07*(a+b))*(1.07*(a+b))+(1.07*(a+b))/2")
+        dag = Interner().intern(tree)
+        self.assertEqual(19, dag.tree_nodes)
+        self.assertEqual(9, dag.dag_nodes)
+        self.assertEqual(19 / 9, dag.sharing_ratio)
+        self.assertIs(dag.root.left.left, dag.root.left.right)
+        self.assertIs(dag.root.left.left, dag.root.right.left)
+
+    def test_shared_nodes_are_evaluated_once(self):
+        tree = Calculator.parse("(1.07*(a+b))*(1.07*(a+b))+(1.07*(a+b))/2")
+        dag = Interner().intern(tree)
+        bindings = CountingBindings({"a": 1.5, "b": 2})
+        self.assertEqual(tree.evaluate(bindings), dag.evaluate(bindings))
+        self.assertEqual(6 + 2, bindings.reads)
+        bindings.reads = 0
+        dag.evaluate(bindings)
+        self.assertEqual(2, bindings.reads)
+
+    def test_signed_zeros_are_not_shared(self):
+        dag = Interner().intern(Calculator.parse("x*0+x*-0"))
+        self.assertEqual(6, dag.dag_nodes)
+        # sharing x*0 for both terms would give -0.0
+        self.assertEqual("0.0", repr(dag.evaluate({"x": -1.0})))
+
+    def test_sharing_across_expressions(self):
+        interner = Interner()
+        first = interner.intern(Calculator.parse("a*b+c"))
+        second = interner.intern(Calculator.parse("(a*b)-c"))
+        self.assertIs(first.root.left, second.root.left)
+        self.assertEqual(10, interner.tree_nodes)
+        self.assertEqual(6, interner.dag_nodes)
+
+    def test_calls(self):
+        tree = Calculator.parse("max(sqrt(a+b),1)*max(sqrt(a+b),1)+sqrt(a+b)")
+        dag = Interner().intern(tree)
+        self.assertEqual(8, dag.dag_nodes)
+        self.assertIs(dag.root.left.left, dag.root.left.right)
+        self.assertIs(dag.root.left.left.arguments[0], dag.root.right)
+        bindings = {"a": 7, "b": 9}
+        self.assertEqual(tree.evaluate(bindings), dag.evaluate(bindings))
+        self.assertEqual(20, dag.evaluate(bindings))
+        # the same arguments to another function are another node
+        dag = Interner().intern(Calculator.parse("min(a,b)+max(a,b)"))
+        self.assertEqual(5, dag.dag_nodes)
+
+    def test_deep_shared_tree(self):
+        operation = Number(1)
+        for _ in range(200):
+            # a tree of 2^200 nodes when expanded
+            operation = Operation(Operator.PLUS, operation, operation)
+        dag = Interner().intern(operation)
+        self.assertEqual(201, dag.dag_nodes)
+        self.assertEqual(2.0**200, dag.evaluate())
+
+    def test_same_results(self):
+        generator = random.Random(5)
+        operands = ["a", "b", "1", "2", "(a+b)", "(a*2)"]
+        for _ in range(500):
+            expression = generator.choice(operands)
+            for _ in range(generator.randint(1, 8)):
+                expression += generator.choice("+-*/") + generator.choice(operands)
+            tree = Calculator.parse(expression)
+            bindings = {"a": generator.random(), "b": generator.random()}
+            self.assertEqual(
+                tree.evaluate(bindings), Interner().intern(tree).evaluate(bindings)
+            )
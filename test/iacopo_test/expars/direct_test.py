@@ -0,0 +1,62 @@
+import io
+import random
+import unittest
+
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.direct import DirectEvaluator
+from iacopo.expars.exceptions import UnboundVariableError
+from iacopo.expars.tokenizer import StreamTokenizer, Tokenizer
+
+
+def _outcome(calculate, expression, bindings):
+    try:
+        return calculate(expression, bindings)
+    except Exception as e:
+        return type(e), str(e), getattr(e, "position", None)
+
+
+class DirectEvaluatorTestCase(unittest.TestCase):
+    def test_precedence(self):
+        for expression, expected in (
+            ("2*3+4*5", 26),
+            ("8-2-1", 7),
+            ("8/4/2", 4),
+            ("(8-2-1)*2", 14),
+            ("-2*-3", 6),
+            ("1-(2*3+1)*2", -15),
+        ):
+            with self.subTest(expression=expression):
+                evaluator = DirectEvaluator(Tokenizer(expression).tokenize())
+                self.assertEqual(expected, evaluator.evaluate())
+
+    def test_parse_error_wins(self):
+        with self.assertRaises(UnboundVariableError):
+            Calculator(direct=True).calculate("x+1")
+        with self.assertRaises(ZeroDivisionError):
+            Calculator(direct=True).calculate("1/0+x", {"x": 1})
+        with self.assertRaises(UnboundVariableError):
+            Calculator(direct=True).calculate("1/(0*x)")
+        with self.assertRaisesRegex(RuntimeError, "position 6"):
+            Calculator(direct=True).calculate("1/0+x+")
+
+    def test_same_as_tree(self):
+        generator = random.Random(21)
+        alphabet = ["1", "2", "0", ".5", "x", "y", "+", "-", "*", "/", "(", ")"]
+        tree = Calculator(cache_size=0).calculate
+        direct = Calculator(direct=True).calculate
+        for _ in range(3000):
+            expression = "".join(
+                generator.choice(alphabet) for _ in range(generator.randint(1, 14))
+            )
+            bindings = generator.choice([None, {"x": 3}, {"x": 0, "y": -7}])
+            with self.subTest(expression=expression, bindings=bindings):
+                self.assertEqual(
+                    _outcome(tree, expression, bindings),
+                    _outcome(direct, expression, bindings),
+                )
+
+    def test_long_stream(self):
+        expression = "+".join(["3*x/2"] * 100000) + "+" + "(1+" * 500 + "1" + ")" * 500
+        stream = io.BytesIO(expression.encode())
+        evaluator = DirectEvaluator(StreamTokenizer(stream, chunk_size=4096).tokenize())
+        self.assertEqual(300501, evaluator.evaluate({"x": 2}))
@@ -0,0 +1,102 @@
+import random
+import unittest
+
+from iacopo.expars import Number, Variable
+from iacopo.expars.incremental import IncrementalParser
+from iacopo.expars.parser import Parser
+from iacopo.expars.tokenizer import Tokenizer
+
+
+class IncrementalParserTestCase(unittest.TestCase):
+    def test_edit(self):
+        parser = IncrementalParser("(1+2)*(3+4)")
+        self.assertEqual(21, parser.parse().evaluate())
+        self.assertEqual(15, parser.edit(7, 1, "1").evaluate())
+        self.assertEqual("(1+2)*(1+4)", parser.expression)
+        self.assertEqual(1, parser.reused_groups)
+
+    def test_positions_are_moved(self):
+        parser = IncrementalParser("1+x*(2-y)")
+        parser.edit(0, 1, "100")
+        self.assertEqual(self._full("100+x*(2-y)"), self._incremental(parser))
+
+    def test_errors(self):
+        parser = IncrementalParser("1+2")
+        with self.assertRaises(RuntimeError) as error:
+            parser.edit(1, 1, ".0.")
+        self.assertEqual(self._full("1.0.2"), self._incremental(parser))
+        self.assertEqual(4, error.exception.position)
+        self.assertEqual(3.0, parser.edit(1, 3, "+").evaluate())
+
+    def test_empty(self):
+        parser = IncrementalParser()
+        self.assertEqual(self._full(""), self._incremental(parser))
+        self.assertEqual(2.0, parser.edit(0, 0, "2").evaluate())
+        with self.assertRaises(RuntimeError):
+            parser.edit(0, 1, "")
+        self.assertEqual(self._full(""), self._incremental(parser))
+
+    def test_invalid_edit(self):
+        with self.assertRaises(ValueError):
+            IncrementalParser("1+2").edit(2, 2, "")
+
+    def test_random_edits(self):
+        generator = random.Random(13)
+        alphabet = "0123456789+-*/()..xy_"
+        for _ in range(20):
+            expression = self._expression(generator, 6)
+            parser = IncrementalParser(expression)
+            for _ in range(30):
+                offset = generator.randint(0, len(expression))
+                deleted = generator.randint(0, min(3, len(expression) - offset))
+                if generator.random() < 0.7:
+                    inserted = "".join(
+                        generator.choice(alphabet)
+                        for _ in range(generator.randint(0, 3))
+                    )
+                else:
+                    inserted = self._expression(generator, 2)
+                expression = (
+                    expression[:offset] + inserted + expression[offset + deleted :]
+                )
+                try:
+                    parser.edit(offset, deleted, inserted)
+                except (RuntimeError, ValueError):
+                    pass
+                self.assertEqual(expression, parser.expression)
+                self.assertEqual(
+                    self._full(expression), self._incremental(parser), expression
+                )
+
+    def _expression(self, generator, depth):
+        if depth == 0 or generator.random() < 0.3:
+            return generator.choice(["1", "2.5", "x", "-3", "y1"])
+        operator = generator.choice("+-*/")
+        left = self._expression(generator, depth - 1)
+        right = self._expression(generator, depth - 1)
+        text = f"{left}{operator}{right}"
+        return f"({text})" if generator.random() < 0.5 else text
+
+    def _full(self, expression):
+        try:
+            return self._shape(Parser(Tokenizer(expression).tokenize()).parse())
+        except (RuntimeError, ValueError) as e:
+            return type(e), str(e), getattr(e, "position", None)
+
+    def _incremental(self, parser):
+        try:
+            return self._shape(parser.parse())
+        except (RuntimeError, ValueError) as e:
+            return type(e), str(e), getattr(e, "position", None)
+
+    def _shape(self, evaluable):
+        if isinstance(evaluable, Number):
+            return evaluable.value, evaluable.position
+        if isinstance(evaluable, Variable):
+            return evaluable.name, evaluable.position
+        return (
+            type(evaluable).__name__,
+            evaluable.operator,
+            self._shape(evaluable.left),
+            self._shape(evaluable.right),
+        )
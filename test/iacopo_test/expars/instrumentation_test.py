@@ -0,0 +1,71 @@
+import unittest
+
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.exceptions import UnboundVariableError, UnexpectedTokenError
+from iacopo.expars.instrumentation import Instrumentation, MetricsRegistry
+
+
+class InstrumentationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.measurements = []
+        self.registry = MetricsRegistry()
+        self.instrumentation = Instrumentation(self.measurements.append, self.registry)
+
+    def test_stages(self):
+        calculator = Calculator(
+            compiled=True, optimize=True, instrumentation=self.instrumentation
+        )
+        self.assertEqual(7, calculator.calculate("1+2*x", {"x": 3}))
+        measurement = self.measurements[0]
+        self.assertEqual(
+            ["tokenize", "parse", "optimize", "compile", "evaluate"],
+            list(measurement.seconds),
+        )
+        self.assertFalse(measurement.cached)
+        self.assertEqual(5, measurement.tokens)
+        self.assertEqual(5, measurement.nodes)
+        self.assertEqual(3, measurement.depth)
+        self.assertIsNone(measurement.error)
+
+    def test_cache_hit(self):
+        calculator = Calculator(instrumentation=self.instrumentation)
+        calculator.calculate("(1+2)*3")
+        calculator.calculate("(1+2)*3")
+        self.assertTrue(self.measurements[1].cached)
+        self.assertEqual(["evaluate"], list(self.measurements[1].seconds))
+        snapshot = self.registry.snapshot()
+        self.assertEqual(2, snapshot["calculations"])
+        self.assertEqual(1, snapshot["cache_hits"])
+        self.assertEqual(1, snapshot["stages"]["parse"]["count"])
+        self.assertEqual(2, snapshot["stages"]["evaluate"]["count"])
+        self.assertEqual(7, snapshot["tokens"])
+
+    def test_errors(self):
+        calculator = Calculator(cache_size=0, instrumentation=self.instrumentation)
+        calculator.calculate_safely("x+1")
+        calculator.calculate_safely("1+)")
+        calculator.calculate_safely("1+2)")
+        self.assertEqual(
+            {"UnboundVariableError": 1, "UnexpectedTokenError": 2},
+            self.registry.snapshot()["errors"],
+        )
+        self.assertIsInstance(self.measurements[0].error, UnboundVariableError)
+        self.assertIsInstance(self.measurements[1].error, UnexpectedTokenError)
+
+    def test_same_errors_as_without_instrumentation(self):
+        for expression in ["1+)+0.0.0", "(1+2))", "1.2.3", "2*(", "-x"]:
+            with self.subTest(expression):
+                expected = Calculator().calculate_safely(expression).error
+                calculator = Calculator(instrumentation=self.instrumentation)
+                error = calculator.calculate_safely(expression).error
+                self.assertEqual(type(expected), type(error))
+                self.assertEqual(str(expected), str(error))
+
+    def test_listeners(self):
+        calculator = Calculator(instrumentation=Instrumentation())
+        calculator.calculate("1")
+        calculator.instrumentation.add(self.measurements.append)
+        calculator.calculate("1")
+        calculator.instrumentation.remove(self.measurements.append)
+        calculator.calculate("1")
+        self.assertEqual(1, len(self.measurements))
@@ -1,6 +1,14 @@
 import unittest
 
-from iacopo.expars import Operation, Operator, Number
+from iacopo.expars import (
+    Operation,
+    Operator,
+    Number,
+    ParenthesisOperation,
+    Variable,
+    OperatorToken,
+    OpenParenthesis,
+)
 
 
 class OperationTestCase(unittest.TestCase):
@@ -42,3 +50,9 @@ class OperationTestCase(unittest.TestCase):
         self.assertFalse(plus.has_precedence_over(minus))
         self.assertFalse(mul.has_precedence_over(divide))
         self.assertFalse(divide.has_precedence_over(mul))
+
+    def test_nodes_have_no_instance_dictionary(self):
+        operation = ParenthesisOperation(Operator.PLUS, Number(3), Variable("x"))
+        tokens = [OperatorToken(Operator.PLUS, 1), OpenParenthesis(2)]
+        for instance in [operation, operation.left, operation.right] + tokens:
+            self.assertFalse(hasattr(instance, "__dict__"), instance)
@@ -0,0 +1,156 @@
+import math
+import pickle
+import random
+import unittest
+
+from iacopo.expars import Call, Operator
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.compiler import Compiler
+from iacopo.expars.dag import Interner
+from iacopo.expars.exceptions import (
+    IncompleteExpressionError,
+    UnexpectedTokenError,
+    describe,
+)
+from iacopo.expars.operators import REGISTRY, register_function, register_operator
+from iacopo.expars.serialization import dumps, loads
+from iacopo.expars.validator import Validator
+
+CALCULATORS = {
+    "tree": Calculator(cache_size=0),
+    "compiled": Calculator(compiled=True, cache_size=0),
+    "optimized": Calculator(optimize=True, cache_size=0),
+    "direct": Calculator(direct=True),
+}
+
+
+def _outcome(calculate, expression, bindings=None):
+    try:
+        return calculate(expression, bindings)
+    except Exception as e:
+        return type(e), str(e), getattr(e, "position", None)
+
+
+class OperatorsTestCase(unittest.TestCase):
+    def assertEverywhere(self, expected, expression, bindings=None):
+        for name, calculator in CALCULATORS.items():
+            with self.subTest(calculator=name, expression=expression):
+                self.assertEqual(expected, calculator.calculate(expression, bindings))
+
+    def test_power(self):
+        self.assertEverywhere(512, "2^3^2")
+        self.assertEverywhere(18, "2*3^2")
+        self.assertEverywhere(10, "3^2+1")
+        self.assertEverywhere(4, "-2^2")
+        self.assertEqual(Operator.POWER, Calculator.parse("2*3^2").right.operator)
+        self.assertEqual(18, loads(dumps(Calculator.parse("2*3^2"))).evaluate())
+
+    def test_functions(self):
+        self.assertEverywhere(7, "sqrt(16)+abs(-3)")
+        self.assertEverywhere(7, "max(1,5,x)", {"x": 7})
+        self.assertEverywhere(4, "min(4)")
+        # no precedence inside parenthesis, 5*(1+2^2)
+        self.assertEverywhere(5, "sqrt(max(4,x)*1+2^2)", {"x": 5})
+        self.assertEverywhere(6, "sqrt", {"sqrt": 6})
+        call = Calculator.parse("max(1,x+2)")
+        self.assertIsInstance(call, Call)
+        self.assertEqual("1.0 x 2.0 + max", call.as_polish())
+
+    def test_arguments_group_like_parenthesis(self):
+        # no precedence in arguments either, everything is grouped from the
+        # right: 2*(3+1)
+        for expression, grouped, value in (
+            ("max(2*3+1,0)", "max((2*3+1),0)", 8),
+            ("sqrt(2*1+7)", "sqrt((2*1+7))", 4),
+            ("min(8-2-3,10)", "min((8-2-3),10)", 9),
+            ("max(3^2*2,1-2*3)", "max((3^2*2),(1-2*3))", 81),
+            ("max(1,(2*3+1)*4+x^2)", "max(1,((2*3+1)*4+x^2))", 64),
+        ):
+            self.assertEverywhere(value, expression, {"x": 2})
+            self.assertEverywhere(value, grouped, {"x": 2})
+            self.assertEqual(
+                Calculator.parse(grouped).as_polish(),
+                Calculator.parse(expression).as_polish(),
+            )
+        # outside the call precedence applies as usual, sqrt(81)^2
+        self.assertEverywhere(81, "sqrt(3^2*2)^2")
+
+    def test_arity(self):
+        for expression, error, position in (
+            ("sqrt(1,2)", UnexpectedTokenError, 7),
+            ("sqrt(1,", IncompleteExpressionError, 7),
+            ("(1,2)", UnexpectedTokenError, 3),
+            ("max(1,)", UnexpectedTokenError, 7),
+            ("max(,1)", UnexpectedTokenError, 5),
+            ("foo(1)", UnexpectedTokenError, 4),
+        ):
+            for name, calculator in CALCULATORS.items():
+                with self.subTest(calculator=name, expression=expression):
+                    with self.assertRaises(error) as raised:
+                        calculator.calculate(expression)
+                    self.assertEqual(position, raised.exception.position)
+
+    def test_registered(self):
+        modulo = register_operator("%", "MODULO", math.fmod, 2, right_associative=False)
+        self.addCleanup(REGISTRY.unregister, "%")
+        register_function("hypot", math.hypot, 2)
+        self.addCleanup(REGISTRY.unregister, "hypot")
+        self.assertEverywhere(3, "100%30%7")
+        self.assertEverywhere(5, "hypot(3,x)+1%1", {"x": 4})
+        with self.assertRaisesRegex(
+            IncompleteExpressionError, "Number 1.0 at position 7"
+        ):
+            Calculator(direct=True).calculate("hypot(1")
+        self.assertIs(modulo, Calculator.parse("1+2%3").right.operator)
+        with self.assertRaises(ValueError):
+            register_operator("%", "AGAIN", math.fmod, 2)
+        with self.assertRaises(ValueError):
+            REGISTRY.unregister("+")
+        error = pickle.loads(pickle.dumps(_error("1+%2")))
+        self.assertEqual(
+            "Unexpected token 'Operator.MODULO' at character 3", str(error)
+        )
+        program = Compiler(Calculator.parse("hypot(x,4)%3")).compile()
+        self.assertEqual(2, program.evaluate({"x": 3}))
+        self.assertEqual([2, 1], list(program.evaluate_vectorized({"x": [3, 0]})))
+        self.assertEqual(2, Interner().intern(Calculator.parse("5%3")).evaluate())
+
+    def test_vectorized(self):
+        evaluable = Calculator.parse("max(x,0)^2+sqrt(abs(x))")
+        self.assertEqual(
+            [16 + 2, 0 + 2], list(evaluable.evaluate_vectorized({"x": [4, -4]}))
+        )
+
+    def test_same_everywhere(self):
+        generator = random.Random(22)
+        alphabet = ["1", "2", "x", "+", "-", "*", "^", "(", ")", ",", "max(", "sqrt("]
+        validator = Validator()
+        for _ in range(2000):
+            expression = "".join(
+                generator.choice(alphabet) for _ in range(generator.randint(1, 12))
+            )
+            bindings = generator.choice([None, {"x": 3}, {"x": -4}])
+            expected = _outcome(CALCULATORS["tree"].calculate, expression, bindings)
+            with self.subTest(expression=expression, bindings=bindings):
+                for name in ("compiled", "direct"):
+                    self.assertEqual(
+                        expected,
+                        _outcome(CALCULATORS[name].calculate, expression, bindings),
+                    )
+                error = _error(expression)
+                diagnostics = validator.validate(expression)
+                if error is None:
+                    self.assertEqual([], diagnostics)
+                else:
+                    self.assertEqual(
+                        (describe(error)["message"], error.position),
+                        (diagnostics[0].message, diagnostics[0].position),
+                    )
+
+
+def _error(expression):
+    try:
+        Calculator.parse(expression)
+    except RuntimeError as e:
+        return e
+    return None
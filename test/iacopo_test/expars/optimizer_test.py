@@ -0,0 +1,88 @@
+import random
+import unittest
+
+from iacopo.expars import Number, Operation, Operator, ParenthesisOperation, Variable
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.optimizer import Optimizer
+
+
+class OptimizerTestCase(unittest.TestCase):
+    def test_fold_constants(self):
+        optimizer = Optimizer()
+        optimized = optimizer.optimize(Calculator.parse("(8+9)/1-3*(4+5*(6-1))"))
+        self.assertIsInstance(optimized, Number)
+        self.assertEqual(-70, optimized.value)
+        self.assertEqual(14, optimizer.removed_nodes)
+
+    def test_fold_partially_literal(self):
+        optimizer = Optimizer()
+        optimized = optimizer.optimize(Calculator.parse("price*(1+0.25)-2*3"))
+        self.assertEqual("price 1.25 * 6.0 -", optimized.as_polish())
+        self.assertEqual(4, optimizer.removed_nodes)
+
+    def test_identities(self):
+        for expression in ["x*1", "1*x", "x/1", "x-0", "x+-0", "-0+x", "x*(3-2)"]:
+            optimized = Optimizer().optimize(Calculator.parse(expression))
+            self.assertIsInstance(optimized, Variable, expression)
+
+    def test_identities_changing_signed_zero_are_kept(self):
+        for expression in ["x+0", "0+x", "x--0", "1/x"]:
+            optimized = Optimizer().optimize(Calculator.parse(expression))
+            self.assertIsInstance(optimized, Operation, expression)
+        self.assertEqual("0.0", repr(Calculator.parse("x+0").evaluate({"x": -0.0})))
+
+    def test_division_by_zero_is_kept(self):
+        optimized = Optimizer().optimize(Calculator.parse("x+1/(2-2)"))
+        self.assertEqual("x 1.0 0.0 / +", optimized.as_polish())
+        with self.assertRaises(ZeroDivisionError):
+            optimized.evaluate({"x": 1})
+
+    def test_parenthesis_are_flattened(self):
+        tree = Calculator.parse("(a+b)*c")
+        self.assertIsInstance(tree.left, ParenthesisOperation)
+        optimized = Optimizer().optimize(tree)
+        self.assertIs(type(optimized.left), Operation)
+        self.assertEqual("a b + c *", optimized.as_polish())
+
+    def test_unchanged_tree_is_reused(self):
+        tree = Calculator.parse("a*b+c")
+        optimizer = Optimizer()
+        self.assertIs(tree, optimizer.optimize(tree))
+        self.assertEqual(0, optimizer.removed_nodes)
+
+    def test_deep_tree(self):
+        operation = Variable("x")
+        for _ in range(100000):
+            operation = Operation(Operator.PLUS, Number(1), operation)
+        optimized = Optimizer().optimize(operation)
+        self.assertIs(operation, optimized)
+
+    def test_same_results(self):
+        generator = random.Random(3)
+        operands = ["x", "y", "0", "1", "-0", "2", "0.5", "-1"]
+        values = [0.0, -0.0, 1.0, -2.5, 1e308, float("inf"), float("nan")]
+        for _ in range(2000):
+            expression = generator.choice(operands)
+            for _ in range(generator.randint(1, 6)):
+                expression += generator.choice("+-*/") + generator.choice(operands)
+                if generator.random() < 0.3:
+                    expression = f"({expression})"
+            tree = Calculator.parse(expression)
+            optimized = Optimizer().optimize(tree)
+            bindings = {"x": generator.choice(values), "y": generator.choice(values)}
+            self.assertEqual(
+                self._result(tree, bindings),
+                self._result(optimized, bindings),
+                f"{expression} {bindings}",
+            )
+
+    def test_calculator(self):
+        calculator = Calculator(optimize=True)
+        self.assertEqual(7.5, calculator.calculate("x*(1+2)*1", {"x": 2.5}))
+
+    @staticmethod
+    def _result(evaluable, bindings):
+        try:
+            return repr(evaluable.evaluate(bindings))
+        except (ZeroDivisionError, OverflowError) as e:
+            return type(e)
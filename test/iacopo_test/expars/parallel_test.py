@@ -0,0 +1,123 @@
+import random
+import unittest
+from multiprocessing import shared_memory
+
+from iacopo.expars import Number, Operation, Operator, Variable
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.columnar import ColumnarTree
+from iacopo.expars.exceptions import UnboundVariableError
+from iacopo.expars.parallel import ParallelEvaluator, partition
+
+
+def _random_tree(size, generator):
+    # balanced enough to be cut in several subtrees, built without recursion
+    nodes = [
+        (
+            Variable(generator.choice("xy"), index)
+            if generator.random() < 0.2
+            else Number(generator.randint(1, 9), index)
+        )
+        for index in range(size)
+    ]
+    while len(nodes) > 1:
+        index = generator.randrange(len(nodes) - 1)
+        operator = generator.choice(
+            [Operator.PLUS, Operator.MINUS, Operator.MULTIPLY, Operator.DIVIDE]
+        )
+        nodes[index : index + 2] = [Operation(operator, nodes[index], nodes[index + 1])]
+    return nodes[0]
+
+
+def _outcome(evaluate, bindings):
+    try:
+        return evaluate(bindings)
+    except Exception as e:
+        return type(e), str(e)
+
+
+class ParallelEvaluatorTestCase(unittest.TestCase):
+    def test_partition(self):
+        tree = ColumnarTree.from_evaluable(_random_tree(500, random.Random(1)))
+        result = partition(tree, 60)
+        covered = [
+            index
+            for task in result.tasks
+            for start, stop in task
+            for index in range(start, stop)
+        ]
+        self.assertEqual(sorted(covered + result.joins), list(range(len(tree))))
+        for task in result.tasks:
+            self.assertLessEqual(sum(stop - start for start, stop in task), 60)
+        self.assertEqual(len(tree) - 1, result.joins[-1])
+
+    def test_same_as_serial(self):
+        generator = random.Random(23)
+        for size in (2, 50, 3000):
+            tree = _random_tree(size, generator)
+            evaluator = ParallelEvaluator(tree, workers=3, threshold=10)
+            self.addCleanup(evaluator.close)
+            serial = ColumnarTree.from_evaluable(tree, positions=True).evaluate
+            for bindings in ({"x": 3, "y": 0.5}, {"x": 0, "y": 7}, {"x": 1}):
+                with self.subTest(size=size, bindings=bindings):
+                    self.assertEqual(
+                        _outcome(serial, bindings),
+                        _outcome(evaluator.evaluate, bindings),
+                    )
+
+    def test_first_error_wins(self):
+        expression = "+".join(["x/z"] * 100 + ["1/y"] * 100 + ["w"])
+        evaluable = Calculator.parse(expression)
+        evaluator = ParallelEvaluator(evaluable, workers=2, threshold=10)
+        self.addCleanup(evaluator.close)
+        self.assertGreater(len(evaluator.partition.tasks), 2)
+        serial = ColumnarTree.from_evaluable(evaluable, positions=True).evaluate
+        for bindings in (
+            {"x": 1, "y": 0, "z": 0},
+            {"x": 1, "y": 0, "z": 1},
+            {"x": 1, "y": 1, "z": 1},
+            {"x": 1, "y": 1, "z": 1, "w": 2},
+            {"y": 0},
+        ):
+            with self.subTest(bindings=bindings):
+                self.assertEqual(
+                    _outcome(serial, bindings), _outcome(evaluator.evaluate, bindings)
+                )
+        with self.assertRaisesRegex(UnboundVariableError, "'w'"):
+            evaluator.evaluate({"x": 1, "y": 1, "z": 1})
+
+    def test_pool_is_kept(self):
+        tree = _random_tree(400, random.Random(3))
+        serial = ColumnarTree.from_evaluable(tree).evaluate
+        with ParallelEvaluator(tree, workers=2, threshold=10) as evaluator:
+            self.assertIsNone(evaluator._executor)
+            self.assertEqual(
+                _outcome(serial, {"x": 1, "y": 2}),
+                _outcome(evaluator.evaluate, {"x": 1, "y": 2}),
+            )
+            executor, memory = evaluator._executor, evaluator._memory
+            self.assertEqual(
+                _outcome(serial, {"x": 5, "y": 3}),
+                _outcome(evaluator.evaluate, {"x": 5, "y": 3}),
+            )
+            self.assertIs(executor, evaluator._executor)
+            self.assertIs(memory, evaluator._memory)
+        self.assertIsNone(evaluator._executor)
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=memory.name)
+
+    def test_serial_fallback(self):
+        evaluator = ParallelEvaluator(Calculator.parse("1+2*x"), workers=4)
+        self.assertIsNone(evaluator.partition)
+        self.assertEqual(7, evaluator.evaluate({"x": 3}))
+
+    def test_calls(self):
+        expression = "+".join(["max(x,1,y)"] * 100 + ["sqrt(y)^2"] * 100)
+        evaluable = Calculator.parse(expression)
+        with ParallelEvaluator(evaluable, workers=2, threshold=10) as evaluator:
+            self.assertGreater(len(evaluator.partition.tasks), 2)
+            self.assertEqual(
+                evaluable.evaluate({"x": 3, "y": 4}),
+                evaluator.evaluate({"x": 3, "y": 4}),
+            )
+            with self.assertRaises(ValueError):
+                evaluator.evaluate({"x": 3, "y": -4})
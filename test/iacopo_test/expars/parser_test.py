@@ -1,8 +1,11 @@
+import random
 import unittest
 
-from iacopo.expars import Operator, Number
+from iacopo.expars import Operator, Number, Operation, Variable
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.instrumentation import Instrumentation
 from iacopo.expars.exceptions import UnexpectedTokenError, IncompleteExpressionError
-from iacopo.expars.parser import Parser
+from iacopo.expars.parser import Parser, RecursiveParser
 from iacopo.expars.tokenizer import Tokenizer
 
 
@@ -104,3 +107,88 @@ class ParserTestCase(unittest.TestCase):
                 "Missing symbol at the end of expression, last token parsed: Operator.PLUS at position 10",
                 e.args[0],
             )
+
+    def test_parse_empty(self):
+        with self.assertRaises(IncompleteExpressionError) as context:
+            Parser(Tokenizer("").tokenize()).parse()
+        self.assertEqual(0, context.exception.position)
+
+    def test_parse_missing_operand_after_parenthesis(self):
+        with self.assertRaises(IncompleteExpressionError) as context:
+            Parser(Tokenizer("(1)+").tokenize()).parse()
+        self.assertEqual(4, context.exception.position)
+
+    def test_parse_closed_parenthesis_as_operand(self):
+        with self.assertRaises(UnexpectedTokenError) as context:
+            Parser(Tokenizer("1+)").tokenize()).parse()
+        self.assertEqual(3, context.exception.position)
+
+    def test_parse_does_not_change_tokens(self):
+        tokens = list(Tokenizer("-1").tokenize())
+        self.assertEqual(-1, Parser(tokens).parse().value)
+        self.assertEqual(1, tokens[1].value)
+
+    def test_parse_long_expression(self):
+        operation = Parser(Tokenizer("+".join(["2*3-1"] * 100000)).tokenize()).parse()
+        depth = 0
+        while isinstance(operation, Operation):
+            depth += 1
+            operation = operation.right
+        self.assertEqual(199999, depth)
+
+    def test_calculate_long_expression(self):
+        expression = "+".join(["1"] * 5000) + "-x"
+        for calculator in (
+            Calculator(),
+            Calculator(cache_size=0, optimize=True),
+            Calculator(instrumentation=Instrumentation()),
+        ):
+            with self.subTest(calculator=calculator):
+                self.assertEqual(4998, calculator.calculate(expression, {"x": 2}))
+        specialization = Calculator().specialize(expression, {})
+        self.assertEqual(4997, specialization.evaluate({"x": 3}))
+
+    def test_parse_deep_parenthesis(self):
+        depth = 100000
+        expression = "(" * depth + "1+2" + ")" * depth
+        operation = Parser(Tokenizer(expression).tokenize()).parse()
+        self.assertEqual("1.0 2.0 +", operation.as_polish())
+
+    def test_same_trees_as_recursive_parser(self):
+        generator = random.Random(42)
+        alphabet = ["1", "2", "3", ".5", "x", "+", "-", "*", "/", "(", ")"]
+        for _ in range(5000):
+            expression = "".join(
+                generator.choice(alphabet) for _ in range(generator.randint(1, 14))
+            )
+            expected = self._tree_or_error(RecursiveParser, expression)
+            actual = self._tree_or_error(Parser, expression)
+            if expected[0] in (StopIteration, AssertionError):
+                # the recursive parser leaks these on a few malformed inputs
+                self.assertIn(
+                    actual[0], (IncompleteExpressionError, UnexpectedTokenError)
+                )
+            else:
+                self.assertEqual(expected, actual, expression)
+
+    @staticmethod
+    def _tree_or_error(parser_class, expression):
+        try:
+            return "tree", ParserTestCase._shape(
+                parser_class(Tokenizer(expression).tokenize()).parse()
+            )
+        except (RuntimeError, ValueError, StopIteration, AssertionError) as e:
+            return type(e), str(e)
+
+    @staticmethod
+    def _shape(evaluable):
+        if isinstance(evaluable, Number):
+            return evaluable.value
+        if isinstance(evaluable, Variable):
+            return evaluable.name
+        return (
+            type(evaluable).__name__,
+            evaluable.operator,
+            ParserTestCase._shape(evaluable.left),
+            ParserTestCase._shape(evaluable.right),
+        )
@@ -0,0 +1,205 @@
+import math
+import os
+import random
+import struct
+import tempfile
+import unittest
+import zlib
+
+from iacopo.expars import Call, Number, Operation, Operator, Variable
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.exceptions import FormatError, UnboundVariableError
+from iacopo.expars.operators import REGISTRY, register_operator
+from iacopo.expars.serialization import (
+    Collection,
+    DiskCache,
+    dump_collection,
+    dumps,
+    load_columnar,
+    loads,
+)
+
+EXPRESSIONS = ["1+2*x", "(8+9)/1-3*(4+x*(6-y))", "-2.5", "price*quantity_2"]
+CALLS = ["1+2", "sqrt(4)", "max(1,x,3)^2", "sqrt(x)+max(1,2,x)^2%3", "x%sqrt(9)"]
+
+
+def _register_modulo(test: unittest.TestCase):
+    register_operator("%", "MODULO", math.fmod, 2, right_associative=False)
+    test.addCleanup(REGISTRY.unregister, "%")
+
+
+class SerializationTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        for expression in EXPRESSIONS:
+            evaluable = Calculator.parse(expression)
+            self.assertEqual(
+                self._shape(evaluable), self._shape(loads(dumps(evaluable)))
+            )
+
+    def test_positions_are_kept(self):
+        with self.assertRaises(UnboundVariableError) as error:
+            loads(dumps(Calculator.parse("1+2*x"))).evaluate({})
+        self.assertEqual(5, error.exception.position)
+
+    def test_columnar_view(self):
+        operation = Number(0)
+        for _ in range(100000):
+            operation = Operation(Operator.MINUS, operation, Number(1))
+        data = dumps(operation)
+        self.assertEqual(32 + 200001 * 22, len(data))
+        self.assertEqual(-100000, load_columnar(data).evaluate())
+
+    def test_collection(self):
+        trees = {expression: Calculator.parse(expression) for expression in EXPRESSIONS}
+        collection = Collection(dump_collection(trees))
+        self.assertEqual(EXPRESSIONS, list(collection))
+        self.assertEqual(7, collection["1+2*x"].evaluate({"x": 3}))
+        self.assertEqual(-2.5, collection.tree(2).evaluate())
+        self.assertEqual(-2.5, collection.tree(-2).evaluate())
+        self.assertRaises(IndexError, collection.tree, 4)
+        self.assertEqual(0, len(Collection(dump_collection({}))))
+
+    def test_corruption(self):
+        data = dumps(Calculator.parse(EXPRESSIONS[1]))
+        for index in range(len(data)):
+            corrupted = bytearray(data)
+            corrupted[index] ^= 0x5A
+            with self.subTest(index=index):
+                self.assertRaises(FormatError, loads, corrupted)
+        self.assertRaises(FormatError, loads, data[:-1])
+        self.assertRaises(FormatError, loads, data[:10])
+        self.assertRaises(FormatError, loads, b"")
+
+    def test_version_mismatch(self):
+        data = bytearray(dumps(Number(1)))
+        struct.pack_into("<H", data, 4, 99)
+        with self.assertRaisesRegex(FormatError, "version 99"):
+            loads(data)
+
+    def test_forged_trees_are_rejected(self):
+        # a valid checksum over a node using a later node
+        data = bytearray(dumps(Calculator.parse("1+2")))
+        struct.pack_into("<i", data, 32 + 3 * 8 + 3 * 4 + 2 * 4, 2)
+        struct.pack_into("<I", data, 24, zlib.crc32(data[32:]))
+        self.assertRaisesRegex(FormatError, "comes after", loads, data)
+
+    def test_calls_and_registered_operators(self):
+        _register_modulo(self)
+        for expression in CALLS:
+            evaluable = Calculator.parse(expression)
+            loaded = loads(dumps(evaluable))
+            with self.subTest(expression=expression):
+                self.assertEqual(self._shape(evaluable), self._shape(loaded))
+                self.assertEqual(evaluable.as_polish(), loaded.as_polish())
+                self.assertEqual(
+                    evaluable.evaluate({"x": 7}), loaded.evaluate({"x": 7})
+                )
+                self.assertEqual(
+                    evaluable.evaluate({"x": 7}),
+                    load_columnar(dumps(evaluable)).evaluate({"x": 7}),
+                )
+        self.assertEqual(
+            2, loads(dumps(Calculator.parse("sqrt(x)"))).evaluate({"x": 4})
+        )
+
+    def test_names_are_resolved_on_load(self):
+        _register_modulo(self)
+        data = dumps(Calculator.parse("x%sqrt(9)"))
+        REGISTRY.unregister("%")
+        with self.assertRaisesRegex(FormatError, "Unknown operator '%'"):
+            loads(data)
+        register_operator("%", "REMAINDER", math.remainder, 2)
+        self.assertEqual(1, loads(data).evaluate({"x": 7}))
+
+    def test_unknown_functions(self):
+        function = REGISTRY.functions.pop("sqrt")
+        self.addCleanup(REGISTRY.functions.__setitem__, "sqrt", function)
+        data = dumps(Call(function, (Number(4),)))
+        with self.assertRaisesRegex(FormatError, "Unknown function 'sqrt'"):
+            loads(data)
+        # unchecked trees find out when evaluated
+        with self.assertRaisesRegex(FormatError, "'sqrt'"):
+            load_columnar(data, check=False).evaluate()
+
+    def test_random_garbage(self):
+        generator = random.Random(18)
+        data = dump_collection(
+            {expression: Calculator.parse(expression) for expression in EXPRESSIONS}
+        )
+        for _ in range(300):
+            corrupted = bytearray(data)
+            for _ in range(generator.randint(1, 4)):
+                corrupted[generator.randrange(len(corrupted))] = generator.randrange(
+                    256
+                )
+            try:
+                collection = Collection(corrupted)
+                for index in range(len(collection)):
+                    collection.key(index)
+                    collection.tree(index)
+            except FormatError:
+                pass
+
+    def _shape(self, evaluable):
+        if isinstance(evaluable, (Number, Variable)):
+            return repr(evaluable), evaluable.position
+        if isinstance(evaluable, Call):
+            return evaluable.definition, tuple(map(self._shape, evaluable.arguments))
+        return (
+            evaluable.operator,
+            self._shape(evaluable.left),
+            self._shape(evaluable.right),
+        )
+
+
+class DiskCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = DiskCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_warm_start(self):
+        cold = self.cache.load(EXPRESSIONS)
+        warm = self.cache.load(EXPRESSIONS)
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+        self.assertEqual(cold.tree(1).as_polish(), warm.tree(1).as_polish())
+        self.assertEqual(EXPRESSIONS, list(warm))
+        self.cache.load(EXPRESSIONS[:2])
+        self.assertEqual(2, self.cache.misses)
+        warm.release()
+
+    def test_calls_and_registered_operators(self):
+        _register_modulo(self)
+        cold = self.cache.load(CALLS)
+        warm = self.cache.load(CALLS)
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+        for index, expression in enumerate(CALLS):
+            with self.subTest(expression=expression):
+                self.assertEqual(
+                    Calculator.parse(expression).evaluate({"x": 5}),
+                    warm.tree(index).evaluate({"x": 5}),
+                )
+                self.assertEqual(
+                    cold.tree(index).as_polish(),
+                    warm.columnar(index).to_evaluable().as_polish(),
+                )
+        warm.release()
+
+    def test_corrupted_file_is_written_again(self):
+        self.cache.load(EXPRESSIONS)
+        path = self.cache.path(EXPRESSIONS)
+        with open(path, "r+b") as file:
+            file.seek(30)
+            file.write(b"\xff\xff")
+        collection = self.cache.load(EXPRESSIONS)
+        self.assertEqual(2, self.cache.misses)
+        self.assertEqual(7, collection.tree(0).evaluate({"x": 3}))
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(1, len(os.listdir(self.directory.name)))
+
+    def test_parse_errors(self):
+        with self.assertRaises(RuntimeError):
+            self.cache.load(["1+", "2"])
+        self.assertEqual([], os.listdir(self.directory.name))
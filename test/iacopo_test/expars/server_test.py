@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.server import EvaluationServer
+
+
+class ServerTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = EvaluationServer(Calculator(compiled=True), batch_delay=0.01)
+        host, port = await self.server.start_tcp()
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        await self.server.close()
+
+    async def test_value(self):
+        response = await self._ask({"id": 1, "expression": "2*(3+4)"})
+        self.assertEqual({"id": 1, "value": 14.0}, response)
+
+    async def test_bindings(self):
+        request = {"id": "a", "expression": "x*y", "bindings": {"x": 2, "y": 3}}
+        self.assertEqual({"id": "a", "value": 6.0}, await self._ask(request))
+
+    async def test_error(self):
+        response = await self._ask({"id": 2, "expression": "1+0.000.1"})
+        self.assertEqual("NumberFormatError", response["error"]["type"])
+        self.assertEqual(8, response["error"]["position"])
+
+    async def test_protocol_error(self):
+        self.writer.write(b"not json\n")
+        response = json.loads(await self.reader.readline())
+        self.assertIsNone(response["id"])
+        self.assertEqual("ProtocolError", response["error"]["type"])
+        response = await self._ask({"id": 3})
+        self.assertEqual("ProtocolError", response["error"]["type"])
+
+    async def test_concurrent_requests_are_batched(self):
+        for identifier in range(100):
+            request = {"id": identifier, "expression": f"{identifier}*2"}
+            self.writer.write(json.dumps(request).encode() + b"\n")
+        responses = [json.loads(await self.reader.readline()) for _ in range(100)]
+        values = {response["id"]: response["value"] for response in responses}
+        self.assertEqual(
+            {identifier: identifier * 2.0 for identifier in range(100)}, values
+        )
+        self.assertLess(self.server.batches, 100)
+
+    async def test_stats(self):
+        await self._ask({"id": 1, "expression": "1+2"})
+        await self._ask({"id": 2, "expression": "1+2"})
+        stats = (await self._ask({"id": 3, "command": "stats"}))["stats"]
+        self.assertEqual(2, stats["requests"])
+        self.assertEqual(0, stats["queue_depth"])
+        self.assertEqual({"p50", "p90", "p99"}, set(stats["latency_ms"]))
+        self.assertEqual(1, stats["cache"]["hits"])
+        self.assertEqual(1, stats["cache"]["misses"])
+
+    async def test_non_finite(self):
+        request = {"id": 1, "expression": "x*x", "bindings": {"x": 1e200}}
+        response = await self._ask(request)
+        self.assertEqual("NonFiniteResultError", response["error"]["type"])
+        response = await self._ask({"id": float("nan"), "expression": "1"})
+        self.assertEqual("ProtocolError", response["error"]["type"])
+
+    async def test_bindings_must_be_numbers(self):
+        for identifier, bindings in enumerate(
+            ({"x": "a"}, {"x": None}, {"x": True}, [1], "x")
+        ):
+            request = {"id": identifier, "expression": "x", "bindings": bindings}
+            response = await self._ask(request)
+            self.assertEqual(identifier, response["id"])
+            self.assertEqual("ProtocolError", response["error"]["type"])
+        request = {"id": 9, "expression": "x", "bindings": {"x": 2}}
+        self.assertEqual({"id": 9, "value": 2}, await self._ask(request))
+
+    async def test_long_line(self):
+        # longer than the 64 KiB default of asyncio streams
+        expression = "+".join(["1"] * 40000)
+        response = await self._ask({"id": 1, "expression": expression})
+        self.assertEqual({"id": 1, "value": 40000.0}, response)
+
+    async def test_line_over_limit(self):
+        server = EvaluationServer(max_line=1000)
+        host, port = await server.start_tcp()
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b'{"id": 1, "expression": "2*3"}\n')
+        request = {"id": 2, "expression": "+".join(["1"] * 1000)}
+        writer.write(json.dumps(request).encode() + b"\n")
+        writer.write(b'{"id": 3, "expression": "1"}\n')
+        responses = [json.loads(await reader.readline()) for _ in range(2)]
+        # the connection is closed after the error
+        self.assertEqual(b"", await reader.readline())
+        self.assertIn({"id": 1, "value": 6.0}, responses)
+        error = next(response for response in responses if "error" in response)
+        self.assertIsNone(error["id"])
+        self.assertEqual("ProtocolError", error["error"]["type"])
+        writer.close()
+        await writer.wait_closed()
+        await server.close()
+
+    async def test_evaluate(self):
+        result = await self.server.evaluate("x+1", {"x": 1})
+        self.assertEqual(2.0, result.value)
+
+    async def test_failed_batch(self):
+        # bindings that cannot be sent to the pool fail their batch only
+        with self.assertRaises(Exception):
+            await self.server.evaluate("x", {"x": lambda: 1})
+        self.assertEqual(3.0, (await self.server.evaluate("1+2")).value)
+
+    async def _ask(self, request: dict) -> dict:
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+
+class ExecutorTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_given_executor(self):
+        with ProcessPoolExecutor(2) as executor:
+            server = EvaluationServer(Calculator(), executor=executor)
+            results = await asyncio.gather(
+                *(server.evaluate(f"{number}*x", {"x": 2}) for number in range(20))
+            )
+            self.assertEqual(
+                [number * 2.0 for number in range(20)],
+                [result.value for result in results],
+            )
+            await server.close()
+            # still usable by its owner
+            self.assertEqual(4, executor.submit(pow, 2, 2).result())
+
+    async def test_threads(self):
+        with ThreadPoolExecutor(2) as executor:
+            server = EvaluationServer(Calculator(), executor=executor)
+            self.assertEqual(2.0, (await server.evaluate("1+1")).value)
+            self.assertEqual(1, server.statistics()["cache"]["misses"])
+            await server.close()
+
+
+@unittest.skipUnless(hasattr(asyncio, "start_unix_server"), "no unix sockets")
+class UnixServerTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_value(self):
+        server = EvaluationServer()
+        with tempfile.TemporaryDirectory() as directory:
+            path = await server.start_unix(os.path.join(directory, "expars.sock"))
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(b'{"id": 1, "expression": "1-2"}\n')
+            self.assertEqual(
+                {"id": 1, "value": -1.0}, json.loads(await reader.readline())
+            )
+            writer.close()
+            await writer.wait_closed()
+            await server.close()
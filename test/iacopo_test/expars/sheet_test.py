@@ -0,0 +1,117 @@
+import random
+import unittest
+
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.exceptions import CycleError, UnboundVariableError
+from iacopo.expars.sheet import FormulaGraph
+
+
+class CountingCalculator(Calculator):
+    def __init__(self, **settings):
+        super().__init__(**settings)
+        self.parses = 0
+
+    def parse(self, expression: str):
+        self.parses += 1
+        return super().parse(expression)
+
+
+class FormulaGraphTestCase(unittest.TestCase):
+    def setUp(self):
+        self.graph = FormulaGraph()
+        self.graph.update({"price": 10, "quantity": 3, "rate": 0.5})
+        self.graph.set_formula("gross", "price*quantity")
+        self.graph.set_formula("tax", "gross*rate")
+        self.graph.set_formula("net", "gross-tax")
+        self.graph.set_formula("discount", "rate*2")
+
+    def test_values(self):
+        self.assertEqual(30, self.graph["gross"])
+        self.assertEqual(15, self.graph["net"])
+        self.assertEqual(1, self.graph["discount"])
+
+    def test_only_downstream_formulas_are_evaluated(self):
+        self.assertEqual(3, self.graph.set_value("quantity", 4))
+        self.assertEqual(20, self.graph["net"])
+        self.assertEqual(3, self.graph.set_value("rate", 0.25))
+        self.assertEqual(30, self.graph["net"])
+
+    def test_unchanged_values_stop_the_update(self):
+        self.assertEqual(0, self.graph.set_value("price", 10))
+        self.assertEqual(1, self.graph.update({"price": 5, "quantity": 6}))
+        self.assertEqual(5, self.graph.evaluated)
+
+    def test_formula_change(self):
+        self.assertEqual(3, self.graph.set_formula("gross", "price*quantity*2"))
+        self.assertEqual(30, self.graph["net"])
+
+    def test_formulas_are_parsed_once(self):
+        for settings in ({}, {"compiled": True}, {"optimize": True}):
+            calculator = CountingCalculator(**settings)
+            graph = FormulaGraph(calculator)
+            graph.update({"x": 2, "y": 3})
+            graph.set_formula("a", "x*y+max(x,y)")
+            graph.set_formula("b", "a*2-y")
+            self.assertEqual(2, calculator.parses)
+            self.assertEqual(9, graph["a"])
+            self.assertEqual(15, graph["b"])
+            self.assertEqual(2, graph.set_value("x", 4))
+            self.assertEqual(29, graph["b"])
+
+    def test_cycle(self):
+        with self.assertRaises(CycleError) as error:
+            self.graph.set_formula("price", "net+1")
+        self.assertEqual(["price", "net", "gross", "price"], error.exception.names)
+        with self.assertRaises(CycleError):
+            self.graph.set_formula("loop", "loop")
+        self.assertEqual("price*quantity", self.graph.expression("gross"))
+
+    def test_errors_propagate(self):
+        self.graph.set_value("quantity", 0)
+        self.graph.set_formula("unit", "net/quantity")
+        self.assertRaises(ZeroDivisionError, lambda: self.graph["unit"])
+        self.graph.set_formula("total", "unit+1")
+        self.assertRaises(UnboundVariableError, lambda: self.graph["total"])
+        self.graph.set_value("quantity", 2)
+        self.assertEqual(6, self.graph["total"])
+
+    def test_math_errors(self):
+        graph = FormulaGraph()
+        graph.set_value("a", 4)
+        graph.set_formula("b", "sqrt(a)")
+        graph.set_formula("d", "a*2")
+        self.assertEqual(2, graph.set_value("a", -1))
+        self.assertRaises(ValueError, lambda: graph["b"])
+        self.assertEqual(-2, graph["d"])
+
+    def test_remove(self):
+        self.graph.remove("tax")
+        self.assertRaises(UnboundVariableError, lambda: self.graph["net"])
+        self.assertNotIn("tax", self.graph)
+        self.graph.set_formula("tax", "1")
+        self.assertEqual(29, self.graph["net"])
+
+    def test_inputs_cannot_replace_formulas(self):
+        with self.assertRaises(ValueError):
+            self.graph.set_value("gross", 1)
+
+    def test_matches_full_recomputation(self):
+        generator = random.Random(14)
+        graph = FormulaGraph(Calculator(compiled=True))
+        inputs = {f"i{index}": float(index) for index in range(20)}
+        graph.update(inputs)
+        formulas = {}
+        for index in range(200):
+            names = list(inputs) + list(formulas)
+            left, right = generator.sample(names, 2)
+            formulas[f"f{index}"] = f"{left}{generator.choice('+-*')}{right}"
+            graph.set_formula(f"f{index}", formulas[f"f{index}"])
+        for _ in range(20):
+            name = generator.choice(list(inputs))
+            inputs[name] = float(generator.randint(-3, 3))
+            graph.set_value(name, inputs[name])
+        values = dict(inputs)
+        for name, expression in formulas.items():
+            values[name] = Calculator().calculate(expression, values)
+        for name in formulas:
+            self.assertEqual(values[name], graph[name], name)
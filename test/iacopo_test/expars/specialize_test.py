@@ -0,0 +1,73 @@
+import random
+import unittest
+
+from iacopo.expars import Number, Variable
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.exceptions import UnboundVariableError
+
+
+class SpecializeTestCase(unittest.TestCase):
+    def test_residual(self):
+        specialization = Calculator().specialize(
+            "quantity*price*(1+tax)-discount*tax", {"tax": 0.25, "discount": 4}
+        )
+        self.assertEqual(
+            "quantity price 1.25 * * 1.0 -", specialization.residual.as_polish()
+        )
+        self.assertEqual(11, specialization.original_nodes)
+        self.assertEqual(7, specialization.residual_nodes)
+        self.assertAlmostEqual(4 / 11, specialization.shrink)
+        self.assertEqual(24, specialization.evaluate({"quantity": 2, "price": 10}))
+
+    def test_everything_known(self):
+        specialization = Calculator(compiled=True).specialize("x*2+y", {"x": 1, "y": 2})
+        self.assertIsInstance(specialization.residual, Number)
+        self.assertEqual(4, specialization.evaluate())
+
+    def test_nothing_known(self):
+        specialization = Calculator().specialize("x*2", {})
+        self.assertIsInstance(specialization.residual.left, Variable)
+        self.assertEqual(0, specialization.shrink)
+
+    def test_cached(self):
+        calculator = Calculator()
+        first = calculator.specialize("x*y", {"x": 2})
+        self.assertIs(first, calculator.specialize("x*y", {"x": 2}))
+        self.assertIsNot(first, calculator.specialize("x*y", {"x": 3}))
+
+    def test_unbound_position(self):
+        specialization = Calculator().specialize("x*2+y", {"x": 1})
+        with self.assertRaises(UnboundVariableError) as error:
+            specialization.evaluate({})
+        self.assertEqual(5, error.exception.position)
+
+    def test_division_by_zero_still_raises(self):
+        specialization = Calculator().specialize("x/y+z", {"y": 0})
+        with self.assertRaises(ZeroDivisionError):
+            specialization.evaluate({"x": 1, "z": 1})
+
+    def test_matches_full_evaluation(self):
+        generator = random.Random(19)
+        names = ["a", "b", "c", "d"]
+        for _ in range(300):
+            expression = generator.choice(names)
+            for _ in range(generator.randint(1, 8)):
+                operand = generator.choice(names + ["2", "0.5", "-1"])
+                expression += generator.choice("+-*/") + operand
+                if generator.random() < 0.3:
+                    expression = f"({expression})"
+            bindings = {name: generator.choice([-2.0, 0.5, 3.0]) for name in names}
+            known = {name: bindings[name] for name in generator.sample(names, 2)}
+            specialization = Calculator().specialize(expression, known)
+            self.assertEqual(
+                self._result(lambda: Calculator().calculate(expression, bindings)),
+                self._result(lambda: specialization.evaluate(bindings)),
+                expression,
+            )
+
+    @staticmethod
+    def _result(calculation):
+        try:
+            return calculation()
+        except ZeroDivisionError as e:
+            return type(e)
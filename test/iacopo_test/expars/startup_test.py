@@ -0,0 +1,24 @@
+import unittest
+
+from benchmark.startup import Budget, check, run
+
+
+class StartupTestCase(unittest.TestCase):
+    def test_within_budget(self):
+        results = run(repeat=3)
+        self.assertEqual([], check(results))
+
+    def test_check(self):
+        results = {
+            "slow": {"seconds": 0.2, "memory": 0, "heavy": ["numpy"]},
+            "big": {"seconds": 0.0, "memory": 9 << 20, "heavy": []},
+        }
+        self.assertEqual(
+            [
+                "slow imports numpy",
+                "slow takes 200ms to import, the budget is 150ms",
+                "big adds 9216KB of memory, the budget is 8192KB",
+            ],
+            check(results),
+        )
+        self.assertEqual(["slow imports numpy"], check(results, Budget(1, 10 << 20)))
@@ -0,0 +1,88 @@
+import io
+import mmap
+import os
+import random
+import tempfile
+import unittest
+
+from iacopo.expars.compiler import Compiler
+from iacopo.expars.parser import Parser
+from iacopo.expars.tokenizer import StreamTokenizer, Tokenizer
+
+
+class StreamTokenizerTestCase(unittest.TestCase):
+    EXPRESSIONS = [
+        "",
+        "1",
+        "12.5+x_1*(3-4)/-2",
+        "(1+2))*345.678",
+        "1+0.000.1",
+        "12 3",
+        "2(3)",
+        "ab.c",
+        "1+é",
+        "x" * 50 + "+" + "9" * 50,
+    ]
+
+    def test_same_tokens_as_tokenizer(self):
+        for expression in self.EXPRESSIONS:
+            expected = self._tokens(Tokenizer(expression).tokenize())
+            encoded = expression.encode()
+            for chunk_size in (1, 2, 3, 7, 64):
+                sources = [
+                    expression,
+                    encoded,
+                    memoryview(encoded),
+                    io.StringIO(expression),
+                    io.BytesIO(encoded),
+                ]
+                for source in sources:
+                    with self.subTest(
+                        expression=expression, size=chunk_size, source=source
+                    ):
+                        tokens = StreamTokenizer(source, chunk_size).tokenize()
+                        self.assertEqual(expected, self._tokens(tokens))
+
+    def test_random_expressions(self):
+        generator = random.Random(17)
+        for _ in range(200):
+            expression = "".join(
+                generator.choice("0123456789.+-*/()xy") for _ in range(40)
+            )
+            expected = self._tokens(Tokenizer(expression).tokenize())
+            tokens = StreamTokenizer(expression.encode(), generator.randint(1, 9))
+            self.assertEqual(expected, self._tokens(tokens.tokenize()), expression)
+
+    def test_mmap(self):
+        expression = "+".join(f"({index}*2.5-x)" for index in range(5000))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "expression.txt")
+            with open(path, "wb") as file:
+                file.write(expression.encode())
+            with open(path, "rb") as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    tokens = StreamTokenizer(mapped, 4096).tokenize()
+                    tree = Parser(tokens).parse()
+        expected = Parser(Tokenizer(expression).tokenize()).parse()
+        self.assertEqual(
+            Compiler(expected).compile().evaluate({"x": 1}),
+            Compiler(tree).compile().evaluate({"x": 1}),
+        )
+
+    def test_invalid_utf8(self):
+        with self.assertRaises(UnicodeDecodeError):
+            list(StreamTokenizer(b"1+\xff", 2).tokenize())
+
+    def test_offset(self):
+        tokens = Tokenizer("1+2", offset=10).tokenize()
+        self.assertEqual([12, 12, 13], [token.position for token in tokens])
+
+    @staticmethod
+    def _tokens(tokens):
+        result = []
+        try:
+            for token in tokens:
+                result.append((repr(token), token.position))
+        except (RuntimeError, ValueError) as e:
+            result.append((type(e), str(e)))
+        return result
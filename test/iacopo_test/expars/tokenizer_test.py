@@ -1,7 +1,12 @@
+import random
 from unittest import TestCase
 
 from iacopo.expars import Operator, OpenParenthesis, ClosedParenthesis
-from iacopo.expars.exceptions import NumberFormatError, UnexpectedTokenError
+from iacopo.expars.exceptions import (
+    NumberFormatError,
+    UnexpectedTokenError,
+    UnexpectedCharacterError,
+)
 from iacopo.expars.tokenizer import Tokenizer
 
 
@@ -59,3 +64,39 @@ class TokenizerTest(TestCase):
     def test_weird(self):
         tokens = [_ for _ in Tokenizer("--+-").tokenize()]
         self.assertEqual(4, len(tokens))
+
+    def test_unexpected_character(self):
+        for state_machine in (False, True):
+            with self.assertRaises(UnexpectedCharacterError) as context:
+                _ = [_ for _ in Tokenizer("12 +3", state_machine).tokenize()]
+            self.assertEqual(3, context.exception.position)
+            self.assertEqual(
+                "Unexpected character ' ' at character 3", context.exception.args[0]
+            )
+
+    def test_number_positions(self):
+        tokens = [_ for _ in Tokenizer("12.5*(3)-40").tokenize()]
+        self.assertEqual([5, 5, 6, 8, 8, 9, 11], [_.position for _ in tokens])
+
+    def test_scanner_matches_state_machine(self):
+        generator = random.Random(1234)
+        alphabet = "0123456789.+-*/()xy_ "
+        for _ in range(3000):
+            expression = "".join(
+                generator.choice(alphabet) for _ in range(generator.randint(0, 12))
+            )
+            self.assertEqual(
+                self._tokens_or_error(Tokenizer(expression, state_machine=True)),
+                self._tokens_or_error(Tokenizer(expression)),
+                expression,
+            )
+
+    @staticmethod
+    def _tokens_or_error(tokenizer):
+        tokens = []
+        try:
+            for token in tokenizer.tokenize():
+                tokens.append((repr(token), token.position))
+        except (RuntimeError, ValueError) as e:
+            tokens.append((type(e), e.args))
+        return tokens
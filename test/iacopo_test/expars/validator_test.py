@@ -0,0 +1,86 @@
+import random
+import unittest
+
+from iacopo.expars.exceptions import describe
+from iacopo.expars.parser import Parser
+from iacopo.expars.tokenizer import Tokenizer
+from iacopo.expars.validator import Diagnostic, Validator
+
+
+def _parse_error(expression: str) -> Exception | None:
+    try:
+        Parser(Tokenizer(expression).tokenize()).parse()
+    except (RuntimeError, ValueError) as e:
+        return e
+    return None
+
+
+class ValidatorTestCase(unittest.TestCase):
+    def test_valid(self):
+        validator = Validator()
+        for expression in ("1", "-2*x", "(1+2)*(a-b)", "((x))/-0.5", "(1+2"):
+            with self.subTest(expression=expression):
+                self.assertIsNone(_parse_error(expression))
+                self.assertEqual([], validator.validate(expression))
+
+    def test_empty(self):
+        self.assertEqual(
+            [Diagnostic(0, "IncompleteExpressionError", str(_parse_error("")))],
+            Validator().validate(""),
+        )
+
+    def test_every_error(self):
+        diagnostics = Validator().validate("1..2+$*3+(4))+x y")
+        self.assertEqual(
+            [
+                "NumberFormatError",
+                "UnexpectedCharacterError",
+                "UnexpectedTokenError",
+                "UnexpectedTokenError",
+                "UnexpectedCharacterError",
+                "IncompleteExpressionError",
+            ],
+            [diagnostic.kind for diagnostic in diagnostics],
+        )
+        self.assertEqual([3, 6, 7, 13, 16, 17], [d.position for d in diagnostics])
+
+    def test_character_after_literal_reported_once(self):
+        # the bad follower of "." is met again as a character after the error
+        # of the literal itself
+        diagnostics = Validator().validate("x*.$")
+        self.assertEqual(
+            ["UnexpectedCharacterError", "ValueError"],
+            [diagnostic.kind for diagnostic in diagnostics],
+        )
+        self.assertEqual([4, 3], [d.position for d in diagnostics])
+
+    def test_many(self):
+        self.assertEqual(
+            [[], ["UnexpectedTokenError"], []],
+            [
+                [diagnostic.kind for diagnostic in diagnostics]
+                for diagnostics in Validator().validate_many(["1", "*1", "x"])
+            ],
+        )
+
+    def test_first_matches_parse(self):
+        generator = random.Random(20)
+        alphabet = "12.x+-*/()$ "
+        validator = Validator()
+        for _ in range(3000):
+            expression = "".join(
+                generator.choice(alphabet) for _ in range(generator.randint(0, 12))
+            )
+            diagnostics = validator.validate(expression)
+            error = _parse_error(expression)
+            with self.subTest(expression=expression):
+                if error is None:
+                    self.assertEqual([], diagnostics)
+                    continue
+                first = diagnostics[0]
+                expected = describe(error)
+                self.assertEqual(expected["type"], first.kind)
+                self.assertEqual(expected["message"], first.message)
+                self.assertEqual(
+                    expected.get("position", first.position), first.position
+                )
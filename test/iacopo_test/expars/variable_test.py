@@ -0,0 +1,79 @@
+import unittest
+
+from iacopo.expars import Variable, Operator
+from iacopo.expars.calculator import Calculator
+from iacopo.expars.compiler import Compiler
+from iacopo.expars.exceptions import UnboundVariableError, UnexpectedCharacterError
+from iacopo.expars.tokenizer import Tokenizer
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class VariableTestCase(unittest.TestCase):
+    def test_tokenize(self):
+        for state_machine in (False, True):
+            tokens = list(Tokenizer("price*qty_2-x", state_machine).tokenize())
+            self.assertEqual(5, len(tokens))
+            self.assertIsInstance(tokens[0], Variable)
+            self.assertEqual("price", tokens[0].name)
+            self.assertEqual(6, tokens[0].position)
+            self.assertEqual(Operator.MULTIPLY, tokens[1].operator)
+            self.assertEqual("qty_2", tokens[2].name)
+            self.assertEqual("x", tokens[4].name)
+            self.assertEqual(13, tokens[4].position)
+
+    def test_tokenize_number_followed_by_letter(self):
+        for state_machine in (False, True):
+            with self.assertRaises(UnexpectedCharacterError) as context:
+                list(Tokenizer("2x", state_machine).tokenize())
+            self.assertEqual(2, context.exception.position)
+
+    def test_parse(self):
+        operation = Calculator.parse("price*qty-discount")
+        self.assertEqual("price qty * discount -", operation.as_polish())
+
+    def test_evaluate(self):
+        bindings = {"price": 2.5, "qty": 4, "discount": 1}
+        self.assertEqual(9, Calculator().calculate("price*qty-discount", bindings))
+
+    def test_unbound_variable(self):
+        for calculator in (Calculator(), Calculator(compiled=True)):
+            with self.assertRaises(UnboundVariableError) as context:
+                calculator.calculate("1+price*qty", {"price": 1})
+            self.assertEqual("qty", context.exception.name)
+            self.assertEqual(11, context.exception.position)
+            with self.assertRaises(UnboundVariableError) as context:
+                calculator.calculate("1+price*qty")
+            self.assertEqual("price", context.exception.name)
+
+    def test_compiled(self):
+        bindings = {"a": 3, "b": 4}
+        operation = Calculator.parse("a*a+b*(b-1)/2")
+        self.assertEqual(15, Compiler(operation).compile().evaluate(bindings))
+        self.assertEqual(
+            15, Calculator(compiled=True).calculate("a*a+b*(b-1)/2", bindings)
+        )
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_evaluate_vectorized(self):
+        operation = Calculator.parse("price*qty-discount")
+        price = numpy.array([1.0, 2.0, 3.0])
+        qty = numpy.array([10, 20, 30])
+        result = operation.evaluate_vectorized(
+            {"price": price, "qty": qty, "discount": 0.5}
+        )
+        self.assertEqual([9.5, 39.5, 89.5], result.tolist())
+        for row in range(3):
+            bindings = {"price": price[row], "qty": qty[row], "discount": 0.5}
+            self.assertEqual(result[row], operation.evaluate(bindings))
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_evaluate_vectorized_constant(self):
+        operation = Calculator.parse("1/0+x*0")
+        result = operation.evaluate_vectorized({"x": numpy.zeros(2)})
+        self.assertEqual([numpy.inf, numpy.inf], result.tolist())
+        result = Calculator.parse("2*3").evaluate_vectorized({"x": numpy.zeros(4)})
+        self.assertEqual([6.0] * 4, result.tolist())